@@ -0,0 +1,93 @@
+import gc
+import statistics
+import time
+import tracemalloc
+from typing import Callable
+
+
+class Measurement:
+    def __init__(self, stage: str, name: str, times: list[float], peak_memory: int, rows: int = None):
+        """
+        Result of a repeatedly timed benchmark
+        :param stage: pipeline stage the benchmark belongs to (fetch, diff, transform, insert, ...)
+        :param name: name of the benchmark within the stage
+        :param times: seconds taken by every repeat
+        :param peak_memory: peak of memory allocated by python during one repeat, in bytes
+        :param rows: number of rows processed by a repeat, used to report throughput
+        """
+        self.stage: str = stage
+        self.name: str = name
+        self.times: list[float] = times
+        self.peak_memory: int = peak_memory
+        self.rows: int = rows
+
+    def get_best_time(self) -> float:
+        return min(self.times)
+
+    def get_median_time(self) -> float:
+        return statistics.median(self.times)
+
+    def get_rows_per_second(self) -> float | None:
+        if self.rows is None or self.get_best_time() == 0: return None
+        return self.rows / self.get_best_time()
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.stage,
+            "name": self.name,
+            "best_time": self.get_best_time(),
+            "median_time": self.get_median_time(),
+            "peak_memory": self.peak_memory,
+            "rows": self.rows,
+            "rows_per_second": self.get_rows_per_second()
+        }
+
+
+def measure(stage: str, name: str, func: Callable, repeats: int = 3, rows: int = None,
+            setup: Callable = None) -> Measurement:
+    """
+    Times func() repeats times and measures its peak memory in one additional traced run,
+    so the tracing overhead does not distort the times
+    :param stage: pipeline stage the benchmark belongs to
+    :param name: name of the benchmark
+    :param func: func() -> Any, the measured code
+    :param repeats: number of timed runs, the best and the median are reported
+    :param rows: number of rows processed by func
+    :param setup: setup() -> None, called untimed before every run, e.g. to empty a target table
+    :return: the Measurement
+    """
+    times = []
+    for _ in range(repeats):
+        if setup is not None: setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    if setup is not None: setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return Measurement(stage, name, times, peak_memory, rows)
+
+
+def format_report(measurements: list[Measurement]) -> str:
+    """
+    :return: a plain text table of the measurements
+    """
+    header = ["stage", "benchmark", "best [s]", "median [s]", "rows/s", "peak memory [MB]"]
+    lines = [[m.stage,
+              m.name,
+              f"{m.get_best_time():.4f}",
+              f"{m.get_median_time():.4f}",
+              "-" if m.get_rows_per_second() is None else f"{m.get_rows_per_second():,.0f}",
+              f"{m.peak_memory / 2 ** 20:.2f}"] for m in measurements]
+
+    widths = [max(len(row[i]) for row in [header] + lines) for i in range(len(header))]
+    return "\n".join("  ".join(value.ljust(width) for value, width in zip(row, widths))
+                     for row in [header] + lines)
@@ -0,0 +1,117 @@
+import datetime as dt
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+
+class PmecologyStubServer:
+    def __init__(self, channel_count: int = 6, record_count: int = 10000,
+                 start: dt.datetime = dt.datetime(2023, 1, 1), interval: dt.timedelta = dt.timedelta(minutes=1),
+                 key: str = "benchmark", host: str = "127.0.0.1", port: int = 0, seed: int = 0,
+                 latency: float = 0):
+        """
+        A local stand-in for the Pmecology REST API serving generated sensor data on /v1/data/<key>.
+        Without parameters it answers with the station's metadata, with timestamp, records
+        and descending parameters it returns the matching history, like the real API.
+        :param channel_count: number of sensor channels
+        :param record_count: number of generated data points
+        :param start: timestamp of the first data point
+        :param interval: time between consecutive data points
+        :param key: api key of the station
+        :param host: interface to listen on
+        :param port: port to listen on, 0 picks a free one
+        :param seed: random seed of the generated values
+        :param latency: seconds every response is delayed by, to simulate a remote server
+        """
+        self.key: str = key
+        self.channels: dict = {str(i): {"name": f"channel_{i}", "unit": "-"} for i in range(channel_count)}
+
+        rng = random.Random(seed)
+        self.timestamps: list[dt.datetime] = [start + i * interval for i in range(record_count)]
+        self.history: list[dict] = [{
+            "timestamp": timestamp.isoformat(),
+            "values": {channel: round(rng.uniform(-50, 50), 2) for channel in self.channels}
+        } for timestamp in self.timestamps]
+
+        self.latency: float = latency
+        self.request_count: int = 0
+        self.server: ThreadingHTTPServer = ThreadingHTTPServer((host, port), self.__create_handler())
+        self.thread: threading.Thread = None
+
+    def get_api_url(self) -> str:
+        """
+        :return: the api_url to pass to PmecologyRestApiConnector
+        """
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1/data/"
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def get_response(self, path: str, query: str) -> tuple[int, dict]:
+        """
+        :return: (status code, json body) of the answer to a request
+        """
+        self.request_count += 1
+        if path.rstrip("/") != f"/v1/data/{self.key}":
+            return 404, {"error": "unknown station"}
+
+        parameters = {name: values[0] for name, values in parse_qs(query.lstrip("?")).items()}
+        if len(parameters) == 0:
+            return 200, {
+                "channels": self.channels,
+                "first_record_timestamp": self.timestamps[0].isoformat() if self.timestamps else None,
+                "last_record_timestamp": self.timestamps[-1].isoformat() if self.timestamps else None
+            }
+
+        history = self.history
+        if "timestamp" in parameters:
+            timestamp = dt.datetime.fromisoformat(parameters["timestamp"])
+            history = [self.history[i] for i, t in enumerate(self.timestamps) if t > timestamp]
+        if parameters.get("descending") == "true":
+            history = history[::-1]
+        if "records" in parameters:
+            history = history[:int(parameters["records"])]
+
+        return 200, {"history": history}
+
+    def __create_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keeps connections alive like the real api
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if stub.latency > 0:
+                    time.sleep(stub.latency)
+                url = urlsplit(self.path)
+                status, body = stub.get_response(url.path, url.query)
+                content = json.dumps(body).encode("utf-8")
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,283 @@
+"""
+Benchmarks of the fetch, diff, transform and insert stages of a synchronisation,
+run against local stand-ins (SQLiteConnector and PmecologyStubServer) instead of live servers.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks --rows 10000 100000 --width 8 --change-ratio 0.05
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import tempfile
+
+from benchmarks.measurement import Measurement, measure, format_report
+from benchmarks.pmecology_stub_server import PmecologyStubServer
+from benchmarks.table_generators import generate_table, mutate_table, get_create_table_statement
+from connectors.pmecology_rest_api_connector import PmecologyRestApiConnector
+from connectors.sqlite_connector import SQLiteConnector
+from data_sources.database_data_source import DatabaseDataSource
+from data_sources.pmecology_backfill import PmecologyBackfill
+from data_sources.diff_engine import DiffEngine, DIFF_MODE_HASH, DIFF_MODE_POSITIONAL
+from data_sources.string_normalizer import StringNormalizer
+from data_types.columnar_database_table import ColumnarDatabaseTable
+from data_types.database_table import DatabaseTable
+from metrics.instrumentation import REGISTRY
+from state_controllers.database_table_state_controller import DatabaseTableStateController
+from state_controllers.partitioned_database_table_state_controller import PartitionedDatabaseTableStateController
+from state_controllers.pmecology_state_controller import PmecologyStateController
+from unidecode import unidecode
+
+STAGES = ["build", "fetch", "diff", "transform", "insert", "cycle", "rest"]
+
+
+def create_table(connector: SQLiteConnector, table: DatabaseTable) -> None:
+    connector.execute_sql_statement(f"DROP TABLE IF EXISTS {table.get_table_name()}")
+    connector.execute_sql_statement(get_create_table_statement(table))
+
+
+def load_table(connector: SQLiteConnector, table: DatabaseTable) -> None:
+    create_table(connector, table)
+    connector.insert_data(table)
+
+
+def benchmark_build(source: DatabaseTable, repeats: int) -> list[Measurement]:
+    rows = source.get_table()
+    header = source.get_header_row()
+
+    def build(table_class):
+        return lambda: table_class("build", header).append_table(rows)
+
+    return [measure("build", "DatabaseTable.append_table", build(DatabaseTable), repeats, len(rows)),
+            measure("build", "ColumnarDatabaseTable.append_table", build(ColumnarDatabaseTable), repeats, len(rows))]
+
+
+def benchmark_fetch(connector: SQLiteConnector, table_name: str, row_count: int, repeats: int,
+                    partitions: int) -> list[Measurement]:
+    query = f"SELECT * FROM {table_name} ORDER BY id"
+
+    def stream():
+        for _ in connector.stream_sql_query(query, table_name): pass
+
+    def fetch_columnar():
+        connector.table_class = ColumnarDatabaseTable
+        try:
+            connector.execute_sql_query(query, table_name)
+        finally:
+            connector.table_class = DatabaseTable
+
+    measurements = [measure("fetch", "execute_sql_query", lambda: connector.execute_sql_query(query, table_name),
+                            repeats, row_count),
+                    measure("fetch", "execute_sql_query columnar", fetch_columnar, repeats, row_count),
+                    measure("fetch", "stream_sql_query", stream, repeats, row_count)]
+
+    # sqlite serializes readers of a database file less than a server would, treat this as a lower bound
+    connector.use_connection_pool(1, partitions)
+    partitioned = PartitionedDatabaseTableStateController(
+        connector, table_name, f"SELECT * FROM {table_name} WHERE {{partition_condition}} ORDER BY id", "id", partitions)
+    try:
+        measurements.append(measure("fetch", f"partitioned get_state x{partitions}", partitioned.get_state,
+                                    repeats, row_count))
+    finally:
+        connector.pool.close()
+        connector.pool = None
+
+    return measurements
+
+
+def benchmark_diff(target: DatabaseTable, source: DatabaseTable, repeats: int) -> list[Measurement]:
+    row_count = source.get_row_count()
+    table_name = source.get_table_name()
+    header = source.get_header_row()
+
+    def hash_diff(normalize):
+        return lambda: DiffEngine(["id"], normalize).diff(target, source, table_name, header)
+
+    def positional_diff(normalize):
+        return lambda: DiffEngine(["id"], normalize).positional_diff(target, source, table_name)
+
+    def compare_states():
+        data_source = DatabaseDataSource(table_name, None, None, ["id"], DIFF_MODE_POSITIONAL)
+        data_source.compare_states(target, source)
+
+    def columnar(state: DatabaseTable) -> ColumnarDatabaseTable:
+        table = ColumnarDatabaseTable(table_name, header)
+        table.append_table(state.get_table())
+        return table
+
+    columnar_target, columnar_source = columnar(target), columnar(source)
+
+    def columnar_hash_diff():
+        DiffEngine(["id"]).diff(columnar_target, columnar_source, table_name, header)
+
+    return [measure("diff", "hash", hash_diff(None), repeats, row_count),
+            measure("diff", "hash columnar", columnar_hash_diff, repeats, row_count),
+            measure("diff", "hash unidecode", hash_diff(unidecode), repeats, row_count),
+            measure("diff", "hash unidecode cached", hash_diff(StringNormalizer(unidecode)), repeats, row_count),
+            measure("diff", "positional unidecode cached", positional_diff(StringNormalizer(unidecode)),
+                    repeats, row_count),
+            measure("diff", "compare_states", compare_states, repeats, row_count)]
+
+
+def benchmark_transform(connector: SQLiteConnector, source: DatabaseTable, repeats: int) -> list[Measurement]:
+    return [measure("transform", "serialize_table", lambda: connector.serialize_table(source),
+                    repeats, source.get_row_count())]
+
+
+def benchmark_insert(connector: SQLiteConnector, source: DatabaseTable, repeats: int) -> list[Measurement]:
+    row_count = source.get_row_count()
+    target = DatabaseTable("insert_target", source.get_header_row(), key_columns=["id"])
+    target.append_table(source.get_table())
+
+    def reset():
+        create_table(connector, target)
+
+    def reset_filled():
+        load_table(connector, target)
+
+    return [measure("insert", "insert_data", lambda: connector.insert_data(target), repeats, row_count, reset),
+            measure("insert", "insert_data_literal", lambda: connector.insert_data_literal(target),
+                    repeats, row_count, reset),
+            measure("insert", "upsert_data", lambda: connector.upsert_data(target), repeats, row_count, reset_filled)]
+
+
+def benchmark_cycle(connector: SQLiteConnector, source: DatabaseTable, target: DatabaseTable,
+                    repeats: int, stream_chunk_size: int) -> list[Measurement]:
+    source_name, target_name = source.get_table_name(), target.get_table_name()
+    source_controller = DatabaseTableStateController(connector, source_name, f"SELECT * FROM {source_name} ORDER BY id")
+    target_controller = DatabaseTableStateController(connector, target_name, f"SELECT * FROM {target_name} ORDER BY id")
+
+    def cycle(diff_mode: str, chunk_size: int = None):
+        def run():
+            data_source = DatabaseDataSource(target_name, source_controller, target_controller, ["id"], diff_mode)
+            data_source.stream_chunk_size = chunk_size
+            data_source.apply_change(data_source.get_change_set(), connector)
+        return run
+
+    # the positional mode only appends, it is measured on a target holding a prefix of the source
+    row_count = source.get_row_count()
+    prefix = DatabaseTable(target_name, source.get_header_row(), key_columns=["id"])
+    prefix.append_table(source.get_table()[:row_count * 19 // 20])
+
+    def reset():
+        load_table(connector, target)
+
+    def reset_prefix():
+        load_table(connector, prefix)
+
+    return [measure("cycle", "hash", cycle(DIFF_MODE_HASH), repeats, row_count, reset),
+            measure("cycle", "hash streamed", cycle(DIFF_MODE_HASH, stream_chunk_size), repeats, row_count, reset),
+            measure("cycle", "positional append", cycle(DIFF_MODE_POSITIONAL), repeats, row_count, reset_prefix)]
+
+
+def benchmark_rest(row_count: int, channel_count: int, repeats: int) -> list[Measurement]:
+    start = dt.datetime(2023, 1, 1)
+    with PmecologyStubServer(channel_count, row_count, start) as server:
+        api_connector = PmecologyRestApiConnector(server.key, server.get_api_url())
+        state_controller = PmecologyStateController(api_connector, "pmecology")
+
+        def fetch():
+            state_controller.get_state(timestamp=start - dt.timedelta(minutes=1), records=row_count, descending=False)
+
+        def poll():
+            # a polling cycle: the last timestamp from the cached metadata and the newest data point
+            for _ in range(100):
+                api_connector.get_sensor_data("pmecology", api_connector.get_last_recorded_timestamp()
+                                              - dt.timedelta(minutes=10), 1, True)
+
+        try:
+            return [measure("rest", "PmecologyStateController.get_state", fetch, repeats, row_count),
+                    measure("rest", "poll x100", poll, repeats, 100)]
+        finally:
+            api_connector.close()
+
+
+def benchmark_backfill(row_count: int, channel_count: int, repeats: int) -> list[Measurement]:
+    # a latency of 20 ms per request stands in for a remote api, where the concurrent windows pay off
+    with PmecologyStubServer(channel_count, row_count, latency=0.02) as server:
+        api_connector = PmecologyRestApiConnector(server.key, server.get_api_url())
+
+        def backfill(workers: int):
+            return lambda: PmecologyBackfill(api_connector, "pmecology", window=dt.timedelta(hours=12),
+                                             workers=workers, page_size=720).run(lambda table: None)
+
+        try:
+            return [measure("rest", "PmecologyBackfill 1 worker", backfill(1), repeats, row_count),
+                    measure("rest", "PmecologyBackfill 8 workers", backfill(8), repeats, row_count)]
+        finally:
+            api_connector.close()
+
+
+def run(row_count: int, width: int, string_ratio: float, change_ratio: float, repeats: int, seed: int,
+        stages: list[str], stream_chunk_size: int, partitions: int, directory: str) -> list[Measurement]:
+    """
+    Runs the chosen stages for a single table size
+    :return: measurements of all of the run benchmarks
+    """
+    source = generate_table("source_table", row_count, width, string_ratio, seed=seed)
+    target = mutate_table(source, change_ratio, seed + 1, string_ratio)
+    target.name = "target_table"
+
+    connector = SQLiteConnector(os.path.join(directory, f"benchmark_{row_count}.sqlite"))
+    connector.connect(1)
+
+    measurements = []
+    try:
+        if "build" in stages:
+            measurements += benchmark_build(source, repeats)
+        if "fetch" in stages or "cycle" in stages:
+            load_table(connector, source)
+        if "fetch" in stages:
+            measurements += benchmark_fetch(connector, source.get_table_name(), row_count, repeats, partitions)
+        if "diff" in stages:
+            measurements += benchmark_diff(target, source, repeats)
+        if "transform" in stages:
+            measurements += benchmark_transform(connector, source, repeats)
+        if "insert" in stages:
+            measurements += benchmark_insert(connector, source, repeats)
+        if "cycle" in stages:
+            measurements += benchmark_cycle(connector, source, target, repeats, stream_chunk_size)
+        if "rest" in stages:
+            measurements += benchmark_rest(row_count, width, repeats)
+            measurements += benchmark_backfill(row_count, width, repeats)
+    finally:
+        connector.disconnect()
+
+    for measurement in measurements:
+        measurement.name += f" [{row_count} rows]"
+    return measurements
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks PyDBSync against local stand-ins")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000], help="row counts of the tables")
+    parser.add_argument("--width", type=int, default=8, help="number of columns including the key")
+    parser.add_argument("--string-ratio", type=float, default=0.3, help="share of string columns")
+    parser.add_argument("--change-ratio", type=float, default=0.05, help="share of changed rows in the target")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs of every benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--stream-chunk-size", type=int, default=10000)
+    parser.add_argument("--partitions", type=int, default=4, help="partitions of the partitioned fetch")
+    parser.add_argument("--json", help="file to write the measurements to as json, e.g. to compare runs")
+    parser.add_argument("--metrics", help="file to write the per stage metrics to in the Prometheus text format")
+    args = parser.parse_args()
+
+    measurements = []
+    with tempfile.TemporaryDirectory() as directory:
+        for row_count in args.rows:
+            measurements += run(row_count, args.width, args.string_ratio, args.change_ratio, args.repeats,
+                                args.seed, args.stages, args.stream_chunk_size, args.partitions, directory)
+
+    print(format_report(measurements))
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump([measurement.to_dict() for measurement in measurements], f, indent=2)
+
+    if args.metrics is not None:
+        REGISTRY.write_text_file(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
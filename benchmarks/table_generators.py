@@ -0,0 +1,89 @@
+import datetime as dt
+import random
+import string
+
+from data_types.database_table import DatabaseTable
+
+_POLISH_WORDS = ["zażółć", "gęślą", "jaźń", "łódź", "źdźbło", "pszczółka", "żółw", "ćma", "świerszcz", "dąb"]
+
+
+def generate_header(width: int) -> list[str]:
+    """
+    :return: header row of a generated table, the first column "id" is the key
+    """
+    return ["id"] + [f"col_{i}" for i in range(1, width)]
+
+
+def generate_value(column: int, rng: random.Random, string_ratio: float, polish: bool):
+    """
+    Generates a value of the column's type, the type of a column is decided by its index
+    """
+    if column % 10 < string_ratio * 10:
+        if polish:
+            return " ".join(rng.choice(_POLISH_WORDS) for _ in range(3))
+        return "".join(rng.choice(string.ascii_letters) for _ in range(12))
+    if column % 3 == 0:
+        return rng.randint(-10 ** 6, 10 ** 6)
+    if column % 3 == 1:
+        return round(rng.uniform(-1000, 1000), 3)
+    return dt.datetime(2023, 1, 1) + dt.timedelta(minutes=rng.randint(0, 10 ** 6))
+
+
+def generate_table(name: str, row_count: int, width: int = 8, string_ratio: float = 0.3,
+                   polish: bool = True, seed: int = 0, table_class: type = DatabaseTable) -> DatabaseTable:
+    """
+    Generates a table with a unique integer id column and width - 1 columns of mixed types
+    :param name: name of the table
+    :param row_count: number of rows
+    :param width: number of columns including the id
+    :param string_ratio: share of the non-key columns holding strings
+    :param polish: use strings with diacritics, which unidecode has to transliterate
+    :param seed: random seed, the same arguments always generate the same table
+    :param table_class: DatabaseTable or one of its storage variants
+    """
+    rng = random.Random(seed)
+    table = table_class(name, generate_header(width), key_columns=["id"])
+    table.append_table([[i] + [generate_value(j, rng, string_ratio, polish) for j in range(1, width)]
+                        for i in range(row_count)])
+    return table
+
+
+def mutate_table(table: DatabaseTable, change_ratio: float, seed: int = 1,
+                 string_ratio: float = 0.3, polish: bool = True) -> DatabaseTable:
+    """
+    Returns a copy of table in which change_ratio of the rows were changed, split evenly
+    between updated, deleted and newly inserted rows
+    """
+    rng = random.Random(seed)
+    rows = [list(row) for row in table.get_table()]
+    change_count = int(len(rows) * change_ratio)
+    next_id = max((row[0] for row in rows), default=-1) + 1
+
+    for _ in range(change_count // 3):
+        row = rows[rng.randrange(len(rows))]
+        column = rng.randrange(1, table.column_count)
+        row[column] = generate_value(column, rng, string_ratio, polish)
+
+    for _ in range(change_count // 3):
+        rows.pop(rng.randrange(len(rows)))
+
+    for _ in range(change_count - 2 * (change_count // 3)):
+        rows.append([next_id] + [generate_value(j, rng, string_ratio, polish) for j in range(1, table.column_count)])
+        next_id += 1
+
+    mutated = DatabaseTable(table.get_table_name(), table.get_header_row(), key_columns=table.get_key_columns())
+    mutated.append_table(rows)
+    return mutated
+
+
+def get_create_table_statement(table: DatabaseTable) -> str:
+    """
+    :return: CREATE TABLE statement for the generated table in sqlite
+    """
+    sample = table[0] if table.get_row_count() > 0 else [None] * table.column_count
+    sql_types = {int: "INTEGER", float: "REAL", str: "TEXT", dt.datetime: "TIMESTAMP"}
+
+    columns = [f"{column} {sql_types.get(type(value), 'TEXT')}"
+               for column, value in zip(table.get_header_row(), sample)]
+    columns[0] += " PRIMARY KEY"
+    return f"CREATE TABLE {table.get_table_name()} ({', '.join(columns)})"
@@ -0,0 +1,103 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable
+
+from connectors.database_connector import DatabaseConnector
+from data_types.change_set import ChangeSet
+from data_types.database_table import DatabaseTable
+
+_END_OF_STREAM = object()
+
+
+class AsyncDatabaseConnector:
+    def __init__(self, db_connector: DatabaseConnector, max_workers: int = None):
+        """
+        asyncio variant of DatabaseConnector. The blocking DBAPI calls of db_connector run in a thread pool
+        of its own, so a slow database only occupies its own threads and never the event loop.
+        :param db_connector: the wrapped connector, configure its pool before wrapping it
+        :param max_workers: number of calls running at the same time. By default the max_size of the
+        connector's pool, or 1 without a pool, as a single connection must not be used by two threads at once
+        """
+        if max_workers is None:
+            max_workers = 1 if db_connector.pool is None else db_connector.pool.max_size
+
+        self.db_connector: DatabaseConnector = db_connector
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers, thread_name_prefix="async_db")
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """
+        Runs a blocking call in the connector's thread pool
+        :param func: e.g. a method of db_connector
+        :return: the result of func(*args, **kwargs)
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor,
+                                                                functools.partial(func, *args, **kwargs))
+
+    async def connect(self, reconnect_wait_time: int = None) -> None:
+        """
+        Connects the wrapped connector. Every attempt runs in the thread pool, the waits in between
+        the attempts (see the connector's retry_policy) do not hold a thread.
+        :param reconnect_wait_time: seconds to wait after the first failed attempt, the connector's by default
+        """
+        self.db_connector.connection = await self.db_connector.retry_policy.call_async(
+            lambda: self.run(self.db_connector.open_connection), self.get_metrics_label(),
+            initial_delay=self.db_connector.reconnect_wait_time if reconnect_wait_time is None else reconnect_wait_time,
+            description=f"connecting to {self.get_metrics_label()}")
+
+    async def ensure_connection(self) -> None:
+        await self.run(self.db_connector.ensure_connection)
+
+    async def execute_sql_query(self, query: str, table_name: str, params: list | tuple = None) -> DatabaseTable:
+        return await self.run(self.db_connector.execute_sql_query, query, table_name, params)
+
+    async def stream_sql_query(self, query: str, table_name: str, chunk_size: int = None,
+                               params: list | tuple = None) -> AsyncIterator[DatabaseTable]:
+        """
+        See DatabaseConnector.stream_sql_query. Every chunk is fetched in the thread pool, the cursor
+        (and a pooled connection) is held between the chunks until the iterator is exhausted or closed.
+        """
+        chunks = self.db_connector.stream_sql_query(query, table_name, chunk_size, params)
+        try:
+            while True:
+                chunk = await self.run(next, chunks, _END_OF_STREAM)
+                if chunk is _END_OF_STREAM: break
+                yield chunk
+        finally:
+            await self.run(chunks.close)
+
+    async def execute_sql_statement(self, statement: str) -> None:
+        await self.run(self.db_connector.execute_sql_statement, statement)
+
+    async def insert_data(self, data: DatabaseTable, batch_size: int = None) -> None:
+        await self.run(self.db_connector.insert_data, data, batch_size)
+
+    async def upsert_data(self, data: DatabaseTable, key_columns: list[str] | tuple[str] = None,
+                          batch_size: int = None) -> None:
+        await self.run(self.db_connector.upsert_data, data, key_columns, batch_size)
+
+    async def delete_data(self, data: DatabaseTable, key_columns: list[str] | tuple[str] = None,
+                          batch_size: int = None) -> None:
+        await self.run(self.db_connector.delete_data, data, key_columns, batch_size)
+
+    async def delete_rows(self, data: DatabaseTable, batch_size: int = None) -> None:
+        await self.run(self.db_connector.delete_rows, data, batch_size)
+
+    async def write_change_set(self, change_set: ChangeSet, key_columns: list[str] | tuple[str] = None,
+                               batch_size: int = None) -> None:
+        await self.run(self.db_connector.write_change_set, change_set, key_columns, batch_size)
+
+    async def materialize_query(self, query: str, table_name: str, temporary: bool = True) -> str:
+        return await self.run(self.db_connector.materialize_query, query, table_name, temporary)
+
+    async def disconnect(self) -> None:
+        """
+        Disconnects the wrapped connector and shuts the thread pool down
+        """
+        try:
+            await self.run(self.db_connector.disconnect)
+        finally:
+            self.executor.shutdown(wait=False)
+
+    def get_metrics_label(self) -> str:
+        return self.db_connector.get_metrics_label()
@@ -0,0 +1,119 @@
+import asyncio
+import datetime as dt
+import functools
+import json
+from concurrent.futures import Executor
+
+import requests as rq
+
+from connectors.pmecology_rest_api_connector import PmecologyRestApiConnector, UnknownChannelException
+from data_types.database_table import DatabaseTable
+from metrics.instrumentation import measure_stage, ROWS, STAGE_REST
+
+
+class AsyncPmecologyRestApiConnector:
+    def __init__(self, api_connector: PmecologyRestApiConnector, executor: Executor = None):
+        """
+        asyncio variant of PmecologyRestApiConnector. The requests are sent with the connector's session
+        in executor threads, retries (see the connector's retry_policy) and rate limiting
+        wait on the event loop without holding a thread.
+        The metadata cache, the column map and the rate limiter are shared with api_connector.
+        :param api_connector: connector of the station
+        :param executor: executor the requests are sent from, the event loop's default executor if None
+        """
+        self.api_connector: PmecologyRestApiConnector = api_connector
+        self.executor: Executor = executor
+
+    def get_metrics_label(self) -> str:
+        return self.api_connector.get_metrics_label()
+
+    async def get_persistently(self, request_string: str, retry_wait_time: float = None, table_name: str = "",
+                               deadline: float = None) -> rq.Response:
+        """
+        See PmecologyRestApiConnector.get_persistently, uses the api connector's retry_policy
+        """
+        return await self.api_connector.retry_policy.call_async(
+            lambda: self.__get(request_string, table_name), self.get_metrics_label(),
+            deadline, retry_wait_time, f"request {request_string}")
+
+    async def __get(self, request_string: str, table_name: str) -> rq.Response:
+        if self.api_connector.rate_limiter is not None:
+            await asyncio.sleep(self.api_connector.rate_limiter.reserve())
+
+        with measure_stage(STAGE_REST, self.get_metrics_label(), table_name) as timer:
+            req = await asyncio.get_running_loop().run_in_executor(
+                self.executor, functools.partial(self.api_connector.session.get, request_string,
+                                                 timeout=self.api_connector.request_timeout))
+            timer.add_bytes(len(req.content))
+            self.api_connector.check_status(req, request_string)
+        return req
+
+    async def get_metadata(self) -> dict:
+        """
+        :return: the station's root document, downloaded at most once per metadata_ttl seconds
+        """
+        if self.api_connector.is_metadata_expired():
+            return await self.refresh_metadata()
+        return self.api_connector.get_metadata()
+
+    async def refresh_metadata(self) -> dict:
+        req = await self.get_persistently(self.api_connector.request_string)
+        return self.api_connector.set_metadata(json.loads(req.text))
+
+    async def get_first_recorded_timestamp(self) -> dt.datetime:
+        return dt.datetime.fromisoformat((await self.get_metadata())["first_record_timestamp"])
+
+    async def get_last_recorded_timestamp(self) -> dt.datetime:
+        return dt.datetime.fromisoformat((await self.get_metadata())["last_record_timestamp"])
+
+    async def get_channels_data(self) -> dict:
+        return (await self.get_metadata())["channels"]
+
+    async def get_sensor_data(self, table_name: str,
+                              timestamp: dt.datetime = None,
+                              records: int = None,
+                              descending: bool = None) -> DatabaseTable:
+        """
+        See PmecologyRestApiConnector.get_sensor_data
+        """
+        timestamp += dt.timedelta(seconds=1)
+
+        raw_data = await self.__get_raw_sensor_data(timestamp, records, descending, table_name)
+
+        if len(raw_data) <= 0: return None
+
+        return await self.__build_sensor_table(table_name, raw_data)
+
+    async def get_sensor_data_between(self, table_name: str, start: dt.datetime, end: dt.datetime,
+                                      page_size: int = 1000) -> DatabaseTable:
+        """
+        See PmecologyRestApiConnector.get_sensor_data_between
+        """
+        raw_data = []
+        cursor, last_page = start, False
+        while not last_page:
+            page = await self.__get_raw_sensor_data(cursor, page_size, False, table_name)
+            page, cursor, last_page = self.api_connector.trim_page(page, page_size, end)
+            raw_data += page
+
+        return await self.__build_sensor_table(table_name, raw_data)
+
+    async def __get_raw_sensor_data(self,
+                                    timestamp: dt.datetime = None,
+                                    records: int = None,
+                                    descending: bool = None,
+                                    table_name: str = "") -> list[dict]:
+        req = await self.get_persistently(self.api_connector.get_sensor_data_url(timestamp, records, descending),
+                                          table_name=table_name)
+        data_points = json.loads(req.text)["history"]
+        ROWS.inc(len(data_points), stage=STAGE_REST, connector=self.get_metrics_label(), table=table_name)
+
+        return data_points
+
+    async def __build_sensor_table(self, table_name: str, raw_data: list[dict]) -> DatabaseTable:
+        try:
+            return self.api_connector.build_sensor_table(table_name, raw_data)
+        except UnknownChannelException:
+            # a channel was added since the metadata was cached
+            await self.refresh_metadata()
+            return self.api_connector.build_sensor_table(table_name, raw_data)
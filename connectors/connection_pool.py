@@ -0,0 +1,138 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+
+class ConnectionPool:
+    def __init__(self, open_connection: Callable, is_open: Callable,
+                 min_size: int = 1, max_size: int = 5, checkout_timeout: float = None):
+        """
+        A thread safe pool of DBAPI connections
+        :param open_connection: func() -> connection, opens a new connection
+        :param is_open: func(connection) -> bool, health check run on every checkout
+        :param min_size: number of connections opened up front and kept open
+        :param max_size: maximum number of connections, checkouts wait when all of them are in use
+        :param checkout_timeout: seconds to wait for a free connection, None to wait indefinitely
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ConnectionPoolException(f"Invalid pool size min={min_size} max={max_size}")
+
+        self.open_connection: Callable = open_connection
+        self.is_open: Callable = is_open
+        self.min_size: int = min_size
+        self.max_size: int = max_size
+        self.checkout_timeout: float = checkout_timeout
+
+        self.__idle: list = []
+        self.__size: int = 0  # idle and checked out connections
+        self.__closed: bool = False
+        self.__condition = threading.Condition()
+
+        for _ in range(min_size):
+            self.__idle.append(self.open_connection())
+            self.__size += 1
+
+    @contextmanager
+    def checkout(self):
+        """
+        Context manager lending a healthy connection, which is checked back in on exit
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def acquire(self):
+        """
+        Checks out a healthy connection, opening a new one if none is idle and the pool is not full.
+        Every acquire has to be followed by release.
+        :return: connection object adhering to python's DBAPI
+        :raises: ConnectionPoolException when the pool is closed or checkout_timeout passes
+        """
+        deadline = None if self.checkout_timeout is None else time.monotonic() + self.checkout_timeout
+
+        with self.__condition:
+            while True:
+                if self.__closed:
+                    raise ConnectionPoolException("The connection pool is closed")
+
+                if len(self.__idle) > 0:
+                    connection = self.__idle.pop()
+                    if self.is_open(connection):
+                        return connection
+                    # dropped while idle, its slot is reused below
+                    self.__size -= 1
+                    self.__close_quietly(connection)
+
+                if self.__size < self.max_size:
+                    self.__size += 1
+                    break
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise ConnectionPoolException(f"No connection available after {self.checkout_timeout}s")
+                self.__condition.wait(remaining)
+
+        # opening a connection can take long, do it outside of the lock
+        try:
+            return self.open_connection()
+        except BaseException:
+            with self.__condition:
+                self.__size -= 1
+                self.__condition.notify()
+            raise
+
+    def release(self, connection) -> None:
+        """
+        Checks a connection back in, rolling back anything left uncommitted.
+        Closed connections are dropped from the pool.
+        :param connection: connection returned by acquire
+        """
+        healthy = self.is_open(connection)
+        if healthy:
+            try:
+                # end the transaction left open by queries, so it does not hold locks while idle
+                connection.rollback()
+            except Exception:
+                healthy = False
+
+        with self.__condition:
+            if healthy and not self.__closed:
+                self.__idle.append(connection)
+            else:
+                self.__size -= 1
+                self.__close_quietly(connection)
+            self.__condition.notify()
+
+    def close(self) -> None:
+        """
+        Closes the idle connections and makes checked out connections close on release
+        """
+        with self.__condition:
+            self.__closed = True
+            for connection in self.__idle:
+                self.__size -= 1
+                self.__close_quietly(connection)
+            self.__idle.clear()
+            self.__condition.notify_all()
+
+    def get_size(self) -> int:
+        return self.__size
+
+    def get_idle_count(self) -> int:
+        return len(self.__idle)
+
+    @staticmethod
+    def __close_quietly(connection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+class ConnectionPoolException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
@@ -1,16 +1,25 @@
-from time import sleep
-from typing import Callable
+import datetime as dt
+import decimal
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Iterator
 
-import types
 import support_functions as sf
+from connectors.connection_pool import ConnectionPool
+from data_types.change_set import ChangeSet
 from data_types.database_table import DatabaseTable
+from data_types.database_table_schema import DatabaseTableSchema
+from metrics.instrumentation import measure_stage, STAGE_CONNECT, STAGE_QUERY, STAGE_FETCH, STAGE_TRANSFORM, \
+    STAGE_INSERT, STAGE_UPSERT, STAGE_DELETE
+from resilience.backoff import ExponentialBackoff
+from resilience.retry_policy import RetryPolicy
 
 class NoneType:
     pass
 
 class DatabaseConnector:
     def __init__(self, login_details: dict, connect: Callable,
-                 type_mapping: dict = {}, type_transforms: dict = {}) -> None:
+                 type_mapping: dict = {}, type_transforms: dict = {}, placeholder: str = "%s") -> None:
         """
         :param login_details: dictionary of login details in format:
         {
@@ -23,46 +32,306 @@ class DatabaseConnector:
         :param connect: a function returning the connection object adhering to python's DBAPI
         :param type_mapping: a dictionary mapping types to their respective names in a specific DBMS
         :param type_transforms: a dictionary mapping data types to strings in format "foo{arg}bar"
-        on which .format(arg: element) will be called for every element of that type before inserting.
-        Alternatively a Callable object can be used as func(element) -> str
+        on which .format(arg: element) will be called for every element of that type before inserting
+        with insert_data_literal.
+        Alternatively any Callable object (function, builtin, partial...) can be used as func(element) -> str
         If a type is not present str(element) will be called
         Use the database_connector.NoneType class to decide what to do with None types
+        :param placeholder: the driver's placeholder for a bound parameter, "%s" for format and "?" for qmark paramstyle
         """
 
         self.type_transforms = type_transforms
         self.type_mapping = type_mapping
+
+        # type -> compiled func(element) -> str, built from type_transforms on first use
+        self.__type_serializers: dict[type, Callable] = {}
+        # types row -> compiled column serializers
+        self.__column_serializers: dict[tuple, list[Callable]] = {}
+        self.placeholder: str = placeholder
         self.connect_func: Callable = connect
         self.login_details: dict = login_details
 
         # connection object adhering to python's DBAPI
         self.connection = None
 
-        # time in seconds to wait in between reconnect attempts
+        # pool of connections used instead of self.connection once use_connection_pool is called
+        self.pool: ConnectionPool = None
+
+        # time in seconds to wait after the first failed connection attempt, doubled with every further one
         self.reconnect_wait_time = 10
 
+        # retries of failed connection attempts, connecting is given up after 5 minutes.
+        # Only DBAPI OperationalErrors and InterfaceErrors and connections which are not open are retried
+        self.retry_policy: RetryPolicy = RetryPolicy(ExponentialBackoff(1, 60), deadline=300,
+                                                     retryable=self.is_retryable_connect_error)
+
+        # number of rows fetched from the server at a time, also the maximum size of streamed chunks
+        self.fetch_chunk_size = 10000
+
+        # number of rows sent to the server at a time by insert_data
+        self.insert_batch_size = 1000
+
+        # DatabaseTable class query results are stored in, e.g. ColumnarDatabaseTable for columnar storage
+        self.table_class: type = DatabaseTable
+
+        # checksums from get_range_checksum can only be compared between connectors of the same dialect
+        self.checksum_dialect: str = None
+
     def connect(self, reconnect_wait_time: int):
         """Assures that a connection is established after this method returns,
-        if connection attempt is unsuccessful retry after reconnect_wait_time seconds"""
-        sf.print_to_console(f"Connecting to "
-                            f"{self.get_login_details()['user']}"
-                            f"@{self.get_login_details()['host']} ...")
-        self.connection = self.connect_func()
-        while not self.__is_connection_open():
-            sleep(reconnect_wait_time)
-            sf.print_to_console(f"Reconnecting to "
-                                f"{self.get_login_details()['user']}"
-                                f"@{self.get_login_details()['host']} ...")
-            self.connection = self.connect_func()
-
-    def insert_data(self, data: DatabaseTable):
-        columns: str = ", ".join(data.get_header_row())
-        rows: str = ""
+        if connection attempt is unsuccessful retry after reconnect_wait_time seconds with exponential backoff.
+        Raises RetryException if no attempt succeeds within retry_policy's deadline"""
+        self.connection = self.__open_connection(reconnect_wait_time)
+
+    def open_connection(self):
+        """
+        Makes a single attempt to open a new connection
+        :return: the open connection
+        :raises: ConnectionNotOpenException if the connection is not open, or the driver's exception
+        """
+        with measure_stage(STAGE_CONNECT, self.get_metrics_label()):
+            connection = self.connect_func()
+            if not self.__is_connection_open(connection):
+                raise ConnectionNotOpenException(f"Connection to {self.get_metrics_label()} is not open")
+        return connection
+
+    @staticmethod
+    def is_retryable_connect_error(exception: Exception) -> bool:
+        """
+        :return: whether a failed connection attempt may succeed when repeated
+        """
+        # the DBAPI requires these names of every driver's exception classes
+        return isinstance(exception, ConnectionNotOpenException) or \
+            type(exception).__name__ in ("OperationalError", "InterfaceError")
+
+    def use_connection_pool(self, min_size: int = 1, max_size: int = 5, checkout_timeout: float = None) -> None:
+        """
+        Switches the connector to a thread safe pool of connections. Afterwards every query and write
+        checks a connection out of the pool, so the connector can be shared by multiple threads.
+        :param min_size: number of connections opened up front
+        :param max_size: maximum number of simultaneously open connections
+        :param checkout_timeout: seconds to wait for a free connection, None to wait indefinitely
+        """
+        if self.pool is not None:
+            self.pool.close()
+
+        self.pool = ConnectionPool(lambda: self.__open_connection(self.reconnect_wait_time),
+                                   self.__is_connection_open,
+                                   min_size, max_size, checkout_timeout)
+
+    @contextmanager
+    def checkout(self):
+        """
+        Context manager lending a connection, checked back in on exit.
+        Without a pool it lends self.connection, connecting first if needed.
+        """
+        if self.pool is None:
+            self.ensure_connection()
+            yield self.connection
+            return
+
+        with self.pool.checkout() as connection:
+            yield connection
+
+    def insert_data(self, data: DatabaseTable, batch_size: int = None) -> None:
+        """
+        Inserts the rows of data into the table of the same name using bound parameters,
+        batch_size rows at a time. All batches are committed together.
+        :param data: DatabaseTable to insert, its header row has to match the target columns
+        :param batch_size: number of rows sent to the server at once, insert_batch_size by default
+        """
+        if data.get_row_count() == 0: return
+
+        with measure_stage(STAGE_INSERT, self.get_metrics_label(), data.get_table_name()) as timer, \
+                self.checkout() as connection, connection.cursor() as cur:
+            self.execute_insert(cur, data, batch_size)
+            connection.commit()
+            timer.add_rows(data.get_row_count())
+
+    def execute_insert(self, cur, data: DatabaseTable, batch_size: int = None) -> None:
+        """
+        Sends the rows of data to the server batch_size rows at a time without committing
+        :param cur: open cursor
+        :param data: DatabaseTable to insert
+        :param batch_size: number of rows sent to the server at once, insert_batch_size by default
+        """
+        batch_size = self.insert_batch_size if batch_size is None else batch_size
+        rows = data.get_table()
+        for i in range(0, len(rows), batch_size):
+            self.execute_insert_batch(cur, data.get_table_name(), data.get_header_row(), rows[i:i + batch_size])
+
+    def execute_insert_batch(self, cur, table_name: str, columns: list[str], rows: list) -> None:
+        """
+        Sends a single batch of rows to the server. DBMS specific connectors can override it with a faster
+        driver specific method, by default DBAPI executemany is used.
+        :param cur: open cursor
+        :param table_name: name of the target table
+        :param columns: names of the target columns
+        :param rows: rows to insert, at most insert_batch_size of them
+        """
+        placeholders = ", ".join([self.placeholder] * len(columns))
+        cur.executemany(f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+    def upsert_data(self, data: DatabaseTable, key_columns: list[str] | tuple[str] = None,
+                    batch_size: int = None) -> None:
+        """
+        Inserts the rows of data, updating the rows which already exist in the table instead.
+        All batches are committed together.
+        :param data: DatabaseTable to upsert, its header row has to match the target columns
+        :param key_columns: columns identifying a row, data.get_key_columns() by default.
+        The target needs a unique constraint on them
+        :param batch_size: number of rows sent to the server at once, insert_batch_size by default
+        """
+        if data.get_row_count() == 0: return
 
-        for row in data.get_table():
-            row = self.__transform_row_for_insertion(row)
-            rows += "(" + ", ".join(row) + "),\n"
+        key_columns = self.__get_key_columns(data, key_columns)
+        batch_size = self.insert_batch_size if batch_size is None else batch_size
+
+        with measure_stage(STAGE_UPSERT, self.get_metrics_label(), data.get_table_name()) as timer, \
+                self.checkout() as connection, connection.cursor() as cur:
+            self.execute_upsert(cur, data, key_columns, batch_size)
+            connection.commit()
+            timer.add_rows(data.get_row_count())
+
+    def execute_upsert(self, cur, data: DatabaseTable, key_columns: tuple[str], batch_size: int) -> None:
+        """
+        Sends the upsert of data to the server, overridden by DBMS specific connectors
+        :param cur: open cursor
+        :param data: DatabaseTable to upsert
+        :param key_columns: columns identifying a row
+        :param batch_size: number of rows sent to the server at once
+        """
+        raise DatabaseConnectorException(f"{type(self).__name__} does not support upserts")
+
+    def delete_data(self, data: DatabaseTable, key_columns: list[str] | tuple[str] = None,
+                    batch_size: int = None) -> None:
+        """
+        Deletes the rows matching the keys of the rows of data, batch_size rows at a time.
+        All batches are committed together.
+        :param data: DatabaseTable holding at least the key columns of the rows to delete
+        :param key_columns: columns identifying a row, data.get_key_columns() by default
+        :param batch_size: number of rows sent to the server at once, insert_batch_size by default
+        """
+        if data.get_row_count() == 0: return
+
+        key_columns = self.__get_key_columns(data, key_columns)
+
+        with measure_stage(STAGE_DELETE, self.get_metrics_label(), data.get_table_name()) as timer, \
+                self.checkout() as connection, connection.cursor() as cur:
+            self.execute_delete(cur, data, key_columns, batch_size)
+            connection.commit()
+            timer.add_rows(data.get_row_count())
+
+    def execute_delete(self, cur, data: DatabaseTable, key_columns: tuple[str], batch_size: int = None) -> None:
+        """
+        Sends the deletes of delete_data to the server without committing
+        :param cur: open cursor
+        :param data: DatabaseTable holding at least the key columns of the rows to delete
+        :param key_columns: columns identifying a row
+        :param batch_size: number of rows sent to the server at once, insert_batch_size by default
+        """
+        batch_size = self.insert_batch_size if batch_size is None else batch_size
+
+        key_indexes = [data.get_column_index(column) for column in key_columns]
+        keys = [[row[i] for i in key_indexes] for row in data.get_table()]
+        condition = " AND ".join(f"{column} = {self.placeholder}" for column in key_columns)
+
+        for i in range(0, len(keys), batch_size):
+            cur.executemany(f"DELETE FROM {data.get_table_name()} WHERE {condition}", keys[i:i + batch_size])
+
+    def delete_rows(self, data: DatabaseTable, batch_size: int = None) -> None:
+        """
+        Deletes one row of the table for every row of data, matching all of its columns with NULL equal to NULL.
+        A row present n times in data deletes n of its copies, for tables without a key.
+        :param data: DatabaseTable of the rows to delete, its header row has to match the target columns
+        :param batch_size: number of rows sent to the server at once, insert_batch_size by default
+        """
+        if data.get_row_count() == 0: return
+
+        with measure_stage(STAGE_DELETE, self.get_metrics_label(), data.get_table_name()) as timer, \
+                self.checkout() as connection, connection.cursor() as cur:
+            self.execute_delete_rows(cur, data, batch_size)
+            connection.commit()
+            timer.add_rows(data.get_row_count())
+
+    def execute_delete_rows(self, cur, data: DatabaseTable, batch_size: int = None) -> None:
+        """
+        Sends the deletes of delete_rows to the server without committing. The rows are grouped by
+        their NULL columns and number of copies, every group is deleted with one statement.
+        """
+        batch_size = self.insert_batch_size if batch_size is None else batch_size
+        columns = data.get_header_row()
+
+        # (null columns, copies) -> the non-null values of the rows
+        groups: dict[tuple, list] = {}
+        for row, copies in Counter(tuple(row) for row in data.get_table()).items():
+            nulls = tuple(value is None for value in row)
+            groups.setdefault((nulls, copies), []).append([value for value in row if value is not None])
+
+        for (nulls, copies), params in groups.items():
+            condition = " AND ".join(f"{column} IS NULL" if is_null else f"{column} = {self.placeholder}"
+                                     for column, is_null in zip(columns, nulls))
+            statement = self.get_delete_copies_statement(data.get_table_name(), condition, copies)
+            for i in range(0, len(params), batch_size):
+                cur.executemany(statement, params[i:i + batch_size])
+
+    def get_delete_copies_statement(self, table_name: str, condition: str, copies: int) -> str:
+        """
+        DBMS specific connectors override this with a statement deleting at most copies of the rows
+        matching condition, used by delete_rows
+        """
+        raise DatabaseConnectorException(f"{type(self).__name__} does not support deleting rows without key columns")
+
+    def write_change_set(self, change_set: ChangeSet, key_columns: list[str] | tuple[str] = None,
+                         batch_size: int = None) -> None:
+        """
+        Applies a change set in a single transaction: deletes, then inserts, then upserts the updates.
+        If any of them fails, nothing is written.
+        :param change_set: ChangeSet to apply, its tables' header rows have to match the target columns
+        :param key_columns: columns identifying a row. If None or empty, deleted rows are matched
+        on all of their columns, see delete_rows
+        :param batch_size: number of rows sent to the server at once, insert_batch_size by default
+        """
+        table_name = change_set.table_name
+        with self.checkout() as connection, connection.cursor() as cur:
+            try:
+                if change_set.deletes.get_row_count() > 0:
+                    with measure_stage(STAGE_DELETE, self.get_metrics_label(), table_name) as timer:
+                        if key_columns:
+                            self.execute_delete(cur, change_set.deletes, tuple(key_columns), batch_size)
+                        else:
+                            self.execute_delete_rows(cur, change_set.deletes, batch_size)
+                        timer.add_rows(change_set.deletes.get_row_count())
+
+                if change_set.inserts.get_row_count() > 0:
+                    with measure_stage(STAGE_INSERT, self.get_metrics_label(), table_name) as timer:
+                        self.execute_insert(cur, change_set.inserts, batch_size)
+                        timer.add_rows(change_set.inserts.get_row_count())
+
+                if change_set.updates.get_row_count() > 0:
+                    with measure_stage(STAGE_UPSERT, self.get_metrics_label(), table_name) as timer:
+                        self.execute_upsert(cur, change_set.updates,
+                                            self.__get_key_columns(change_set.updates, key_columns or None),
+                                            self.insert_batch_size if batch_size is None else batch_size)
+                        timer.add_rows(change_set.updates.get_row_count())
+
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+
+    def insert_data_literal(self, data: DatabaseTable, schema: DatabaseTableSchema = None) -> None:
+        """
+        Inserts data in a single statement with the values written into the sql text using type_transforms.
+        Only meant for drivers which do not support bound parameters, insert_data should be preferred.
+        :param data: DatabaseTable to insert
+        :param schema: schema of the table used to pick the column serializers, see compile_serializers
+        """
+        if data.get_row_count() == 0: return
+
+        columns: str = ", ".join(data.get_header_row())
+        rows: str = ",\n".join("(" + ", ".join(row) + ")" for row in self.serialize_table(data, schema))
 
-        rows = rows[:-2]
         sql_command = f"""
                 INSERT INTO {data.get_table_name()} 
                 ({columns})
@@ -70,61 +339,302 @@ class DatabaseConnector:
                 {rows}
                 """
 
-        self.execute_sql_statement(sql_command)
+        with measure_stage(STAGE_INSERT, self.get_metrics_label(), data.get_table_name()) as timer:
+            self.execute_sql_statement(sql_command)
+            timer.add_rows(data.get_row_count())
+            timer.add_bytes(len(sql_command.encode("utf-8")))
 
-    def execute_sql_query(self, query: str, table_name: str) -> DatabaseTable:
+    def serialize_table(self, data: DatabaseTable, schema: DatabaseTableSchema = None) -> list[tuple[str]]:
+        """
+        Transforms the values of data into sql literals column by column using compiled serializers
+        :param data: DatabaseTable to serialize
+        :param schema: schema of the table, see compile_serializers
+        :return: list of rows of sql literals
+        """
+        rows = data.get_table()
+        if len(rows) == 0: return []
+
+        if schema is not None:
+            types_row = schema.types_row
+        elif getattr(data, "types_row", None) is not None:
+            types_row = data.types_row
+        else:
+            types_row = [next((type(row[i]) for row in rows if row[i] is not None), NoneType)
+                         for i in range(data.column_count)]
+
+        with measure_stage(STAGE_TRANSFORM, self.get_metrics_label(), data.get_table_name()) as timer:
+            serializers = self.compile_serializers(types_row)
+            columns = [list(map(serialize, column)) for serialize, column in zip(serializers, zip(*rows))]
+            timer.add_rows(len(rows))
+            return list(zip(*columns))
+
+    def compile_serializers(self, types_row: list[type] | tuple[type]) -> list[Callable]:
+        """
+        Compiles type_transforms into one func(element) -> str per column. Values of the column's type
+        are serialized directly, None is replaced by the precomputed NoneType literal and values of
+        other types fall back to a lookup by their type.
+        :param types_row: python types of the columns, e.g. DatabaseTableSchema.types_row
+        :return: list of serializers in column order
+        :raises: IllegalTransformTypeException
+        """
+        serializers = self.__column_serializers.get(tuple(types_row))
+        if serializers is not None: return serializers
+
+        null_literal = self.__get_type_serializer(NoneType)(None)
+        fallback = self.__serialize_value
+
+        def compile_column(column_type: type) -> Callable:
+            serialize = self.__get_type_serializer(column_type)
+
+            def serialize_column_value(elem) -> str:
+                if elem is None: return null_literal
+                if type(elem) is column_type: return serialize(elem)
+                return fallback(elem)
+
+            return serialize_column_value
+
+        serializers = [compile_column(column_type) for column_type in types_row]
+        self.__column_serializers[tuple(types_row)] = serializers
+        return serializers
+
+    def execute_sql_query(self, query: str, table_name: str, params: list | tuple = None) -> DatabaseTable:
         """
         :param query: sql query
         :param table_name: name of the resulting table
+        :param params: values bound to the placeholders in query
         :return: DatabaseTable object constructed from the result of the query
         """
-        if not self.__is_connection_open():
-            self.connect(self.reconnect_wait_time)
-
-        with self.connection.cursor() as cur:
-            cur.execute(query)
+        with self.checkout() as connection, connection.cursor() as cur:
+            with measure_stage(STAGE_QUERY, self.get_metrics_label(), table_name):
+                self.__execute(cur, query, params)
             column_names = [desc[0] for desc in cur.description]
-            db_table =  DatabaseTable(table_name, column_names)
-            db_table.append_table(cur.fetchall())
+            db_table = self.table_class(table_name, column_names)
+
+            with measure_stage(STAGE_FETCH, self.get_metrics_label(), table_name) as timer:
+                rows = cur.fetchmany(self.fetch_chunk_size)
+                while rows:
+                    db_table.append_table(rows)
+                    timer.add_rows(len(rows))
+                    rows = cur.fetchmany(self.fetch_chunk_size)
+
             return db_table
 
+    def stream_sql_query(self, query: str, table_name: str, chunk_size: int = None,
+                         params: list | tuple = None) -> Iterator[DatabaseTable]:
+        """
+        Runs the query and yields its result in DatabaseTable chunks of bounded size,
+        so only one chunk has to be held in memory at a time.
+        The cursor stays open until the iterator is exhausted or closed.
+        :param query: sql query
+        :param table_name: name of the resulting tables
+        :param chunk_size: maximum number of rows in a chunk, fetch_chunk_size by default
+        :param params: values bound to the placeholders in query
+        :return: iterator of DatabaseTable objects
+        """
+        chunk_size = self.fetch_chunk_size if chunk_size is None else chunk_size
+
+        with self.checkout() as connection, self.create_stream_cursor(connection) as cur:
+            with measure_stage(STAGE_QUERY, self.get_metrics_label(), table_name):
+                self.__execute(cur, query, params)
+            column_names = None
+
+            while True:
+                # only the fetching is timed, not the consumer's processing of the yielded chunk
+                with measure_stage(STAGE_FETCH, self.get_metrics_label(), table_name) as timer:
+                    rows = cur.fetchmany(chunk_size)
+                    timer.add_rows(len(rows))
+                if not rows: break
+
+                if column_names is None:
+                    # the description of a named (server-side) cursor is only set by its first fetch
+                    column_names = [desc[0] for desc in cur.description]
+
+                chunk = self.table_class(table_name, column_names)
+                chunk.append_table(rows)
+                yield chunk
+
+    def create_stream_cursor(self, connection):
+        """
+        Creates the cursor used by stream_sql_query. DBMS specific connectors can override it
+        to return a cursor which does not buffer the whole result on the client.
+        :param connection: the connection to create the cursor on
+        :return: cursor object adhering to python's DBAPI
+        """
+        return connection.cursor()
+
     def execute_sql_statement(self, statement: str) -> None:
+        with self.checkout() as connection, connection.cursor() as cur:
+            cur.execute(statement)
+            connection.commit()
+
+    def materialize_query(self, query: str, table_name: str, temporary: bool = True) -> str:
+        """
+        Stores the result of query in a table, replacing the table if it exists.
+        A temporary table is only visible to the connection which created it.
+        :param query: query whose result is stored
+        :param table_name: name of the created table
+        :param temporary: create a temporary table dropped at the end of the session
+        :return: name under which the table can be queried
+        """
+        self.execute_sql_statement(f"DROP TABLE IF EXISTS {table_name}")
+        self.execute_sql_statement(f"CREATE {'TEMPORARY ' if temporary else ''}TABLE {table_name} AS {query}")
+        return table_name
+
+    def get_key_bounds(self, table_name: str, key_column: str) -> tuple:
+        """
+        :return: the lowest and the highest value of key_column in the table, (None, None) if it is empty
+        """
+        result = self.execute_sql_query(f"SELECT MIN({key_column}), MAX({key_column}) FROM {table_name}", table_name)
+        return result[0][0], result[0][1]
+
+    def get_range_checksum(self, table_name: str, key_column: str, columns: list[str],
+                           lower=None, upper=None, upper_inclusive: bool = False) -> tuple:
+        """
+        Computes a checksum of the rows with key_column in [lower, upper) on the server
+        :param table_name: name of the table
+        :param key_column: column the range applies to
+        :param columns: columns included in the checksum
+        :param lower: inclusive lower bound, None for no bound
+        :param upper: upper bound, None for no bound
+        :param upper_inclusive: whether the upper bound is inclusive
+        :return: (row count, checksum), checksums are only comparable between connectors of the same checksum_dialect
+        """
+        condition, params = self.get_range_condition(key_column, lower, upper, upper_inclusive)
+        result = self.execute_sql_query(self.get_checksum_query(table_name, key_column, columns, condition),
+                                        table_name, params)
+        return result[0][0], result[0][1]
+
+    def get_checksum_query(self, table_name: str, key_column: str, columns: list[str], condition: str) -> str:
+        """
+        DBMS specific connectors override this with a query returning a single (row count, checksum) row
+        for the rows matching condition. Connectors with the same checksum_dialect have to produce the same
+        checksum for the same data.
+        """
+        raise DatabaseConnectorException(f"{type(self).__name__} does not support server-side checksums")
+
+    def get_range_condition(self, key_column: str, lower=None, upper=None, upper_inclusive: bool = False) -> tuple[str, list]:
+        """
+        :return: sql condition selecting the key range with placeholders, and the values to bind to them
+        """
+        conditions, params = [], []
+        if lower is not None:
+            conditions.append(f"{key_column} >= {self.placeholder}")
+            params.append(lower)
+        if upper is not None:
+            conditions.append(f"{key_column} {'<=' if upper_inclusive else '<'} {self.placeholder}")
+            params.append(upper)
+
+        return " AND ".join(conditions) if conditions else "1 = 1", params
+
+    def get_key_quantiles(self, table_name: str, key_column: str, parts: int) -> list:
+        """
+        Splits the rows of the table into parts groups of (nearly) equal size ordered by key_column
+        :return: the lowest key of every non-empty group in ascending order
+        """
+        result = self.execute_sql_query(
+            f"SELECT MIN({key_column}) FROM "
+            f"(SELECT {key_column}, NTILE({int(parts)}) OVER (ORDER BY {key_column}) AS pydbsync_tile "
+            f"FROM {table_name} WHERE {key_column} IS NOT NULL) pydbsync_tiles "
+            f"GROUP BY pydbsync_tile ORDER BY MIN({key_column})", table_name)
+        return [row[0] for row in result.get_table()]
+
+    @staticmethod
+    def split_key_range(lower, upper, upper_inclusive: bool, parts: int) -> list[tuple]:
+        """
+        Splits [lower, upper) (or [lower, upper]) into up to parts consecutive ranges of equal width.
+        Only numeric, date and datetime keys can be split, other ranges are returned whole.
+        :return: list of (lower, upper, upper_inclusive) ranges, see get_range_condition
+        """
+        if isinstance(lower, bool) or not isinstance(lower, (int, float, decimal.Decimal, dt.datetime, dt.date)):
+            return [(lower, upper, upper_inclusive)]
+
+        step = (upper - lower) / parts
+        if isinstance(lower, int):
+            step = int(step)
+        elif isinstance(lower, dt.date) and not isinstance(lower, dt.datetime):
+            step = dt.timedelta(days=step.days)
+        if not step:
+            return [(lower, upper, upper_inclusive)]
+
+        bounds = [lower + step * i for i in range(parts)] + [upper]
+        ranges = [(bounds[i], bounds[i + 1], False) for i in range(parts - 1)]
+        ranges.append((bounds[parts - 1], upper, upper_inclusive))
+
+        return ranges
+
+    def ensure_connection(self) -> None:
+        """Connects if there is no open connection"""
         if not self.__is_connection_open():
             self.connect(self.reconnect_wait_time)
 
-        with self.connection.cursor() as cur:
-            cur.execute(statement)
-            self.connection.commit()
-
     def disconnect(self):
-        if self.connection is None: raise NoConnectionEstablishedException(
+        if self.connection is None and self.pool is None: raise NoConnectionEstablishedException(
             "Connect was not called! No available connection")
 
-        self.connection.close()
+        if self.pool is not None:
+            self.pool.close()
+        if self.connection is not None:
+            self.connection.close()
 
     def get_login_details(self) -> dict:
         return self.login_details
 
-    def __is_connection_open(self) -> bool:
-        if self.connection is None: return False
-        return self.connection.closed == 0
-
-    def __transform_row_for_insertion(self, row: list[any] | tuple[any]) -> list[any]:
-        result = []
-        for elem in row:
-            elem_type = NoneType if elem is None else type(elem)
-            if elem_type in self.type_transforms.keys():
-                if type(self.type_transforms[elem_type]) == str:
-                    result.append(self.type_transforms[elem_type].format(arg=elem))
-                elif type(self.type_transforms[elem_type]) == types.FunctionType:
-                    result.append(self.type_transforms[elem_type](elem))
-                else:
-                    raise IllegalTransformTypeException(
-                    f"A transform type of {type(self.type_transforms[elem_type])} not allowed in type_transforms!")
-            else:
-                result.append(str(elem))
-
-        return result
+    def get_metrics_label(self) -> str:
+        """
+        :return: value of the connector label of the metrics reported by the connector, host/database
+        """
+        return f"{self.login_details['host']}/{self.login_details['database']}"
+
+    @staticmethod
+    def __get_key_columns(data: DatabaseTable, key_columns: list[str] | tuple[str] = None) -> tuple[str]:
+        key_columns = tuple(data.get_key_columns() if key_columns is None else key_columns)
+        if len(key_columns) == 0:
+            raise DatabaseConnectorException(f"No key columns declared for {data.get_table_name()}")
+        return key_columns
+
+    @staticmethod
+    def __execute(cur, query: str, params: list | tuple = None) -> None:
+        if params is None:
+            cur.execute(query)
+        else:
+            cur.execute(query, params)
+
+    def __open_connection(self, reconnect_wait_time: int):
+        """Opens a new connection, if the attempt is unsuccessful retry according to retry_policy"""
+        sf.print_to_console(f"Connecting to "
+                            f"{self.get_login_details()['user']}"
+                            f"@{self.get_login_details()['host']} ...")
+        return self.retry_policy.call(self.open_connection, self.get_metrics_label(),
+                                      initial_delay=reconnect_wait_time,
+                                      description=f"connecting to {self.get_login_details()['user']}"
+                                                  f"@{self.get_login_details()['host']}")
+
+    def __is_connection_open(self, connection=None) -> bool:
+        """:param connection: connection to check, self.connection by default"""
+        connection = self.connection if connection is None else connection
+        if connection is None: return False
+        return connection.closed == 0
+
+    def __serialize_value(self, elem) -> str:
+        return self.__get_type_serializer(NoneType if elem is None else type(elem))(elem)
+
+    def __get_type_serializer(self, elem_type: type) -> Callable:
+        serializer = self.__type_serializers.get(elem_type)
+        if serializer is not None: return serializer
+
+        transform = self.type_transforms.get(elem_type)
+        if transform is None:
+            serializer = str
+        elif type(transform) == str:
+            serializer = lambda elem, template=transform: template.format(arg=elem)
+        elif callable(transform):
+            serializer = transform
+        else:
+            raise IllegalTransformTypeException(
+                f"A transform type of {type(transform)} not allowed in type_transforms!")
+
+        self.__type_serializers[elem_type] = serializer
+        return serializer
 
 class DatabaseConnectorException(Exception):
     def __init__(self, message):
@@ -135,6 +645,10 @@ class NoConnectionEstablishedException(DatabaseConnectorException):
     def __init__(self, message):
         super().__init__(message)
 
+class ConnectionNotOpenException(DatabaseConnectorException):
+    def __init__(self, message):
+        super().__init__(message)
+
 class IllegalTransformTypeException(DatabaseConnectorException):
     def __init__(self, message):
         super().__init__(message)
\ No newline at end of file
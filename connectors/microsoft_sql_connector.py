@@ -4,7 +4,29 @@ import pyodbc
 import datetime as dt
 
 import support_functions as sf
-from connectors.database_connector import DatabaseConnector, NoneType
+from connectors.database_connector import DatabaseConnector, DatabaseConnectorException, NoneType
+from data_types.database_table import DatabaseTable
+from data_types.database_table_schema import DatabaseTableSchema
+
+# SQL Server limits for a single statement
+MAX_ROWS_PER_VALUES = 1000
+MAX_PARAMETERS_PER_STATEMENT = 2100
+
+# session temporary table used by upserts
+STAGING_TABLE = "#pydbsync_staging"
+
+# longest string which can be bound as nvarchar(n), longer ones are bound as nvarchar(max)
+MAX_NVARCHAR_LENGTH = 4000
+
+# python type -> (sql type, column size, decimal digits) given to cursor.setinputsizes
+INPUT_SIZES: dict[type, tuple] = {
+    int: (pyodbc.SQL_BIGINT, 0, 0),
+    float: (pyodbc.SQL_DOUBLE, 0, 0),
+    bool: (pyodbc.SQL_BIT, 0, 0),
+    dt.datetime: (pyodbc.SQL_TYPE_TIMESTAMP, 27, 7),
+    dt.date: (pyodbc.SQL_TYPE_DATE, 0, 0),
+    bytes: (pyodbc.SQL_VARBINARY, 0, 0),
+}
 
 
 class MicrosoftSQLConnector(DatabaseConnector):
@@ -24,7 +46,17 @@ class MicrosoftSQLConnector(DatabaseConnector):
             NoneType: "NULL"
         }
 
-        super().__init__(login_details, self.__ms_sql_connect, {}, type_transforms)
+        super().__init__(login_details, self.__ms_sql_connect, {}, type_transforms, "?")
+
+        # send batches as parameter arrays with pyodbc's fast_executemany,
+        # otherwise as multi-row VALUES statements split to fit the server limits
+        self.fast_executemany: bool = True
+        self.insert_batch_size = 10000
+
+        # table name -> DatabaseTableSchema used to derive the input sizes of bound parameters
+        self.table_schemas: dict[str, DatabaseTableSchema] = {}
+
+        self.checksum_dialect = "mssql"
 
     @classmethod
     def from_file(cls, filename):
@@ -49,6 +81,127 @@ class MicrosoftSQLConnector(DatabaseConnector):
             login_details["database"]
         )
 
+    def set_table_schema(self, schema: DatabaseTableSchema) -> None:
+        """
+        Registers the column types of a table, inserts into it will bind parameters with
+        input sizes derived from the schema instead of guessing them from the inserted values
+        :param schema: schema of the target table
+        """
+        self.table_schemas[schema.table_name] = schema
+
+    def get_checksum_query(self, table_name: str, key_column: str, columns: list[str], condition: str) -> str:
+        """
+        CHECKSUM_AGG over a checksum of the MD5 HASHBYTES of every row's concatenated values
+        """
+        values = ", ".join(f"ISNULL(CONVERT(NVARCHAR(MAX), {column}, 121), N'\\N')" for column in columns)
+        return (f"SELECT COUNT_BIG(*), CHECKSUM_AGG(CHECKSUM(HASHBYTES('MD5', CONCAT_WS(N'|', {values})))) "
+                f"FROM {table_name} WHERE {condition}")
+
+    def materialize_query(self, query: str, table_name: str, temporary: bool = True) -> str:
+        """
+        SELECT ... INTO, temporary tables are prefixed with #
+        """
+        table_name = f"#{table_name}" if temporary else table_name
+        self.execute_sql_statement(f"DROP TABLE IF EXISTS {table_name}")
+        self.execute_sql_statement(f"SELECT * INTO {table_name} FROM ({query}) AS materialized_query")
+        return table_name
+
+    def get_delete_copies_statement(self, table_name: str, condition: str, copies: int) -> str:
+        return f"DELETE TOP ({int(copies)}) FROM {table_name} WHERE {condition}"
+
+    def execute_upsert(self, cur, data: DatabaseTable, key_columns: tuple[str], batch_size: int) -> None:
+        """
+        Bulk loads data into a temporary staging table and applies it with a single MERGE
+        """
+        table_name = data.get_table_name()
+        columns = data.get_header_row()
+        column_string = ", ".join(columns)
+        rows = data.get_table()
+
+        # the UNION ALL keeps SELECT INTO from copying identity properties to the staging table
+        cur.execute(f"SELECT TOP 0 {column_string} INTO {STAGING_TABLE} FROM {table_name} "
+                    f"UNION ALL SELECT TOP 0 {column_string} FROM {table_name}")
+        try:
+            for i in range(0, len(rows), batch_size):
+                self.__execute_insert_batch(cur, STAGING_TABLE, columns, rows[i:i + batch_size], table_name)
+
+            updated_columns = [column for column in columns if column not in key_columns]
+            match_condition = " AND ".join(f"target.{column} = source.{column}" for column in key_columns)
+            update_clause = "" if len(updated_columns) == 0 else \
+                "WHEN MATCHED THEN UPDATE SET " + \
+                ", ".join(f"target.{column} = source.{column}" for column in updated_columns) + " "
+
+            cur.execute(f"MERGE INTO {table_name} AS target USING {STAGING_TABLE} AS source "
+                        f"ON {match_condition} "
+                        f"{update_clause}"
+                        f"WHEN NOT MATCHED BY TARGET THEN INSERT ({column_string}) "
+                        f"VALUES ({', '.join(f'source.{column}' for column in columns)});")
+        finally:
+            cur.execute(f"DROP TABLE {STAGING_TABLE}")
+
+    def execute_insert_batch(self, cur, table_name: str, columns: list[str], rows: list) -> None:
+        """
+        Sends a batch either as a parameter array with fast_executemany and typed input sizes,
+        or as multi-row VALUES statements respecting MAX_ROWS_PER_VALUES and MAX_PARAMETERS_PER_STATEMENT
+        """
+        self.__execute_insert_batch(cur, table_name, columns, rows, table_name)
+
+    def __execute_insert_batch(self, cur, table_name: str, columns: list[str], rows: list, schema_name: str) -> None:
+        """:param schema_name: name of the table whose registered schema describes the columns"""
+        if len(columns) >= MAX_PARAMETERS_PER_STATEMENT:
+            raise DatabaseConnectorException(
+                f"Cannot insert {len(columns)} columns, SQL Server allows {MAX_PARAMETERS_PER_STATEMENT - 1} parameters")
+
+        column_string = ", ".join(columns)
+        row_placeholders = "(" + ", ".join(["?"] * len(columns)) + ")"
+
+        if self.fast_executemany:
+            cur.fast_executemany = True
+            cur.setinputsizes(self.__get_input_sizes(schema_name, rows))
+            cur.executemany(f"INSERT INTO {table_name} ({column_string}) VALUES {row_placeholders}", rows)
+            return
+
+        rows_per_statement = min(MAX_ROWS_PER_VALUES, (MAX_PARAMETERS_PER_STATEMENT - 1) // len(columns))
+        insert_string = f"INSERT INTO {table_name} ({column_string}) VALUES "
+        full_statement = insert_string + ", ".join([row_placeholders] * rows_per_statement)
+
+        for i in range(0, len(rows), rows_per_statement):
+            statement_rows = rows[i:i + rows_per_statement]
+            statement = full_statement if len(statement_rows) == rows_per_statement \
+                else insert_string + ", ".join([row_placeholders] * len(statement_rows))
+
+            cur.execute(statement, [value for row in statement_rows for value in row])
+
+    def __get_input_sizes(self, table_name: str, rows: list) -> list[tuple | None]:
+        schema: DatabaseTableSchema = self.table_schemas.get(table_name)
+        column_count = len(rows[0])
+
+        if schema is not None:
+            column_types = list(schema.types_row)
+        else:
+            column_types = []
+            for i in range(column_count):
+                sample = next((row[i] for row in rows if row[i] is not None), None)
+                column_types.append(None if sample is None else type(sample))
+
+        input_sizes = []
+        for i, column_type in enumerate(column_types):
+            if column_type is str:
+                length = max((len(row[i]) for row in rows if row[i] is not None), default=1)
+                input_sizes.append((pyodbc.SQL_WVARCHAR, 0 if length > MAX_NVARCHAR_LENGTH else max(length, 1), 0))
+            else:
+                input_sizes.append(INPUT_SIZES.get(column_type))
+
+        return input_sizes
+
+    def create_stream_cursor(self, connection):
+        """
+        pyodbc cursors fetch rows from the server as fetchmany is called, a regular cursor already streams
+        """
+        cur = connection.cursor()
+        cur.arraysize = self.fetch_chunk_size
+        return cur
+
     def __ms_sql_connect(self):
         dsn: str = (f'DRIVER={{ODBC Driver 18 for SQL Server}};'
                     f'SERVER={self.login_details["host"]};DATABASE={self.login_details["database"]};'
@@ -1,48 +1,171 @@
 import support_functions as sf
 import requests as rq
 import requests.exceptions as rqe
+from requests.adapters import HTTPAdapter
 import json
 import datetime as dt
+import threading
 import time
+from urllib.parse import urlsplit
 
+from connectors.rate_limiter import RateLimiter
 from data_types.tabular import Tabular
 from data_types.database_table import DatabaseTable
+from metrics.instrumentation import measure_stage, ROWS, STAGE_REST
+from resilience.backoff import ExponentialBackoff
+from resilience.retry_policy import RetryPolicy
+
+
+PMECOLOGY_API_URL = "https://api.system.pmecology.com/v1/data/"
 
 
 class PmecologyRestApiConnector:
-    def __init__(self, key: str):
+    def __init__(self, key: str, api_url: str = PMECOLOGY_API_URL, metadata_ttl: float = 60, pool_size: int = 10,
+                 requests_per_second: float = None, retry_policy: RetryPolicy = None):
+        """
+        :param key: api key of the station
+        :param api_url: base url of the data endpoint, the key is appended to it
+        :param metadata_ttl: seconds the station's metadata (channels, first and last record timestamps)
+        is cached for, None to cache it until refresh_metadata is called
+        :param pool_size: number of keep-alive connections kept open to the api
+        :param requests_per_second: limit of the request rate shared by all threads using the connector,
+        None for no limit
+        :param retry_policy: retries of failed requests, by default with a backoff from 1 to 60 seconds
+        for up to 5 minutes. Only connection errors, timeouts and 429 and 5xx statuses are retried
+        """
         self.api_key: str = key
-        self.request_string: str = f"https://api.system.pmecology.com/v1/data/{self.api_key}?"
-        self.channels: dict = json.loads(rq.get(f"{self.request_string}?").text)["channels"]
+        self.api_url: str = api_url
+        self.request_string: str = f"{api_url}{self.api_key}?"
+        self.metadata_ttl: float = metadata_ttl
+        self.rate_limiter: RateLimiter = None if requests_per_second is None else RateLimiter(requests_per_second)
+        self.retry_policy: RetryPolicy = RetryPolicy(ExponentialBackoff(1, 60), deadline=300,
+                                                     retryable=self.is_retryable_error) \
+            if retry_policy is None else retry_policy
+        # seconds to wait for the api to answer a request
+        self.request_timeout: float = 30
+
+        self.session: rq.Session = rq.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.__metadata: dict = None
+        self.__metadata_fetched_at: float = None
+        # guards the channels and the column map built from them, which are shared by the threads of a backfill
+        self.__channels_lock = threading.Lock()
+        self.channels: dict = None
+        self.refresh_metadata()
 
     @classmethod
     def from_file(cls, filename: str):
         return cls(sf.get_json_from_file(filename)["key"])
 
-    def get_persistently(self, request_string: str, retry_wait_time: int = 5) -> rq.Response:
-        req = None
-        while req is None or req.status_code != 200:
-            if req is not None:
-                time.sleep(retry_wait_time)
-                sf.print_to_console(f"Retrying request {request_string} ...")
-
-            try:
-                req = rq.get(request_string)
-            except rqe.ConnectionError as e:
-                sf.print_to_console(f"ConnectionError occurred:\n{e}Retrying request {request_string} ...")
-                req = None
-                continue
+    @property
+    def channels(self) -> dict:
+        return self.__channels
+
+    @channels.setter
+    def channels(self, channels: dict) -> None:
+        with self.__channels_lock:
+            self.__channels = channels
+            # (column names, channel key -> index of its column), built from the channels on first use
+            self.__columns: tuple[list[str], dict[str, int]] = None
+
+    def close(self) -> None:
+        """
+        Closes the kept-alive connections
+        """
+        self.session.close()
+
+    def get_metrics_label(self) -> str:
+        """
+        :return: value of the connector label of the metrics reported by the connector, the api's host
+        """
+        return urlsplit(self.api_url).netloc
+
+    def get_persistently(self, request_string: str, retry_wait_time: float = None, table_name: str = "",
+                         deadline: float = None) -> rq.Response:
+        """
+        Sends a request, repeating it according to retry_policy while it fails
+        :param request_string: requested url
+        :param retry_wait_time: seconds to wait after the first failure, the retry policy's backoff by default
+        :param table_name: name of the table the request fetches data for, reported in the metrics
+        :param deadline: seconds after which the request is given up, the retry policy's deadline by default
+        :return: the first response with status 200
+        :raises: RetryException if no request succeeded in time or the api's circuit is open,
+        PmecologyRequestException if the api answered with a status which is not retried
+        """
+        return self.retry_policy.call(lambda: self.__get(request_string, table_name), self.get_metrics_label(),
+                                      deadline, retry_wait_time, f"request {request_string}")
+
+    def __get(self, request_string: str, table_name: str) -> rq.Response:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
 
+        with measure_stage(STAGE_REST, self.get_metrics_label(), table_name) as timer:
+            req = self.session.get(request_string, timeout=self.request_timeout)
+            timer.add_bytes(len(req.content))
+            self.check_status(req, request_string)
         return req
 
+    @staticmethod
+    def check_status(req: rq.Response, request_string: str) -> None:
+        """
+        :raises: PmecologyRequestException if the status of the response is not 200
+        """
+        if req.status_code != 200:
+            raise PmecologyRequestException(f"Request {request_string} returned status {req.status_code}",
+                                            req.status_code)
+
+    @staticmethod
+    def is_retryable_error(exception: Exception) -> bool:
+        """
+        :return: whether a failed request may succeed when repeated
+        """
+        if isinstance(exception, PmecologyRequestException):
+            return exception.status_code == 429 or exception.status_code >= 500
+        return isinstance(exception, (rqe.ConnectionError, rqe.Timeout))
+
+    def get_metadata(self) -> dict:
+        """
+        :return: the station's root document, downloaded at most once per metadata_ttl seconds
+        """
+        if self.is_metadata_expired():
+            self.refresh_metadata()
+        return self.__metadata
+
+    def refresh_metadata(self) -> dict:
+        """
+        Downloads the station's root document
+        :return: the root document
+        """
+        return self.set_metadata(json.loads(self.get_persistently(self.request_string).text))
+
+    def set_metadata(self, metadata: dict) -> dict:
+        """
+        Caches a downloaded root document, the column map is rebuilt if the channels changed
+        :param metadata: the root document
+        :return: the root document
+        """
+        self.__metadata = metadata
+        self.__metadata_fetched_at = time.time()
+
+        if metadata["channels"] != self.channels:
+            self.channels = metadata["channels"]
+        return metadata
+
+    def is_metadata_expired(self) -> bool:
+        return self.__metadata is None or (self.metadata_ttl is not None and
+                                           time.time() - self.__metadata_fetched_at > self.metadata_ttl)
+
     def get_first_recorded_timestamp(self) -> dt.datetime:
-        return dt.datetime.fromisoformat(json.loads(self.get_persistently(self.request_string).text)["first_record_timestamp"])
+        return dt.datetime.fromisoformat(self.get_metadata()["first_record_timestamp"])
 
     def get_last_recorded_timestamp(self) -> dt.datetime:
-        return dt.datetime.fromisoformat(json.loads(self.get_persistently(self.request_string).text)["last_record_timestamp"])
+        return dt.datetime.fromisoformat(self.get_metadata()["last_record_timestamp"])
 
     def get_channels_data(self) -> dict:
-        return json.loads(self.get_persistently(self.request_string).text)["channels"]
+        return self.get_metadata()["channels"]
 
     def get_channel_name_mapping(self) -> dict[str: str]:
         mapping = {}
@@ -51,20 +174,49 @@ class PmecologyRestApiConnector:
 
         return mapping
 
+    def get_column_names(self) -> list[str]:
+        """
+        :return: header row of the tables returned by get_sensor_data, the timestamp and the channel names
+        """
+        return self.__get_columns()[0]
+
+    def __get_columns(self) -> tuple[list[str], dict[str, int]]:
+        """
+        :return: (column names, column map) built from the same channels
+        """
+        columns = self.__columns
+        if columns is not None: return columns
+
+        with self.__channels_lock:
+            if self.__columns is None:
+                name_mapping = {key: channel["name"] for key, channel in self.__channels.items()}
+                column_names = ["timestamp"] + [value for value in name_mapping.values()]
+                self.__columns = (column_names,
+                                  {key: column_names.index(name) for key, name in name_mapping.items()})
+            return self.__columns
+
     def __get_raw_sensor_data(self,
                               timestamp: dt.datetime = None,
                               records: int = None,
-                              descending: bool = None) -> list[dict]:
+                              descending: bool = None,
+                              table_name: str = "") -> list[dict]:
+
+        data_points = json.loads(self.get_persistently(self.get_sensor_data_url(timestamp, records, descending),
+                                                       table_name=table_name).text)["history"]
+        ROWS.inc(len(data_points), stage=STAGE_REST, connector=self.get_metrics_label(), table=table_name)
+
+        return data_points
 
+    def get_sensor_data_url(self, timestamp: dt.datetime = None, records: int = None,
+                            descending: bool = None) -> str:
+        """
+        :return: url of the history of data points greater than (>) timestamp, see get_sensor_data
+        """
         timestamp_string = "" if timestamp is None else "timestamp=" + sf.datetime_to_iso(timestamp)
         records_string = "" if records is None else "records=" + str(records)
         descending = "" if descending is None else "descending=" + str(descending).lower()
 
-        parameters_string = "&".join([timestamp_string, records_string, descending])
-
-        data_points = json.loads(self.get_persistently(self.request_string + parameters_string).text)["history"]
-
-        return data_points
+        return self.request_string + "&".join([timestamp_string, records_string, descending])
 
     def get_sensor_data(self, table_name: str,
                             timestamp: dt.datetime = None,
@@ -81,13 +233,65 @@ class PmecologyRestApiConnector:
         """
         timestamp += dt.timedelta(seconds=1)
 
-        raw_data = self.__get_raw_sensor_data(timestamp, records, descending)
+        raw_data = self.__get_raw_sensor_data(timestamp, records, descending, table_name)
 
         if len(raw_data) <= 0: return None
 
-        name_mapping: dict = self.get_channel_name_mapping()
+        try:
+            return self.build_sensor_table(table_name, raw_data)
+        except UnknownChannelException:
+            # a channel was added since the metadata was cached
+            self.refresh_metadata()
+            return self.build_sensor_table(table_name, raw_data)
+
+    def get_sensor_data_between(self, table_name: str, start: dt.datetime, end: dt.datetime,
+                                page_size: int = 1000) -> DatabaseTable:
+        """
+        Fetches the sensor data of a time window page by page and returns them in a DatabaseTable object
+        :param table_name: name of the returned DatabaseTable
+        :param start: fetch data points greater than (>) start
+        :param end: and lower or equal (<=) to end
+        :param page_size: number of records fetched by one request
+        :return: a DatabaseTable instance like the one of get_sensor_data, empty if there is no data in the window
+        """
+        raw_data = []
+        cursor, last_page = start, False
+        while not last_page:
+            page = self.__get_raw_sensor_data(cursor, page_size, False, table_name)
+            page, cursor, last_page = self.trim_page(page, page_size, end)
+            raw_data += page
 
-        column_names = ["timestamp"] + [value for value in name_mapping.values()]
+        try:
+            return self.build_sensor_table(table_name, raw_data)
+        except UnknownChannelException:
+            self.refresh_metadata()
+            return self.build_sensor_table(table_name, raw_data)
+
+    @staticmethod
+    def trim_page(page: list[dict], page_size: int, end: dt.datetime) -> tuple[list[dict], dt.datetime, bool]:
+        """
+        :param page: data points of a page in ascending order
+        :param page_size: number of requested records
+        :param end: end of the fetched window
+        :return: (data points up to end, timestamp the next page starts after, whether it is the last page of the window)
+        """
+        if len(page) == 0: return page, end, True
+
+        cursor = dt.datetime.fromisoformat(page[-1]["timestamp"])
+        if cursor > end:
+            return [data_point for data_point in page if dt.datetime.fromisoformat(data_point["timestamp"]) <= end], \
+                cursor, True
+        return page, cursor, len(page) < page_size or cursor == end
+
+    def build_sensor_table(self, table_name: str, raw_data: list[dict]) -> DatabaseTable:
+        """
+        :param table_name: name of the returned DatabaseTable
+        :param raw_data: data points returned by the api
+        :return: a DatabaseTable of the data points, see get_sensor_data
+        :raises: UnknownChannelException if a data point holds a channel missing in the cached metadata
+        """
+        column_names, column_map = self.__get_columns()
+        column_count = len(column_names)
 
         table = DatabaseTable(table_name, column_names)
 
@@ -95,17 +299,30 @@ class PmecologyRestApiConnector:
             data_point_timestamp = dt.datetime.fromisoformat(data_point["timestamp"])
             if data_point_timestamp.minute % 5 != 0:
                 continue
-            row = len(column_names) * [None]
+            row = column_count * [None]
             row[0] = data_point_timestamp
 
             sensor_values: dict = data_point["values"]
 
             for key, value in sensor_values.items():
-                row[column_names.index(name_mapping[key])] = value
+                index = column_map.get(key)
+                if index is None:
+                    raise UnknownChannelException(f"Unknown channel {key}")
+                row[index] = value
 
             table.add_row(row, False)
 
         return table
 
 
+class UnknownChannelException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
+
 
+class PmecologyRequestException(Exception):
+    def __init__(self, message, status_code: int):
+        self.message = message
+        self.status_code: int = status_code
+        super().__init__(message)
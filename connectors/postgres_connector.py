@@ -1,6 +1,13 @@
+import itertools
+from typing import Iterable
+
 import psycopg2 as pcpg
+import psycopg2.extras as pcpg_extras
 import support_functions as sf
 from connectors.database_connector import DatabaseConnector, NoneType
+from connectors.postgres_copy_stream import PostgresCopyStream, COPY_FORMAT_TEXT
+from data_types.database_table import DatabaseTable
+from metrics.instrumentation import measure_stage, STAGE_INSERT
 import datetime as dt
 
 class PostgresConnector(DatabaseConnector):
@@ -22,6 +29,12 @@ class PostgresConnector(DatabaseConnector):
 
         super().__init__(login_details, self.__postgres_connect, {}, type_transforms)
 
+        self.__stream_cursor_ids = itertools.count()
+
+        # insert_data switches to COPY for tables with at least this many rows, None to never use COPY
+        self.copy_threshold: int = 50000
+        self.checksum_dialect = "postgres"
+
     @classmethod
     def from_file(cls, filename):
         """
@@ -45,6 +58,96 @@ class PostgresConnector(DatabaseConnector):
             login_details["database"]
         )
 
+    def execute_insert(self, cur, data: DatabaseTable, batch_size: int = None) -> None:
+        """
+        Sends the rows of data with COPY if there are at least copy_threshold of them
+        and as batched INSERT statements otherwise
+        """
+        if self.copy_threshold is not None and data.get_row_count() >= self.copy_threshold:
+            self.execute_copy(cur, data)
+            return
+
+        super().execute_insert(cur, data, batch_size)
+
+    def copy_data(self, data: DatabaseTable | Iterable[DatabaseTable], copy_format: str = COPY_FORMAT_TEXT,
+                  pg_types: list[str] = None) -> int:
+        """
+        Loads data into the table of the same name with COPY FROM STDIN. Chunks are encoded
+        and sent as the server reads them, so an iterator of chunks is loaded in bounded memory.
+        :param data: a DatabaseTable or an iterable of DatabaseTable chunks with the same name and header row
+        :param copy_format: COPY_FORMAT_TEXT or COPY_FORMAT_BINARY
+        :param pg_types: postgres type names of the target columns for the binary format, see PostgresCopyStream
+        :return: the number of copied rows
+        """
+        chunks = iter([data] if isinstance(data, DatabaseTable) else data)
+        first_chunk: DatabaseTable = next(chunks, None)
+        if first_chunk is None: return 0
+
+        with measure_stage(STAGE_INSERT, self.get_metrics_label(), first_chunk.get_table_name()) as timer, \
+                self.checkout() as connection, connection.cursor() as cur:
+            stream = self.execute_copy(cur, itertools.chain([first_chunk], chunks), copy_format, pg_types)
+            connection.commit()
+            timer.add_rows(stream.row_count)
+            timer.add_bytes(stream.byte_count)
+
+        return stream.row_count
+
+    def execute_copy(self, cur, data: DatabaseTable | Iterable[DatabaseTable], copy_format: str = COPY_FORMAT_TEXT,
+                     pg_types: list[str] = None) -> PostgresCopyStream:
+        """
+        Sends the COPY of copy_data without committing
+        :param cur: open cursor
+        :return: the consumed stream, holding the number of copied rows and bytes
+        """
+        chunks = iter([data] if isinstance(data, DatabaseTable) else data)
+        first_chunk: DatabaseTable = next(chunks)
+
+        stream = PostgresCopyStream(itertools.chain([first_chunk], chunks), copy_format, pg_types)
+        cur.copy_expert(f"COPY {first_chunk.get_table_name()} ({', '.join(first_chunk.get_header_row())}) "
+                        f"FROM STDIN WITH (FORMAT {copy_format})", stream)
+        return stream
+
+    def get_checksum_query(self, table_name: str, key_column: str, columns: list[str], condition: str) -> str:
+        """
+        md5 of the md5s of the rows' text representations concatenated in key order
+        """
+        return (f"SELECT count(*), md5(coalesce(string_agg(md5(ROW({', '.join(columns)})::text), '' "
+                f"ORDER BY {key_column}), '')) FROM {table_name} WHERE {condition}")
+
+    def execute_upsert(self, cur, data: DatabaseTable, key_columns: tuple[str], batch_size: int) -> None:
+        """
+        Batched INSERT ... ON CONFLICT (key_columns) DO UPDATE through execute_values
+        """
+        columns = data.get_header_row()
+        updated_columns = [column for column in columns if column not in key_columns]
+        conflict_action = "DO NOTHING" if len(updated_columns) == 0 else \
+            "DO UPDATE SET " + ", ".join(f"{column} = EXCLUDED.{column}" for column in updated_columns)
+
+        pcpg_extras.execute_values(cur,
+                                   f"INSERT INTO {data.get_table_name()} ({', '.join(columns)}) VALUES %s "
+                                   f"ON CONFLICT ({', '.join(key_columns)}) {conflict_action}",
+                                   data.get_table(), page_size=batch_size)
+
+    def get_delete_copies_statement(self, table_name: str, condition: str, copies: int) -> str:
+        return (f"DELETE FROM {table_name} WHERE ctid IN "
+                f"(SELECT ctid FROM {table_name} WHERE {condition} LIMIT {int(copies)})")
+
+    def execute_insert_batch(self, cur, table_name: str, columns: list[str], rows: list) -> None:
+        """
+        Sends the batch as a single multi-row INSERT with bound values using psycopg2's execute_values
+        """
+        pcpg_extras.execute_values(cur, f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES %s",
+                                   rows, page_size=len(rows))
+
+    def create_stream_cursor(self, connection):
+        """
+        Creates a named (server-side) cursor, the result is kept on the server
+        and transferred fetch_chunk_size rows at a time
+        """
+        cur = connection.cursor(name=f"pydbsync_stream_{next(self.__stream_cursor_ids)}")
+        cur.itersize = self.fetch_chunk_size
+        return cur
+
     def __postgres_connect(self):
         dsn: str = (f"dbname={self.login_details['database']} "
                     f"host={self.login_details['host']} "
@@ -0,0 +1,286 @@
+import datetime as dt
+import itertools
+import struct
+from typing import Callable, Iterable, Iterator
+
+from connectors.database_connector import DatabaseConnectorException
+from data_types.tabular import Tabular
+
+COPY_FORMAT_TEXT = "text"
+COPY_FORMAT_BINARY = "binary"
+
+_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_BINARY_TRAILER = struct.pack("!h", -1)
+_NULL_FIELD = struct.pack("!i", -1)
+
+_PG_EPOCH = dt.datetime(2000, 1, 1)
+_PG_EPOCH_DATE = _PG_EPOCH.date()
+_PG_EPOCH_UTC = _PG_EPOCH.replace(tzinfo=dt.timezone.utc)
+
+_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _encode_text_str(value) -> str:
+    return value.translate(_TEXT_ESCAPES)
+
+
+def _encode_text_bool(value) -> str:
+    return "t" if value else "f"
+
+
+def _encode_text_float(value) -> str:
+    if value != value: return "NaN"
+    if value == float("inf"): return "Infinity"
+    if value == float("-inf"): return "-Infinity"
+    return repr(value)
+
+
+def _encode_text_bytes(value) -> str:
+    return "\\\\x" + bytes(value).hex()
+
+
+def _encode_text_temporal(value) -> str:
+    return value.isoformat()
+
+
+def _encode_text_other(value) -> str:
+    return str(value).translate(_TEXT_ESCAPES)
+
+
+# python type -> encoder for COPY text format
+TEXT_ENCODERS: dict[type, Callable] = {
+    str: _encode_text_str,
+    bool: _encode_text_bool,
+    int: str,
+    float: _encode_text_float,
+    bytes: _encode_text_bytes,
+    bytearray: _encode_text_bytes,
+    memoryview: _encode_text_bytes,
+    dt.datetime: _encode_text_temporal,
+    dt.date: _encode_text_temporal,
+    dt.time: _encode_text_temporal,
+}
+
+
+def _binary_struct(fmt: str) -> Callable:
+    packer = struct.Struct("!i" + fmt)
+    size = packer.size - 4
+    return lambda value: packer.pack(size, value)
+
+
+def _encode_binary_text(value) -> bytes:
+    data = value.encode("utf-8")
+    return struct.pack("!i", len(data)) + data
+
+
+def _encode_binary_bytes(value) -> bytes:
+    data = bytes(value)
+    return struct.pack("!i", len(data)) + data
+
+
+_pack_timestamp = _binary_struct("q")
+_pack_date = _binary_struct("i")
+
+
+def _encode_binary_timestamp(value) -> bytes:
+    delta = value - _PG_EPOCH
+    return _pack_timestamp((delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+
+
+def _encode_binary_timestamptz(value) -> bytes:
+    delta = value - _PG_EPOCH_UTC
+    return _pack_timestamp((delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+
+
+def _encode_binary_date(value) -> bytes:
+    return _pack_date((value - _PG_EPOCH_DATE).days)
+
+
+# postgres type name -> encoder for COPY binary format, the encoders include the field length
+BINARY_ENCODERS: dict[str, Callable] = {
+    "bool": _binary_struct("?"),
+    "int2": _binary_struct("h"),
+    "int4": _binary_struct("i"),
+    "int8": _binary_struct("q"),
+    "float4": _binary_struct("f"),
+    "float8": _binary_struct("d"),
+    "text": _encode_binary_text,
+    "varchar": _encode_binary_text,
+    "bytea": _encode_binary_bytes,
+    "timestamp": _encode_binary_timestamp,
+    "timestamptz": _encode_binary_timestamptz,
+    "date": _encode_binary_date,
+}
+
+# python type -> postgres type name assumed for binary COPY when no types are given
+BINARY_TYPE_NAMES: dict[type, str] = {
+    bool: "bool",
+    int: "int8",
+    float: "float8",
+    str: "text",
+    bytes: "bytea",
+    bytearray: "bytea",
+    memoryview: "bytea",
+    dt.datetime: "timestamp",
+    dt.date: "date",
+}
+
+
+def _compile_text_encoder(column_type: type) -> Callable:
+    """
+    :return: encoder of a column whose first non-null value is of column_type, values of other types
+    fall back to a lookup by their type
+    """
+    encode = TEXT_ENCODERS.get(column_type, _encode_text_other)
+
+    def encode_column_value(value) -> str:
+        if type(value) is column_type: return encode(value)
+        return TEXT_ENCODERS.get(type(value), _encode_text_other)(value)
+
+    return encode_column_value
+
+
+def _compile_binary_encoder(type_name: str, column: int) -> Callable:
+    """
+    :return: encoder of a column of the postgres type, in binary format every value has to be encodable as that type
+    """
+    encode = BINARY_ENCODERS[type_name]
+
+    def encode_column_value(value) -> bytes:
+        try:
+            return encode(value)
+        except (struct.error, AttributeError, TypeError, OverflowError):
+            raise CopyEncodingException(f"Value {value!r} of {type(value)} in column {column} can not be sent "
+                                        f"as {type_name} in binary COPY, use the text format")
+
+    return encode_column_value
+
+
+class PostgresCopyStream:
+    def __init__(self, data: Tabular | Iterable[Tabular], copy_format: str = COPY_FORMAT_TEXT,
+                 pg_types: list[str] = None):
+        """
+        A file-like object producing the COPY FROM STDIN payload for the given data as it is read,
+        one chunk at a time. Encoders are chosen once per column, by the column's first non-null value.
+        In text format values of another type than the first one are encoded by their own type
+        :param data: a Tabular or an iterable of Tabular chunks with the same layout
+        :param copy_format: COPY_FORMAT_TEXT or COPY_FORMAT_BINARY
+        :param pg_types: postgres type names of the columns (see BINARY_ENCODERS), only used by the binary format.
+        In binary format the types have to match the target columns exactly, if not given they are
+        guessed from the first non-null value of each column using BINARY_TYPE_NAMES
+        """
+        if copy_format not in (COPY_FORMAT_TEXT, COPY_FORMAT_BINARY):
+            raise CopyEncodingException(f"Unknown COPY format {copy_format}")
+
+        self.copy_format: str = copy_format
+        self.pg_types: list[str] = pg_types
+        self.row_count: int = 0
+        self.byte_count: int = 0  # bytes of the payload read so far
+
+        self.__chunks: Iterator[Tabular] = iter([data] if isinstance(data, Tabular) else data)
+        # encoder of each column, None while the column had no non-null value yet
+        self.__encoders: list[Callable] = None
+        self.__undecided: bool = True  # some of the columns have no encoder yet
+        self.__buffer: bytes = _BINARY_HEADER if copy_format == COPY_FORMAT_BINARY else b""
+        self.__position: int = 0
+        self.__finished: bool = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.__finished and (size < 0 or len(self.__buffer) - self.__position < size):
+            self.__fill_buffer()
+
+        end = len(self.__buffer) if size < 0 else self.__position + size
+        result = self.__buffer[self.__position:end]
+        self.__position = min(end, len(self.__buffer))
+        self.byte_count += len(result)
+        return result
+
+    def readline(self, size: int = -1) -> bytes:
+        return self.read(size)
+
+    def __fill_buffer(self) -> None:
+        # drop the part of the buffer which was already read
+        self.__buffer = self.__buffer[self.__position:]
+        self.__position = 0
+
+        chunk = next(self.__chunks, None)
+        if chunk is None:
+            self.__finished = True
+            if self.copy_format == COPY_FORMAT_BINARY:
+                self.__buffer += _BINARY_TRAILER
+            return
+
+        rows = chunk.get_table()
+        if len(rows) == 0: return
+
+        if self.__undecided:
+            self.__compile_encoders(rows)
+
+        if self.copy_format == COPY_FORMAT_TEXT:
+            self.__buffer += self.__encode_text(rows)
+        else:
+            self.__buffer += self.__encode_binary(rows)
+
+        self.row_count += len(rows)
+
+    def __compile_encoders(self, rows: list) -> None:
+        """
+        Chooses the encoders of the columns which have no encoder yet from their first non-null value in rows.
+        Columns which are all null in rows stay undecided, they are encoded as null only
+        """
+        column_count = len(rows[0])
+
+        if self.copy_format == COPY_FORMAT_BINARY and self.pg_types is not None:
+            if len(self.pg_types) != column_count:
+                raise CopyEncodingException("pg_types has a different amount of columns than the data")
+            try:
+                self.__encoders = [_compile_binary_encoder(type_name, i) for i, type_name in enumerate(self.pg_types)]
+            except KeyError as e:
+                raise CopyEncodingException(f"Binary COPY of type {e} is not supported")
+            self.__undecided = False
+            return
+
+        if self.__encoders is None:
+            self.__encoders = [None] * column_count
+
+        encoders = self.__encoders
+        for i in range(column_count):
+            if encoders[i] is not None: continue
+
+            sample = next((row[i] for row in rows if row[i] is not None), None)
+            if sample is None: continue
+            sample_type = type(sample)
+
+            if self.copy_format == COPY_FORMAT_TEXT:
+                encoders[i] = _compile_text_encoder(sample_type)
+                continue
+
+            if sample_type is dt.datetime and sample.tzinfo is not None:
+                type_name = "timestamptz"
+            else:
+                type_name = BINARY_TYPE_NAMES.get(sample_type)
+            if type_name is None:
+                raise CopyEncodingException(f"Binary COPY of {sample_type} is not supported, pass pg_types "
+                                            f"or use the text format")
+            encoders[i] = _compile_binary_encoder(type_name, i)
+
+        self.__undecided = None in encoders
+
+    def __encode_text(self, rows: list) -> bytes:
+        columns = []
+        for i, encode in enumerate(self.__encoders):
+            columns.append(["\\N" if row[i] is None else encode(row[i]) for row in rows])
+
+        return ("\n".join(map("\t".join, zip(*columns))) + "\n").encode("utf-8")
+
+    def __encode_binary(self, rows: list) -> bytes:
+        columns = [[struct.pack("!h", len(self.__encoders))] * len(rows)]
+        for i, encode in enumerate(self.__encoders):
+            columns.append([_NULL_FIELD if row[i] is None else encode(row[i]) for row in rows])
+
+        return b"".join(itertools.chain.from_iterable(zip(*columns)))
+
+
+class CopyEncodingException(DatabaseConnectorException):
+    def __init__(self, message):
+        super().__init__(message)
@@ -0,0 +1,49 @@
+import threading
+import time
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        A thread safe token bucket limiting how often an operation is performed
+        :param rate: permitted operations per second on average
+        :param burst: number of operations which can be performed at once after a pause
+        """
+        if rate <= 0 or burst < 1:
+            raise RateLimiterException(f"Invalid rate limit rate={rate} burst={burst}")
+
+        self.rate: float = rate
+        self.burst: int = burst
+
+        self.__tokens: float = burst
+        self.__updated: float = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Takes a token, waiting until one is available
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def reserve(self) -> float:
+        """
+        Takes a token without waiting for it, e.g. to wait with asyncio.sleep instead. Waiting callers
+        reserve their tokens in turn, so they are served in the order they arrived
+        :return: seconds to wait before the token may be used
+        """
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.burst, self.__tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+
+            wait = 0 if self.__tokens >= 1 else (1 - self.__tokens) / self.rate
+            self.__tokens -= 1
+            return wait
+
+
+class RateLimiterException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
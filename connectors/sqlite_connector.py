@@ -0,0 +1,106 @@
+import datetime as dt
+import hashlib
+import os
+import sqlite3
+
+from connectors.database_connector import DatabaseConnector, NoneType
+from data_types.database_table import DatabaseTable
+
+
+class SQLiteConnector(DatabaseConnector):
+    def __init__(self, filename: str) -> None:
+        """
+        Connector to a local sqlite3 database, a stand-in for a server in tests and benchmarks
+        :param filename: path of the database file, ":memory:" for a private in-memory database
+        (every pooled connection then gets its own database)
+        """
+        login_details: dict = {
+            "user": "sqlite",
+            "password": None,
+            "host": filename,
+            "port": None,
+            "database": filename
+        }
+
+        type_transforms = {
+            str: lambda x: "'" + x.replace("'", "''") + "'",
+            dt.datetime: "'{arg}'",
+            bool: lambda x: '1' if x else '0',
+            NoneType: "NULL"
+        }
+
+        super().__init__(login_details, self.__sqlite_connect, {}, type_transforms, "?")
+
+        self.checksum_dialect = "sqlite"
+
+    def get_metrics_label(self) -> str:
+        return f"sqlite/{os.path.basename(self.login_details['database'])}"
+
+    def get_checksum_query(self, table_name: str, key_column: str, columns: list[str], condition: str) -> str:
+        """
+        md5 of the rows' values concatenated in key order, md5 is registered on every connection
+        """
+        values = " || '|' || ".join(f"ifnull(CAST({column} AS TEXT), '\\N')" for column in columns)
+        return (f"SELECT count(*), md5(ifnull(group_concat(row_value, ''), '')) FROM "
+                f"(SELECT {values} AS row_value FROM {table_name} WHERE {condition} ORDER BY {key_column})")
+
+    def execute_upsert(self, cur, data: DatabaseTable, key_columns: tuple[str], batch_size: int) -> None:
+        """
+        INSERT ... ON CONFLICT (key_columns) DO UPDATE through executemany
+        """
+        columns = data.get_header_row()
+        updated_columns = [column for column in columns if column not in key_columns]
+        conflict_action = "DO NOTHING" if len(updated_columns) == 0 else \
+            "DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in updated_columns)
+
+        rows = data.get_table()
+        for i in range(0, len(rows), batch_size):
+            cur.executemany(f"INSERT INTO {data.get_table_name()} ({', '.join(columns)}) "
+                            f"VALUES ({', '.join(['?'] * len(columns))}) "
+                            f"ON CONFLICT ({', '.join(key_columns)}) {conflict_action}", rows[i:i + batch_size])
+
+    def get_delete_copies_statement(self, table_name: str, condition: str, copies: int) -> str:
+        return (f"DELETE FROM {table_name} WHERE rowid IN "
+                f"(SELECT rowid FROM {table_name} WHERE {condition} LIMIT {int(copies)})")
+
+    def __sqlite_connect(self):
+        connection = sqlite3.connect(self.login_details["database"], check_same_thread=False,
+                                     detect_types=sqlite3.PARSE_DECLTYPES)
+        connection.create_function("md5", 1, lambda text: hashlib.md5(text.encode("utf-8")).hexdigest(),
+                                   deterministic=True)
+        return SQLiteConnection(connection)
+
+
+class SQLiteConnection:
+    def __init__(self, connection: sqlite3.Connection):
+        """
+        Adapts a sqlite3 connection to the DBAPI features DatabaseConnector relies on,
+        a closed attribute and cursors usable as context managers
+        :param connection: the sqlite3 connection
+        """
+        self.connection: sqlite3.Connection = connection
+        self.closed: int = 0
+
+    def cursor(self):
+        return SQLiteCursor(self.connection.cursor())
+
+    def commit(self) -> None:
+        self.connection.commit()
+
+    def rollback(self) -> None:
+        self.connection.rollback()
+
+    def close(self) -> None:
+        self.connection.close()
+        self.closed = 1
+
+
+class SQLiteCursor:
+    def __init__(self, cursor: sqlite3.Cursor):
+        self.cursor: sqlite3.Cursor = cursor
+
+    def __enter__(self):
+        return self.cursor
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cursor.close()
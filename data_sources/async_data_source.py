@@ -0,0 +1,14 @@
+from abc import abstractmethod
+
+
+class AsyncDataSource:
+    """
+    asyncio variant of DataSource
+    """
+    @abstractmethod
+    async def has_change(self, *args) -> bool:
+        pass
+
+    @abstractmethod
+    async def get_change(self, *args) -> object:
+        pass
@@ -0,0 +1,164 @@
+import asyncio
+from concurrent.futures import Executor
+
+from connectors.async_database_connector import AsyncDatabaseConnector
+from data_sources.async_data_source import AsyncDataSource
+from data_sources.diff_engine import DiffEngine, DIFF_MODE_HASH, DIFF_MODE_POSITIONAL
+from data_sources.string_normalizer import StringNormalizer
+from data_types.change_set import ChangeSet
+from data_types.database_table import DatabaseTable
+from metrics.instrumentation import measure_stage, STAGE_COMPARE
+from state_controllers.async_state_controller import AsyncStateController
+from unidecode import unidecode
+
+
+class AsyncDatabaseDataSource(AsyncDataSource):
+    def __init__(self, table_name: str,
+                 source_state_controller: AsyncStateController,
+                 target_state_controller: AsyncStateController,
+                 key_columns: list[str] = None,
+                 diff_mode: str = DIFF_MODE_HASH):
+        """
+        asyncio variant of DatabaseDataSource. The source and the target state are fetched concurrently,
+        the diff runs in an executor so that large states do not stall the event loop.
+        Usage:
+            await asyncio.gather(*(data_source.synchronize(target_connector) for data_source in data_sources))
+        :param table_name: name of the resulting table
+        :param source_state_controller: source database state controller
+        :param target_state_controller: target database state controller
+        :param key_columns: names of the columns identifying a row, if None whole rows are compared
+        :param diff_mode: DIFF_MODE_HASH or DIFF_MODE_POSITIONAL, see DatabaseDataSource.
+        DIFF_MODE_SORTED_MERGE is not supported
+        """
+        if diff_mode not in (DIFF_MODE_HASH, DIFF_MODE_POSITIONAL):
+            raise AsyncDataSourceException(f"Diff mode {diff_mode} is not supported by AsyncDatabaseDataSource")
+
+        self.table_name: str = table_name
+        self.source_state_controller: AsyncStateController = source_state_controller
+        self.target_state_controller: AsyncStateController = target_state_controller
+
+        self.target_state: DatabaseTable = None
+        self.source_state: DatabaseTable = None
+
+        self.key_columns: list[str] = key_columns
+        self.diff_mode: str = diff_mode
+
+        self.unidecode_on = True  # apply unidecode to fetched strings when comparing states
+        # caches unidecode results per column, kept between cycles
+        self.string_normalizer: StringNormalizer = StringNormalizer(unidecode)
+
+        # executor the diffs run in, the event loop's default executor if None
+        self.diff_executor: Executor = None
+
+        # (args, change set) computed by has_change for get_change to reuse
+        self.__pending_change: tuple = None
+
+    async def has_change(self, *args: dict) -> bool:
+        """
+        :param args: optional kwargs for state queries given in order source_state_kwargs, target_state_kwargs
+        target_kwargs are by default equal to source kwargs unless specified
+        :return: there is (True) or there is no (False) change
+        """
+        change_set = await self.__compute_change_set(*self.__determine_kwargs(*args))
+        self.__pending_change = (args, change_set)
+
+        if change_set.is_empty():
+            # nothing is written, so the state controllers are not committed but end the cycle here
+            await asyncio.gather(self.source_state_controller.invalidate(), self.target_state_controller.invalidate())
+        return not change_set.is_empty()
+
+    async def get_change(self, *args: dict) -> DatabaseTable:
+        """
+        :param args: optional kwargs for state queries, see has_change
+        :return: DatabaseTable of the source rows which have to be written to the target (inserted and updated rows)
+        """
+        return (await self.get_change_set(*args)).get_upserts()
+
+    async def get_change_set(self, *args: dict) -> ChangeSet:
+        """
+        Reuses the change set computed by a preceding has_change call with the same arguments
+        :param args: optional kwargs for state queries, see has_change
+        :return: ChangeSet with the rows to insert, update and delete in the target
+        """
+        pending_change, self.__pending_change = self.__pending_change, None
+        if pending_change is not None and pending_change[0] == args:
+            return pending_change[1]
+
+        return await self.__compute_change_set(*self.__determine_kwargs(*args))
+
+    async def synchronize(self, db_connector: AsyncDatabaseConnector, *args: dict) -> int:
+        """
+        Computes the change and writes it to the target
+        :param db_connector: connector of the target database
+        :param args: optional kwargs for state queries, see has_change
+        :return: number of changed rows
+        """
+        change_set = await self.get_change_set(*args)
+        await self.apply_change(change_set, db_connector)
+        return change_set.get_row_count()
+
+    def diff_states(self, target_state: DatabaseTable, source_state: DatabaseTable) -> ChangeSet:
+        """
+        Computes the change set between the states according to diff_mode, blocking
+        :param target_state:
+        :param source_state:
+        :return: ChangeSet bringing the target state to the source state
+        """
+        with measure_stage(STAGE_COMPARE, table=self.table_name) as timer:
+            diff_engine = DiffEngine(self.key_columns, self.string_normalizer if self.unidecode_on else None)
+
+            if self.diff_mode == DIFF_MODE_POSITIONAL:
+                change_set = diff_engine.positional_diff(target_state, source_state, self.table_name)
+            else:
+                change_set = diff_engine.diff(target_state, source_state, self.table_name,
+                                              target_state.get_header_row())
+
+            timer.add_rows(change_set.get_row_count())
+            return change_set
+
+    async def apply_change(self, change: DatabaseTable | ChangeSet, db_connector: AsyncDatabaseConnector) -> None:
+        """
+        Writes a change to the target and lets the state controllers commit what was synchronised,
+        see DatabaseDataSource.apply_change
+        :param change: ChangeSet returned by get_change_set, or DatabaseTable returned by get_change
+        :param db_connector: connector of the target database
+        :return: None
+        """
+        if isinstance(change, ChangeSet):
+            await db_connector.write_change_set(change, self.key_columns)
+        elif self.key_columns:
+            await db_connector.upsert_data(change, self.key_columns)
+        else:
+            await db_connector.insert_data(change)
+
+        await asyncio.gather(self.source_state_controller.commit(), self.target_state_controller.commit())
+
+    async def __compute_change_set(self, source_kwargs: dict, target_kwargs: dict) -> ChangeSet:
+        self.source_state, self.target_state = await asyncio.gather(
+            self.source_state_controller.get_state(**source_kwargs),
+            self.target_state_controller.get_state(**target_kwargs))
+
+        return await asyncio.get_running_loop().run_in_executor(self.diff_executor, self.diff_states,
+                                                                self.target_state, self.source_state)
+
+    def __determine_kwargs(self, *args) -> list[dict, dict]:
+        if len(args) == 0:
+            return [{}, {}]
+        elif len(args) == 1:
+            return [args[0], args[0]]
+        else:
+            return [args[0], args[1]]
+
+    def set_unidecode(self, state: bool) -> None:
+        """
+        Set unidecode
+        :param state: true if unidecode is true, else false
+        :return: None
+        """
+        self.unidecode_on = state
+
+
+class AsyncDataSourceException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
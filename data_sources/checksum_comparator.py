@@ -0,0 +1,144 @@
+from connectors.database_connector import DatabaseConnector
+from data_types.database_table import DatabaseTable
+
+
+class ChecksumComparator:
+    def __init__(self, source_connector: DatabaseConnector, target_connector: DatabaseConnector,
+                 source_table: str, target_table: str, key_column: str, columns: list[str],
+                 partitions: int = 16, leaf_rows: int = 1000):
+        """
+        Finds the key ranges in which two tables differ by comparing checksums computed on the servers,
+        bisecting mismatched ranges until they are small enough to be fetched.
+        Both connectors have to be of the same checksum_dialect.
+        :param source_connector: connector of the source database
+        :param target_connector: connector of the target database
+        :param source_table: name of the source table
+        :param target_table: name of the target table
+        :param key_column: orderable column with the same values on both sides, ranges are split on it.
+        Numeric and datetime keys are bisected, ranges of other key types are fetched as soon as they mismatch.
+        Rows whose key is NULL are in no range and are not compared
+        :param columns: compared columns, in the same order as in the states of the data source
+        :param partitions: number of ranges the key space is split into at first
+        :param leaf_rows: ranges with at most this many rows on both sides are fetched instead of bisected
+        """
+        if source_connector.checksum_dialect is None or \
+                source_connector.checksum_dialect != target_connector.checksum_dialect:
+            raise ChecksumComparatorException(
+                f"Checksums of dialects {source_connector.checksum_dialect} and "
+                f"{target_connector.checksum_dialect} can not be compared")
+
+        self.source_connector: DatabaseConnector = source_connector
+        self.target_connector: DatabaseConnector = target_connector
+        self.source_table: str = source_table
+        self.target_table: str = target_table
+        self.key_column: str = key_column
+        self.columns: list[str] = columns
+        self.partitions: int = partitions
+        self.leaf_rows: int = leaf_rows
+
+        # (key range, row counts) of the mismatched partitions found by has_change, for find_changed_ranges
+        self.__pending_ranges: list[tuple] = None
+
+    def has_change(self) -> bool:
+        """
+        Compares the checksums of the partitions of the key space, find_changed_ranges called next
+        continues from the mismatched ones instead of computing them again
+        :return: whether any partition differs
+        """
+        self.__pending_ranges = self.__get_mismatched_partitions()
+        return len(self.__pending_ranges) > 0
+
+    def find_changed_ranges(self) -> list[tuple]:
+        """
+        :return: list of (lower, upper, upper_inclusive) key ranges, each holding at most leaf_rows rows
+        on either side (unless its keys can not be bisected) and containing every differing row
+        """
+        mismatched, self.__pending_ranges = self.__pending_ranges, None
+        if mismatched is None:
+            mismatched = self.__get_mismatched_partitions()
+        changed = []
+
+        while len(mismatched) > 0:
+            key_range, counts = mismatched.pop()
+            if max(counts) <= self.leaf_rows:
+                changed.append(key_range)
+                continue
+
+            halves = DatabaseConnector.split_key_range(*key_range, 2)
+            if len(halves) < 2:
+                changed.append(key_range)
+            else:
+                mismatched += self.__get_mismatched(halves)
+
+        changed.sort(key=lambda key_range: key_range[0])
+        return changed
+
+    def fetch_changed_rows(self) -> tuple[DatabaseTable, DatabaseTable]:
+        """
+        Fetches the rows of the changed ranges from both sides
+        :return: (target rows, source rows), to be diffed by key
+        """
+        changed_ranges = self.find_changed_ranges()
+
+        target_state = DatabaseTable(self.target_table, self.columns)
+        source_state = DatabaseTable(self.source_table, self.columns)
+
+        for key_range in changed_ranges:
+            target_state.append_table(self.__fetch(self.target_connector, self.target_table, key_range).get_table())
+            source_state.append_table(self.__fetch(self.source_connector, self.source_table, key_range).get_table())
+
+        return target_state, source_state
+
+    def __get_mismatched_partitions(self) -> list[tuple]:
+        """
+        The partitions cover the keys between the lowest and the highest one of both tables, the same
+        ranges the rows are fetched by, so rows with a NULL key are left out of every comparison
+        """
+        lower, upper = self.__get_bounds()
+        if lower is None: return []
+        return self.__get_mismatched(DatabaseConnector.split_key_range(lower, upper, True, self.partitions))
+
+    def __get_mismatched(self, key_ranges: list[tuple]) -> list[tuple]:
+        """
+        :return: (key range, row counts of both sides) of the ranges whose checksums differ
+        """
+        mismatched = []
+        for key_range in key_ranges:
+            counts = self.__checksums(*key_range)[1]
+            if counts is not None:
+                mismatched.append((key_range, counts))
+        return mismatched
+
+    def __get_bounds(self) -> tuple:
+        source_bounds = self.source_connector.get_key_bounds(self.source_table, self.key_column)
+        target_bounds = self.target_connector.get_key_bounds(self.target_table, self.key_column)
+
+        lows = [bound for bound in (source_bounds[0], target_bounds[0]) if bound is not None]
+        highs = [bound for bound in (source_bounds[1], target_bounds[1]) if bound is not None]
+        if len(lows) == 0: return None, None
+
+        return min(lows), max(highs)
+
+    def __checksums(self, lower, upper, upper_inclusive: bool) -> tuple:
+        """
+        :return: (None, None) if the range matches, otherwise (checksums, row counts) of both sides
+        """
+        source_count, source_checksum = self.source_connector.get_range_checksum(
+            self.source_table, self.key_column, self.columns, lower, upper, upper_inclusive)
+        target_count, target_checksum = self.target_connector.get_range_checksum(
+            self.target_table, self.key_column, self.columns, lower, upper, upper_inclusive)
+
+        if source_count == target_count and source_checksum == target_checksum:
+            return None, None
+        return (source_checksum, target_checksum), (source_count, target_count)
+
+    def __fetch(self, db_connector: DatabaseConnector, table_name: str, key_range: tuple) -> DatabaseTable:
+        condition, params = db_connector.get_range_condition(self.key_column, *key_range)
+        return db_connector.execute_sql_query(
+            f"SELECT {', '.join(self.columns)} FROM {table_name} WHERE {condition}", table_name, params)
+
+
+class ChecksumComparatorException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
@@ -1,20 +1,36 @@
+from typing import Iterable, Iterator
+
 from data_sources.data_source import DataSource
+from data_sources.diff_engine import DiffEngine, DIFF_MODE_HASH, DIFF_MODE_POSITIONAL, DIFF_MODE_SORTED_MERGE
+from data_sources.sorted_merge_diff_engine import SortedMergeDiffEngine
+from data_sources.checksum_comparator import ChecksumComparator
+from data_sources.string_normalizer import StringNormalizer
+from data_sources.target_state_cache import TargetStateCache
 from data_types.database_table import DatabaseTable
+from data_types.change_set import ChangeSet
 from unidecode import unidecode
 import support_functions as sf
 
 from state_controllers.state_controller import StateController
+from connectors.database_connector import DatabaseConnector
+from metrics.instrumentation import measure_stage, STAGE_COMPARE
 
 
 class DatabaseDataSource(DataSource):
     def __init__(self, table_name: str,
                  source_state_controller: StateController,
-                 target_state_controller: StateController):
+                 target_state_controller: StateController,
+                 key_columns: list[str] = None,
+                 diff_mode: str = DIFF_MODE_HASH):
         """
         Creates a database data source object
         :param table_name: name of the resulting table 
         :param source_state_controller: source database state controller
         :param target_state_controller: target database state controller
+        :param key_columns: names of the columns identifying a row, if None whole rows are compared
+        :param diff_mode: DIFF_MODE_HASH to match rows by key (or row fingerprint) in a single pass,
+        DIFF_MODE_POSITIONAL to compare the states row by row in order,
+        DIFF_MODE_SORTED_MERGE to merge-join both states streamed in key order without holding them in memory
         """
         self.table_name: str = table_name
         self.source_state_controller: StateController = source_state_controller
@@ -23,9 +39,36 @@ class DatabaseDataSource(DataSource):
         self.target_state: DatabaseTable = None
         self.source_state: DatabaseTable = None
 
+        self.key_columns: list[str] = key_columns
+        self.diff_mode: str = diff_mode
+
         self.unidecode_on = True  # apply unidecode to fetched strings when comparing states
+        # caches unidecode results per column, kept between cycles
+        self.string_normalizer: StringNormalizer = StringNormalizer(unidecode)
+
+        # if set, the source state is streamed in chunks of this size through the diff instead of being
+        # fetched whole. Applies to DIFF_MODE_HASH and DIFF_MODE_SORTED_MERGE, self.source_state is left as None
+        self.stream_chunk_size: int = None
+
+        # DIFF_MODE_SORTED_MERGE: True if the state queries order their rows by key_columns (by all columns
+        # without key_columns), False to sort the streamed states locally in runs spilled to spill_directory.
+        # The change is computed and written in chunks of change_chunk_size rows
+        self.presorted: bool = True
+        self.spill_directory: str = None
+        self.change_chunk_size: int = 10000
+
+        # if set, has_change and get_change compare server-side checksums of key ranges and
+        # fetch only the ranges which differ, the state controllers' queries are not used
+        self.checksum_comparator: ChecksumComparator = None
+
+        # if set, the target state is served from this local copy, which is updated by apply_change
+        # and only re-read from the target every target_cache.verify_interval seconds.
+        # Not used in DIFF_MODE_SORTED_MERGE, which never holds the whole target state
+        self.target_cache: TargetStateCache = None
+
+        # (args, change set) computed by has_change for get_change to reuse
+        self.__pending_change: tuple = None
 
-    # TODOXD: add primary key comparison optimisation
     def compare_states(self, target_state: DatabaseTable, source_state: DatabaseTable) -> int:
         """
         Returns -1 if the states are the same, otherwise returns the index of the first row with a change
@@ -33,6 +76,10 @@ class DatabaseDataSource(DataSource):
         :param source_state:
         :return:
         """
+        with measure_stage(STAGE_COMPARE, table=self.table_name):
+            return self.__compare_states(target_state, source_state)
+
+    def __compare_states(self, target_state: DatabaseTable, source_state: DatabaseTable) -> int:
         if target_state.column_count != source_state.column_count:
             raise Exception("The actual state has more columns that the saved state")
         # if target_state.header_row != where bil_datautworzenia > '2023-11-18 11:30:00'source_state.header_row:
@@ -42,7 +89,9 @@ class DatabaseDataSource(DataSource):
             if target_state.get_row_count() <= i: return i
             for j, elem in enumerate(source_state[i]):
                 if type(elem) == str:
-                    if self.unidecode_on and unidecode(elem) != unidecode(target_state[i][j]): return i
+                    if self.unidecode_on:
+                        normalize = self.string_normalizer.for_column(j)
+                        if type(target_state[i][j]) != str or normalize(elem) != normalize(target_state[i][j]): return i
                     if not self.unidecode_on and elem != target_state[i][j]: return i
                 elif elem != target_state[i][j]: return i
 
@@ -55,29 +104,196 @@ class DatabaseDataSource(DataSource):
         :return: there is (True) or there is no (False) change
         """
 
+        if self.checksum_comparator is not None:
+            return self.checksum_comparator.has_change()
+
         source_kwargs, target_kwargs = self.__determine_kwargs(*args)
 
-        self.target_state = self.target_state_controller.get_state(**target_kwargs)
+        if self.diff_mode == DIFF_MODE_SORTED_MERGE:
+            # the merge stops at the first changed row, the states are read at most one stream chunk past it
+            target_chunks, source_chunks = self.__stream_states(source_kwargs, target_kwargs)
+            change_sets = self.__get_sorted_merge_diff_engine(1).diff_chunks(target_chunks, source_chunks,
+                                                                               self.table_name)
+            try:
+                changed = any(not change_set.is_empty() for change_set in change_sets)
+            finally:
+                change_sets.close()
+            return self.__end_cycle_unless(changed)
+
+        if self.diff_mode != DIFF_MODE_POSITIONAL:
+            # get_change called with the same arguments next reuses this change set
+            change_set = self.__compute_change_set(source_kwargs, target_kwargs)
+            self.__pending_change = (args, change_set)
+            return self.__end_cycle_unless(not change_set.is_empty())
+
+        self.target_state = self.__get_target_state(target_kwargs)
         self.source_state = self.source_state_controller.get_state(**source_kwargs)
+        self.__pending_change = (args, None)
 
-        return self.compare_states(self.target_state, self.source_state) != -1
+        return self.__end_cycle_unless(self.compare_states(self.target_state, self.source_state) != -1)
 
     def get_change(self, *args: dict) -> DatabaseTable:
-        source_kwargs, target_kwargs = self.__determine_kwargs(*args)
-        
+        """
+        :param args: optional kwargs for state queries, see has_change
+        :return: DatabaseTable of the source rows which have to be written to the target (inserted and updated rows)
+        """
+        return self.get_change_set(*args).get_upserts()
+
+    def get_change_set(self, *args: dict) -> ChangeSet:
+        """
+        Reuses the states fetched by a preceding has_change call with the same arguments
+        :param args: optional kwargs for state queries, see has_change
+        :return: ChangeSet with the rows to insert, update and delete in the target
+        """
+        pending_change, self.__pending_change = self.__pending_change, None
+        if pending_change is not None and pending_change[0] == args:
+            if pending_change[1] is not None:
+                return pending_change[1]
+            return self.diff_states(self.target_state, self.source_state)
+
+        if self.checksum_comparator is not None:
+            self.target_state, self.source_state = self.checksum_comparator.fetch_changed_rows()
+            return self.diff_states(self.target_state, self.source_state)
+
+        return self.__compute_change_set(*self.__determine_kwargs(*args))
+
+    def stream_change_sets(self, *args: dict) -> Iterator[ChangeSet]:
+        """
+        Streams both states ordered by key through a SortedMergeDiffEngine and yields the change set
+        in chunks of at most change_chunk_size rows, so that neither state nor the whole change
+        has to be held in memory. Used by DIFF_MODE_SORTED_MERGE, works in any mode.
+        :param args: optional kwargs for state queries, see has_change
+        :return: iterator of ChangeSet objects, see SortedMergeDiffEngine.diff_chunks
+        """
+        target_chunks, source_chunks = self.__stream_states(*self.__determine_kwargs(*args))
+        return self.__get_sorted_merge_diff_engine().diff_chunks(target_chunks, source_chunks, self.table_name)
+
+    def synchronize(self, db_connector: DatabaseConnector, *args: dict) -> int:
+        """
+        Computes the change and writes it to the target. In DIFF_MODE_SORTED_MERGE every chunk of the change
+        is written as soon as it is computed, the state controllers commit once all of them are written.
+        The writes must not share a connection with the streamed reads (e.g. a postgres named cursor is closed
+        by the commit), so db_connector should use a connection pool or be separate from the state controllers'.
+        :param db_connector: connector of the target database
+        :param args: optional kwargs for state queries, see has_change
+        :return: number of changed rows
+        """
+        if self.diff_mode != DIFF_MODE_SORTED_MERGE:
+            change_set = self.get_change_set(*args)
+            self.apply_change(change_set, db_connector)
+            return change_set.get_row_count()
+
+        row_count = 0
+        for change_set in self.stream_change_sets(*args):
+            self.__write_change(change_set, db_connector)
+            row_count += change_set.get_row_count()
+
+        self.__commit_state_controllers()
+        return row_count
+
+    def diff_states(self, target_state: DatabaseTable, source_state: DatabaseTable | Iterable[DatabaseTable]) -> ChangeSet:
+        """
+        Computes the change set between the states according to diff_mode
+        :param target_state:
+        :param source_state: the source state, or an iterator of its chunks in DIFF_MODE_HASH and DIFF_MODE_SORTED_MERGE
+        :return: ChangeSet bringing the target state to the source state
+        """
+        # a streamed source state is fetched while it is compared, the fetch stage is reported separately
+        with measure_stage(STAGE_COMPARE, table=self.table_name) as timer:
+            change_set = self.__diff_states(target_state, source_state)
+            timer.add_rows(change_set.get_row_count())
+            return change_set
+
+    def __diff_states(self, target_state: DatabaseTable, source_state: DatabaseTable | Iterable[DatabaseTable]) -> ChangeSet:
+        if self.diff_mode == DIFF_MODE_SORTED_MERGE:
+            return self.__get_sorted_merge_diff_engine().diff(target_state, source_state, self.table_name)
+
+        diff_engine = DiffEngine(self.key_columns, self.string_normalizer if self.unidecode_on else None)
+
+        if self.diff_mode == DIFF_MODE_POSITIONAL:
+            return diff_engine.positional_diff(target_state, source_state, self.table_name)
+
+        return diff_engine.diff(target_state, source_state, self.table_name, target_state.get_header_row())
+
+    def apply_change(self, change: DatabaseTable | ChangeSet, db_connector: DatabaseConnector) -> None:
+        """
+        Writes a change to the target and lets the state controllers commit what was synchronised.
+        A ChangeSet is written in a single transaction, see DatabaseConnector.write_change_set.
+        With key_columns set, deleted rows are deleted by key and updated rows are upserted, otherwise
+        deleted rows are matched on all columns (NULL matching NULL), one copy per deleted row.
+        Inserted rows use the connector's bulk write mode, e.g. PostgresConnector uses COPY above its copy_threshold.
+        :param change: ChangeSet returned by get_change_set, or DatabaseTable returned by get_change
+        (upserted by key if key_columns is set, inserted otherwise)
+        :param db_connector: connector of the target database
+        :return: None
+        """
+        self.__write_change(change, db_connector)
+        self.__commit_state_controllers()
+
+    def __write_change(self, change: DatabaseTable | ChangeSet, db_connector: DatabaseConnector) -> None:
+        if isinstance(change, ChangeSet):
+            db_connector.write_change_set(change, self.key_columns)
+        elif self.key_columns:
+            db_connector.upsert_data(change, self.key_columns)
+        else:
+            db_connector.insert_data(change)
+
+        if self.target_cache is not None:
+            self.target_cache.apply(change, self.key_columns)
+
+    def __commit_state_controllers(self) -> None:
+        self.source_state_controller.commit()
+        self.target_state_controller.commit()
+
+    def __end_cycle_unless(self, changed: bool) -> bool:
+        """
+        Without a change nothing is written and the state controllers are not committed,
+        they are invalidated instead, so that the next poll does not reuse this cycle's states
+        :return: changed
+        """
+        if not changed:
+            self.source_state_controller.invalidate()
+            self.target_state_controller.invalidate()
+        return changed
+
+    def __get_sorted_merge_diff_engine(self, change_chunk_size: int = None) -> SortedMergeDiffEngine:
+        return SortedMergeDiffEngine(self.key_columns, self.string_normalizer if self.unidecode_on else None,
+                                     self.presorted, spill_directory=self.spill_directory,
+                                     change_chunk_size=change_chunk_size or self.change_chunk_size)
+
+    def __compute_change_set(self, source_kwargs: dict, target_kwargs: dict) -> ChangeSet:
+        if self.diff_mode == DIFF_MODE_SORTED_MERGE:
+            target_chunks, source_chunks = self.__stream_states(source_kwargs, target_kwargs)
+            return self.__get_sorted_merge_diff_engine().diff(target_chunks, source_chunks, self.table_name)
+
+        if self.stream_chunk_size is not None and self.diff_mode == DIFF_MODE_HASH:
+            self.target_state = self.__get_target_state(target_kwargs)
+            self.source_state = None
+            source_chunks = self.source_state_controller.stream_state(self.stream_chunk_size, **source_kwargs)
+            return self.diff_states(self.target_state, source_chunks)
+
         self.source_state = self.source_state_controller.get_state(**source_kwargs)
-        self.target_state = self.target_state_controller.get_state(**target_kwargs)
+        self.target_state = self.__get_target_state(target_kwargs)
 
-        change = DatabaseTable(self.table_name, self.target_state.get_header_row())
+        return self.diff_states(self.target_state, self.source_state)
 
-        diff: int = self.compare_states(self.target_state, self.source_state)
+    def __stream_states(self, source_kwargs: dict, target_kwargs: dict) -> tuple[Iterator, Iterator]:
+        self.source_state = self.target_state = None
+        return (self.target_state_controller.stream_state(self.stream_chunk_size, **target_kwargs),
+                self.source_state_controller.stream_state(self.stream_chunk_size, **source_kwargs))
 
-        while diff != -1:
-            change.add_row(self.source_state[diff])
-            self.source_state.discard_row(diff)
-            diff: int = self.compare_states(self.target_state, self.source_state)
+    def __get_target_state(self, target_kwargs: dict) -> DatabaseTable:
+        if self.target_cache is None:
+            return self.target_state_controller.get_state(**target_kwargs)
 
-        return change
+        # keyed by what the query fetches rather than by its kwargs, e.g. an incremental controller
+        # fetches another window on every cycle with the same kwargs
+        state_key = self.target_state_controller.get_state_key(**target_kwargs)
+        state = self.target_cache.get(state_key)
+        if state is None:
+            state = self.target_state_controller.get_state(**target_kwargs)
+            self.target_cache.put(state_key, state)
+        return state
 
     def __determine_kwargs(self, *args) -> list[dict, dict]:
         if len(args) == 0:
@@ -0,0 +1,195 @@
+from typing import Callable, Iterable
+
+from data_sources.string_normalizer import StringNormalizer
+from data_types.tabular import Tabular
+from data_types.change_set import ChangeSet
+
+# rows are matched by key columns (or by a fingerprint of the whole row) using a hash index of the target
+DIFF_MODE_HASH = "hash"
+# rows are matched by their position in the table, only rows missing from the target are reported
+DIFF_MODE_POSITIONAL = "positional"
+# both states are streamed ordered by key and merge-joined, see SortedMergeDiffEngine
+DIFF_MODE_SORTED_MERGE = "sorted_merge"
+
+
+class DiffEngine:
+    def __init__(self, key_columns: list[str] | tuple[str] = None, normalize: Callable | StringNormalizer = None):
+        """
+        Creates a diff engine
+        :param key_columns: names of the columns identifying a row. If None or empty, rows are
+        identified by a fingerprint of all of their values and changed rows show up as a delete and an insert
+        :param normalize: func(str) -> str applied to every string value before comparing, None to compare as is.
+        A StringNormalizer normalizes every distinct value of a column once
+        """
+        self.key_columns: tuple[str] = tuple(key_columns) if key_columns else ()
+        self.normalize: Callable | StringNormalizer = normalize
+
+        self.__normalizers: list[Callable] = []
+
+    def diff(self, target_state: Tabular | Iterable[Tabular], source_state: Tabular | Iterable[Tabular],
+             table_name: str, header_row: list[str] = None) -> ChangeSet:
+        """
+        Computes the change set bringing the target state to the source state in a single pass over both.
+        The target is hashed into an index, the source is only streamed through it, so either state
+        can be given as a Tabular or as an iterable of Tabular chunks.
+        :param target_state: current state of the target
+        :param source_state: current state of the source
+        :param table_name: name of the resulting change set
+        :param header_row: header row of the change set, by default the header row of the target
+        :return: ChangeSet with inserted, updated and deleted rows
+        """
+        target_chunks = self.__as_chunks(target_state)
+        source_chunks = self.__as_chunks(source_state)
+
+        target_index: dict = {}
+        key_indexes: list[int] = None
+        column_count: int = None
+
+        for chunk in target_chunks:
+            if key_indexes is None:
+                header_row = header_row if header_row is not None else chunk.get_header_row()
+                key_indexes = self.__get_key_indexes(chunk)
+                column_count = chunk.column_count
+            self.__build_index(target_index, chunk.iter_rows(), key_indexes)
+
+        change_set: ChangeSet = None
+
+        for chunk in source_chunks:
+            if change_set is None:
+                if key_indexes is None:
+                    # the target was empty, take the layout from the source
+                    header_row = header_row if header_row is not None else chunk.get_header_row()
+                    key_indexes = self.__get_key_indexes(chunk)
+                elif chunk.column_count != column_count:
+                    raise DiffEngineException("The source state has a different column count than the target state")
+                change_set = ChangeSet(table_name, header_row, self.key_columns)
+            self.__probe_index(target_index, chunk.iter_rows(), key_indexes, change_set)
+
+        if change_set is None:
+            if header_row is None:
+                raise DiffEngineException("Both states are empty streams, the header row can not be determined")
+            change_set = ChangeSet(table_name, header_row, self.key_columns)
+
+        # whatever was not matched by a source row is gone from the source
+        for rows in target_index.values():
+            if self.key_columns:
+                change_set.deletes.add_row(rows[1])
+            else:
+                change_set.deletes.append_table(rows)
+
+        return change_set
+
+    def positional_diff(self, target_state: Tabular, source_state: Tabular, table_name: str) -> ChangeSet:
+        """
+        Compares the states row by row in order and reports source rows which do not line up with the target
+        as inserts. Equivalent to repeatedly finding and discarding the first differing row, but linear.
+        :param target_state: current state of the target
+        :param source_state: current state of the source
+        :param table_name: name of the resulting change set
+        :return: ChangeSet with inserted rows only
+        """
+        if target_state.column_count != source_state.column_count:
+            raise DiffEngineException("The source state has a different column count than the target state")
+
+        change_set = ChangeSet(table_name, target_state.get_header_row())
+        target_rows: list = target_state.get_table()
+        target_count: int = len(target_rows)
+
+        j = 0
+        for row in source_state.iter_rows():
+            if j < target_count and self.rows_equal(row, target_rows[j]):
+                j += 1
+            else:
+                change_set.inserts.add_row(row)
+
+        return change_set
+
+    def rows_equal(self, source_row: list | tuple, target_row: list | tuple) -> bool:
+        if self.normalize is None:
+            return list(source_row) == list(target_row)
+
+        normalizers = self.__get_normalizers(len(source_row))
+        for source_value, target_value, normalize in zip(source_row, target_row, normalizers):
+            if type(source_value) == str:
+                if type(target_value) != str or normalize(source_value) != normalize(target_value):
+                    return False
+            elif source_value != target_value:
+                return False
+
+        return True
+
+    def fingerprint(self, row: list | tuple) -> tuple:
+        """
+        :return: a hashable representation of the row with string values normalized
+        """
+        if self.normalize is None:
+            return tuple(row)
+        return tuple(normalize(value) if type(value) == str else value
+                     for value, normalize in zip(row, self.__get_normalizers(len(row))))
+
+    def __get_normalizers(self, column_count: int) -> list[Callable]:
+        if len(self.__normalizers) < column_count:
+            if isinstance(self.normalize, StringNormalizer):
+                self.__normalizers = [self.normalize.for_column(i) for i in range(column_count)]
+            else:
+                self.__normalizers = [self.normalize] * column_count
+        return self.__normalizers
+
+    def __get_key_indexes(self, state: Tabular) -> list[int]:
+        return [state.get_column_index(column) for column in self.key_columns]
+
+    def __build_index(self, index: dict, rows: Iterable, key_indexes: list[int]) -> None:
+        fingerprint = self.fingerprint
+
+        if not key_indexes:
+            for row in rows:
+                row_fingerprint = fingerprint(row)
+                matches = index.get(row_fingerprint)
+                if matches is None:
+                    index[row_fingerprint] = [row]
+                else:
+                    matches.append(row)
+            return
+
+        for row in rows:
+            row_fingerprint = fingerprint(row)
+            key = tuple(row_fingerprint[i] for i in key_indexes)
+            if key in index:
+                raise DiffEngineException(f"Key {key} is not unique in the target state")
+            index[key] = (row_fingerprint, row)
+
+    def __probe_index(self, index: dict, rows: Iterable, key_indexes: list[int], change_set: ChangeSet) -> None:
+        fingerprint = self.fingerprint
+
+        if not key_indexes:
+            for row in rows:
+                row_fingerprint = fingerprint(row)
+                matches = index.get(row_fingerprint)
+                if matches is None:
+                    change_set.inserts.add_row(row)
+                    continue
+                matches.pop()
+                if len(matches) == 0:
+                    del index[row_fingerprint]
+            return
+
+        for row in rows:
+            row_fingerprint = fingerprint(row)
+            key = tuple(row_fingerprint[i] for i in key_indexes)
+            match = index.pop(key, None)
+            if match is None:
+                change_set.inserts.add_row(row)
+            elif match[0] != row_fingerprint:
+                change_set.updates.add_row(row)
+
+    @staticmethod
+    def __as_chunks(state: Tabular | Iterable[Tabular]) -> Iterable[Tabular]:
+        if isinstance(state, Tabular):
+            return [state]
+        return state
+
+
+class DiffEngineException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
@@ -0,0 +1,120 @@
+import datetime as dt
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Iterator
+
+import support_functions as sf
+from connectors.pmecology_rest_api_connector import PmecologyRestApiConnector
+from connectors.rate_limiter import RateLimiter
+from data_types.database_table import DatabaseTable
+
+
+class PmecologyBackfill:
+    def __init__(self, api_connector: PmecologyRestApiConnector, table_name: str,
+                 start: dt.datetime = None, end: dt.datetime = None, window: dt.timedelta = dt.timedelta(days=1),
+                 workers: int = 4, requests_per_second: float = None, page_size: int = 1000,
+                 checkpoint_filename: str = None):
+        """
+        Loads the history of a station by splitting it into time windows, which are fetched concurrently
+        and delivered in timestamp order
+        :param api_connector: connector of the station, its pool_size should be at least workers
+        :param table_name: name of the returned DatabaseTables
+        :param start: load data points after (>) start, by default from the first recorded one
+        :param end: load data points up to (<=) end, by default up to the last one recorded when the backfill starts
+        :param window: time span fetched by one worker at a time
+        :param workers: number of windows fetched concurrently
+        :param requests_per_second: limit of the request rate, installed on api_connector unless it
+        already has a rate limiter. None for no limit
+        :param page_size: number of records fetched by one request
+        :param checkpoint_filename: file the end of the last delivered window is persisted to, a backfill
+        with an existing checkpoint resumes after it. None to keep no checkpoint
+        """
+        if window <= dt.timedelta(0) or workers < 1:
+            raise BackfillException(f"Invalid backfill window={window} workers={workers}")
+
+        self.api_connector: PmecologyRestApiConnector = api_connector
+        self.table_name: str = table_name
+        self.start: dt.datetime = start
+        self.end: dt.datetime = end
+        self.window: dt.timedelta = window
+        self.workers: int = workers
+        self.page_size: int = page_size
+        self.checkpoint_filename: str = checkpoint_filename
+
+        if requests_per_second is not None and api_connector.rate_limiter is None:
+            api_connector.rate_limiter = RateLimiter(requests_per_second, workers)
+
+        self.checkpoint: dt.datetime = None
+        if checkpoint_filename is not None and os.path.exists(checkpoint_filename):
+            self.checkpoint = sf.read_object(checkpoint_filename)
+
+    def get_windows(self) -> list[tuple[dt.datetime, dt.datetime]]:
+        """
+        :return: (start, end) of the windows left to load in timestamp order, a window holds the data points
+        start < timestamp <= end
+        """
+        start = self.start
+        if start is None:
+            start = self.api_connector.get_first_recorded_timestamp() - dt.timedelta(seconds=1)
+        if self.checkpoint is not None and self.checkpoint > start:
+            start = self.checkpoint
+
+        end = self.api_connector.get_last_recorded_timestamp() if self.end is None else self.end
+
+        windows = []
+        while start < end:
+            windows.append((start, min(start + self.window, end)))
+            start = windows[-1][1]
+        return windows
+
+    def stream(self) -> Iterator[DatabaseTable]:
+        """
+        Yields the data of every window in timestamp order. A window is checkpointed once the next one
+        is requested, i.e. after the consumer has processed it. At most twice as many windows as there
+        are workers are fetched ahead of the consumer.
+        :return:
+        """
+        windows = deque(self.get_windows())
+        pending: deque[tuple[tuple[dt.datetime, dt.datetime], Future]] = deque()
+
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="backfill") as executor:
+            try:
+                while len(windows) > 0 or len(pending) > 0:
+                    while len(windows) > 0 and len(pending) < 2 * self.workers:
+                        window = windows.popleft()
+                        pending.append((window, executor.submit(self.api_connector.get_sensor_data_between,
+                                                                self.table_name, *window, self.page_size)))
+
+                    window, future = pending.popleft()
+                    yield future.result()
+                    self.__save_checkpoint(window[1])
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def run(self, consume: Callable[[DatabaseTable], None]) -> int:
+        """
+        Loads the windows left to load
+        :param consume: func(table), e.g. inserting the table into the target database
+        :return: number of loaded rows
+        """
+        rows = 0
+        for table in self.stream():
+            if table.get_row_count() > 0:
+                consume(table)
+            rows += table.get_row_count()
+
+        sf.print_to_console(f"Backfilled {rows} rows of {self.table_name} up to {self.checkpoint}")
+        return rows
+
+    def __save_checkpoint(self, timestamp: dt.datetime) -> None:
+        self.checkpoint = timestamp
+        if self.checkpoint_filename is not None:
+            sf.save_object(timestamp, self.checkpoint_filename)
+
+
+class BackfillException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
@@ -0,0 +1,195 @@
+import heapq
+import pickle
+import tempfile
+from typing import Callable, Iterable, Iterator
+
+from data_sources.diff_engine import DiffEngine, DiffEngineException
+from data_sources.string_normalizer import StringNormalizer
+from data_types.change_set import ChangeSet
+from data_types.tabular import Tabular
+
+
+class SortedMergeDiffEngine(DiffEngine):
+    def __init__(self, key_columns: list[str] | tuple[str] = None, normalize: Callable | StringNormalizer = None,
+                 presorted: bool = True, spill_run_size: int = 100000, spill_directory: str = None,
+                 change_chunk_size: int = 10000):
+        """
+        Diff engine merge-joining two streams ordered by key, so neither state has to be held in memory.
+        Produces the same change set as DiffEngine.diff, split into chunks.
+        :param key_columns: names of the columns identifying a row. If None or empty, the states have to be
+        ordered by all of their columns and rows are matched by their whole (normalized) value
+        :param normalize: see DiffEngine. Only used to compare matched rows, the rows are ordered and merged
+        on their raw values, so that any collation of the state queries' ORDER BY works
+        :param presorted: True if the streams arrive ordered by key (e.g. by the ORDER BY of the state query),
+        False to sort them locally in runs of spill_run_size rows spilled to temporary files
+        :param spill_run_size: maximum number of rows sorted in memory at once when presorted is False
+        :param spill_directory: directory of the spill files, the system's temporary directory by default
+        :param change_chunk_size: maximum number of rows in a yielded change set
+        """
+        super().__init__(key_columns, normalize)
+        self.presorted: bool = presorted
+        self.spill_run_size: int = spill_run_size
+        self.spill_directory: str = spill_directory
+        self.change_chunk_size: int = change_chunk_size
+
+    def diff(self, target_state: Tabular | Iterable[Tabular], source_state: Tabular | Iterable[Tabular],
+             table_name: str, header_row: list[str] = None) -> ChangeSet:
+        """
+        Computes the whole change set at once, see diff_chunks
+        """
+        change_set: ChangeSet = None
+        for chunk in self.diff_chunks(target_state, source_state, table_name, header_row):
+            if change_set is None:
+                change_set = chunk
+                continue
+            change_set.inserts.append_table(chunk.inserts.get_table())
+            change_set.updates.append_table(chunk.updates.get_table())
+            change_set.deletes.append_table(chunk.deletes.get_table())
+
+        return change_set
+
+    def diff_chunks(self, target_state: Tabular | Iterable[Tabular], source_state: Tabular | Iterable[Tabular],
+                    table_name: str, header_row: list[str] = None) -> Iterator[ChangeSet]:
+        """
+        Merge-joins the states and yields the change set in chunks of at most change_chunk_size rows
+        as soon as they are complete, so they can be written while the states are still being read.
+        The last yielded chunk may be empty, at least one chunk is always yielded.
+        :param target_state: current state of the target, a Tabular or an iterable of Tabular chunks
+        :param source_state: current state of the source, a Tabular or an iterable of Tabular chunks
+        :param table_name: name of the resulting change sets
+        :param header_row: header row of the change sets, by default the header row of the target
+        :return: iterator of ChangeSet objects
+        :raises: DiffEngineException if a presorted stream is out of order or the target has duplicate keys
+        """
+        target_layout: dict = {}
+        source_layout: dict = {}
+        target_entries = self.__get_entries(target_state, target_layout, "target")
+        source_entries = self.__get_entries(source_state, source_layout, "source")
+
+        # reading the first entries determines the layouts of the states
+        target_entry = next(target_entries, None)
+        source_entry = next(source_entries, None)
+
+        layout = target_layout or source_layout
+        if not layout:
+            if header_row is None:
+                raise DiffEngineException("Both states are empty streams, the header row can not be determined")
+            layout = {"header_row": header_row}
+        if target_layout and source_layout and target_layout["column_count"] != source_layout["column_count"]:
+            raise DiffEngineException("The source state has a different column count than the target state")
+
+        header_row = header_row if header_row is not None else layout["header_row"]
+        change_set = ChangeSet(table_name, header_row, self.key_columns)
+
+        while target_entry is not None or source_entry is not None:
+            if not self.key_columns and target_entry is not None and source_entry is not None \
+                    and source_entry[1] == target_entry[1]:
+                # rows equal after normalization
+                source_entry = next(source_entries, None)
+                target_entry = next(target_entries, None)
+            elif target_entry is None or (source_entry is not None and source_entry[0] < target_entry[0]):
+                change_set.inserts.add_row(source_entry[2])
+                source_entry = next(source_entries, None)
+            elif source_entry is None or target_entry[0] < source_entry[0]:
+                change_set.deletes.add_row(target_entry[2])
+                target_entry = next(target_entries, None)
+            else:
+                if self.key_columns and source_entry[1] != target_entry[1]:
+                    change_set.updates.add_row(source_entry[2])
+                source_entry = next(source_entries, None)
+                target_entry = next(target_entries, None)
+
+            if change_set.get_row_count() >= self.change_chunk_size:
+                yield change_set
+                change_set = ChangeSet(table_name, header_row, self.key_columns)
+
+        yield change_set
+
+    def get_sort_key(self, row: list | tuple, key_indexes: list[int]) -> tuple:
+        """
+        :param row: the raw (not normalized) row
+        :return: the key the rows are merged on, ordered like the values with None after all other values
+        """
+        if key_indexes:
+            return tuple((row[i] is None, row[i]) for i in key_indexes)
+        return tuple((value is None, value) for value in row)
+
+    def __get_entries(self, state: Tabular | Iterable[Tabular], layout: dict, side: str) -> Iterator[tuple]:
+        """
+        :return: iterator of (sort key, fingerprint, row) of the state's rows in sort key order
+        """
+        entries = self.__read_entries(state, layout)
+        if not self.presorted:
+            entries = self.__sort_entries(entries)
+
+        previous_key = None
+        for entry in entries:
+            if previous_key is not None:
+                if entry[0] < previous_key:
+                    raise DiffEngineException(f"The {side} state is not sorted by key at row {list(entry[2])}. "
+                                              f"Order the state query by the key columns "
+                                              f"or sort locally with presorted=False")
+                if entry[0] == previous_key and self.key_columns and side == "target":
+                    raise DiffEngineException(f"Key of row {list(entry[2])} is not unique in the target state")
+            previous_key = entry[0]
+            yield entry
+
+    def __read_entries(self, state: Tabular | Iterable[Tabular], layout: dict) -> Iterator[tuple]:
+        fingerprint = self.fingerprint
+        get_sort_key = self.get_sort_key
+
+        for chunk in [state] if isinstance(state, Tabular) else state:
+            if not layout:
+                layout["header_row"] = chunk.get_header_row()
+                layout["column_count"] = chunk.column_count
+                layout["key_indexes"] = [chunk.get_column_index(column) for column in self.key_columns]
+            key_indexes = layout["key_indexes"]
+
+            for row in chunk.iter_rows():
+                yield get_sort_key(row, key_indexes), fingerprint(row), row
+
+    def __sort_entries(self, entries: Iterator[tuple]) -> Iterator[tuple]:
+        """
+        External merge sort: runs of spill_run_size entries are sorted in memory and spilled to temporary
+        files, which are then merged. Input fitting into a single run is sorted without touching the disk.
+        """
+        run_files: list = []
+        try:
+            while True:
+                run = []
+                for entry in entries:
+                    run.append(entry)
+                    if len(run) >= self.spill_run_size: break
+                run.sort(key=self.__get_entry_key)
+
+                if len(run) < self.spill_run_size and len(run_files) == 0:
+                    yield from run
+                    return
+
+                run_files.append(self.__spill(run))
+                if len(run) < self.spill_run_size: break
+
+            yield from heapq.merge(*[self.__read_spill(run_file) for run_file in run_files], key=self.__get_entry_key)
+        finally:
+            for run_file in run_files:
+                run_file.close()
+
+    def __spill(self, run: list[tuple]):
+        run_file = tempfile.TemporaryFile(prefix="pydbsync_run_", dir=self.spill_directory)
+        for i in range(0, len(run), 1000):
+            pickle.dump(run[i:i + 1000], run_file, pickle.HIGHEST_PROTOCOL)
+        run_file.seek(0)
+        return run_file
+
+    @staticmethod
+    def __read_spill(run_file) -> Iterator[tuple]:
+        while True:
+            try:
+                batch = pickle.load(run_file)
+            except EOFError:
+                return
+            yield from batch
+
+    @staticmethod
+    def __get_entry_key(entry: tuple) -> tuple:
+        return entry[0]
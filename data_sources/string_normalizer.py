@@ -0,0 +1,38 @@
+from functools import lru_cache
+from typing import Callable
+
+
+class StringNormalizer:
+    def __init__(self, normalize: Callable, cache_size: int = 65536):
+        """
+        Applies a string normalization (e.g. unidecode) through bounded per column LRU caches,
+        so repeated values are normalized once instead of on every comparison
+        :param normalize: func(str) -> str
+        :param cache_size: maximum number of cached values per column, None for unbounded
+        """
+        self.normalize: Callable = normalize
+        self.cache_size: int = cache_size
+
+        self.__column_caches: dict[int, Callable] = {}
+
+    def for_column(self, column: int) -> Callable:
+        """
+        :param column: index of the column
+        :return: the cached normalization function of the column
+        """
+        cached = self.__column_caches.get(column)
+        if cached is None:
+            cached = self.__column_caches.setdefault(column, lru_cache(maxsize=self.cache_size)(self.normalize))
+        return cached
+
+    def __call__(self, value: str) -> str:
+        return self.for_column(-1)(value)
+
+    def get_cache_info(self) -> dict:
+        """
+        :return: column index -> functools cache info (hits, misses, maxsize, currsize)
+        """
+        return {column: cached.cache_info() for column, cached in self.__column_caches.items()}
+
+    def clear(self) -> None:
+        self.__column_caches.clear()
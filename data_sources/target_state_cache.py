@@ -0,0 +1,193 @@
+import os
+import pickle
+import time
+
+import support_functions as sf
+from data_types.change_set import ChangeSet
+from data_types.database_table import DatabaseTable
+
+
+class TargetStateCache:
+    def __init__(self, verify_interval: float = 3600, filename: str = None):
+        """
+        Local copy of a target state, kept up to date with the changes written to the target,
+        so the target only has to be re-read every verify_interval seconds
+        :param verify_interval: maximum age in seconds of the cached state before it is fetched again
+        :param filename: file the cache is persisted to and restored from, None to keep it in memory only.
+        Changes are appended to <filename>.journal, which is folded into the file once it holds
+        more rows than the state
+        """
+        self.verify_interval: float = verify_interval
+        self.filename: str = filename
+
+        self.state: DatabaseTable = None
+        self.state_key = None  # StateController.get_state_key of the query the cached state answers
+        self.generation: int = 0  # incremented on every change of the cached state
+        self.verified_at: float = None  # time.time() at which the state was last fetched from the target
+
+        # key of a row -> positions of the cached rows with the key, built on the first apply
+        self.__positions: dict[tuple, list[int]] = None
+        self.__key_indexes: list[int] = None  # indexes of the key columns of __positions, None for whole rows
+        self.__key_columns: tuple[str] = None
+        self.__journal_rows: int = 0  # number of rows in the journal
+
+        if filename is not None and os.path.exists(filename):
+            self.__load()
+
+    def get_etag(self) -> str:
+        """
+        :return: an identifier of the cached state's content, changes whenever the state changes
+        """
+        return f"{self.generation}-{self.verified_at}"
+
+    def get(self, state_key) -> DatabaseTable | None:
+        """
+        :param state_key: key of the state query, see StateController.get_state_key
+        :return: the cached state if it answers the same query and was verified within verify_interval, else None
+        """
+        if self.state is None or self.state_key != state_key: return None
+        if time.time() - self.verified_at > self.verify_interval: return None
+        return self.state
+
+    def put(self, state_key, state: DatabaseTable) -> None:
+        """
+        Replaces the cached state with one freshly fetched from the target
+        :param state_key: key of the state query, see StateController.get_state_key
+        :param state: the fetched state
+        """
+        self.state = state
+        self.state_key = state_key
+        self.verified_at = time.time()
+        self.generation += 1
+        self.__positions = None
+        self.__save()
+
+    def apply(self, change: DatabaseTable | ChangeSet, key_columns: list[str] | tuple[str] = None) -> None:
+        """
+        Applies a change written to the target to the cached state in place, in time proportional to the change.
+        Without key columns upserted rows are appended and deleted rows are removed by their whole value.
+        The order of the cached rows is not kept.
+        :param change: rows upserted to the target, or a ChangeSet
+        :param key_columns: columns identifying a row, by default those of the ChangeSet
+        """
+        if self.state is None: return
+
+        if isinstance(change, ChangeSet):
+            key_columns = change.key_columns if key_columns is None else key_columns
+            upserts = change.inserts.get_table() + change.updates.get_table()
+            deletes = change.deletes.get_table()
+        else:
+            upserts = change.get_table()
+            deletes = []
+
+        if len(upserts) == 0 and len(deletes) == 0: return
+
+        key_columns = tuple(key_columns) if key_columns else ()
+        self.__apply_rows(upserts, deletes, key_columns)
+        self.generation += 1
+        self.__save_delta(upserts, deletes, key_columns)
+
+    def invalidate(self) -> None:
+        """
+        Forces the next get to miss, so the state is fetched from the target again
+        """
+        self.state = None
+        self.state_key = None
+        self.generation += 1
+        self.__positions = None
+        self.__save()
+
+    def __apply_rows(self, upserts: list, deletes: list, key_columns: tuple[str]) -> None:
+        if self.__positions is None or self.__key_columns != key_columns:
+            self.__build_positions(key_columns)
+        positions = self.__positions
+
+        for row in deletes:
+            matches = positions.get(self.__get_key(row))
+            if matches:
+                self.__remove_row(matches[-1])
+
+        for row in upserts:
+            key = self.__get_key(row)
+            matches = positions.get(key)
+            if key_columns and matches:
+                self.state.set_row(matches[0], row)
+            else:
+                self.state.add_row(row)
+                positions.setdefault(key, []).append(self.state.get_row_count() - 1)
+
+    def __remove_row(self, position: int) -> None:
+        """
+        Moves the last row into the position, so that the removal is done at the end of the table
+        """
+        positions = self.__positions
+        last = self.state.get_row_count() - 1
+
+        key = self.__get_key(self.state[position])
+        positions[key].remove(position)
+        if not positions[key]:
+            del positions[key]
+
+        if position != last:
+            last_row = self.state[last]
+            last_positions = positions[self.__get_key(last_row)]
+            last_positions[last_positions.index(last)] = position
+            self.state.set_row(position, last_row)
+        self.state.discard_row(last)
+
+    def __build_positions(self, key_columns: tuple[str]) -> None:
+        self.__key_columns = key_columns
+        self.__key_indexes = [self.state.get_column_index(column) for column in key_columns] if key_columns else None
+        self.__positions = {}
+        for i, row in enumerate(self.state.get_table()):
+            self.__positions.setdefault(self.__get_key(row), []).append(i)
+
+    def __get_key(self, row) -> tuple:
+        return tuple(row) if self.__key_indexes is None else tuple(row[i] for i in self.__key_indexes)
+
+    def __save(self) -> None:
+        if self.filename is None: return
+        sf.save_object({
+            "state": self.state,
+            "state_key": self.state_key,
+            "generation": self.generation,
+            "verified_at": self.verified_at
+        }, self.filename)
+
+        self.__journal_rows = 0
+        if os.path.exists(self.__get_journal_filename()):
+            os.remove(self.__get_journal_filename())
+
+    def __save_delta(self, upserts: list, deletes: list, key_columns: tuple[str]) -> None:
+        if self.filename is None: return
+
+        self.__journal_rows += len(upserts) + len(deletes)
+        if self.__journal_rows > self.state.get_row_count():
+            self.__save()
+            return
+
+        with open(self.__get_journal_filename(), "ab") as journal:
+            pickle.dump((self.generation, [list(row) for row in upserts], [list(row) for row in deletes],
+                         key_columns), journal, pickle.HIGHEST_PROTOCOL)
+
+    def __load(self) -> None:
+        saved: dict = sf.read_object(self.filename)
+        self.state = saved["state"]
+        self.state_key = saved["state_key"]
+        self.generation = saved["generation"]
+        self.verified_at = saved["verified_at"]
+
+        if self.state is None or not os.path.exists(self.__get_journal_filename()): return
+        with open(self.__get_journal_filename(), "rb") as journal:
+            while True:
+                try:
+                    generation, upserts, deletes, key_columns = pickle.load(journal)
+                except (EOFError, pickle.UnpicklingError):
+                    # the end, or an entry cut short by a crash while it was written
+                    break
+                self.__apply_rows(upserts, deletes, key_columns)
+                self.generation = generation
+                self.__journal_rows += len(upserts) + len(deletes)
+
+    def __get_journal_filename(self) -> str:
+        return self.filename + ".journal"
@@ -0,0 +1,32 @@
+from data_types.database_table import DatabaseTable
+
+
+class ChangeSet:
+    def __init__(self, table_name: str, header_row: list[str] | tuple[str], key_columns: list[str] | tuple[str] = ()):
+        """
+        Holds the rows needed to bring a target table to the state of a source table
+        :param table_name: name of the changed table
+        :param header_row: header row shared by all of the change tables
+        :param key_columns: names of the columns identifying a row, empty if rows are compared as a whole
+        """
+        self.table_name: str = table_name
+        self.key_columns: tuple[str] = tuple(key_columns)
+
+        self.inserts: DatabaseTable = DatabaseTable(table_name, header_row, key_columns=key_columns)
+        self.updates: DatabaseTable = DatabaseTable(table_name, header_row, key_columns=key_columns)
+        self.deletes: DatabaseTable = DatabaseTable(table_name, header_row, key_columns=key_columns)
+
+    def get_row_count(self) -> int:
+        return self.inserts.get_row_count() + self.updates.get_row_count() + self.deletes.get_row_count()
+
+    def get_upserts(self) -> DatabaseTable:
+        """
+        :return: a DatabaseTable containing both the inserted and the updated rows
+        """
+        upserts = DatabaseTable(self.table_name, self.inserts.get_header_row(), key_columns=self.key_columns)
+        upserts.append_table(self.inserts.get_table())
+        upserts.append_table(self.updates.get_table())
+        return upserts
+
+    def is_empty(self) -> bool:
+        return self.get_row_count() == 0
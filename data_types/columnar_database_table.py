@@ -0,0 +1,20 @@
+from data_types.columnar_tabular import ColumnarTabular
+from data_types.database_table import DatabaseTable
+
+
+class ColumnarDatabaseTable(ColumnarTabular, DatabaseTable):
+    def __init__(self, name: str, header_row: list[str] | tuple[str], types_row: list[type] | tuple[type] = None,
+                 key_columns: list[str] | tuple[str] = ()):
+        """
+        A DatabaseTable backed by columnar storage, see ColumnarTabular
+        :param name: name of the table
+        :param header_row: names of the columns
+        :param types_row: optional python types of the columns
+        :param key_columns: names of the columns identifying a row
+        """
+        ColumnarTabular.__init__(self, len(header_row), types_row)
+        self.name = name
+        self.types_row = types_row
+
+        self.set_header_row(header_row)
+        self.set_key_columns(key_columns)
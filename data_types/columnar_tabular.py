@@ -0,0 +1,324 @@
+import datetime as dt
+from array import array
+from typing import Iterator
+
+from data_types.tabular import Tabular, TabularDataException, TableOverflowException, TableSizeMismatchException
+
+_EPOCH = dt.datetime(1970, 1, 1)
+_MICROSECOND = dt.timedelta(microseconds=1)
+
+# column kinds
+KIND_UNDECIDED = None  # no non-null value seen yet, values are kept in a list
+KIND_INT = "q"
+KIND_FLOAT = "d"
+KIND_BOOL = "b"
+KIND_DATETIME = "t"  # naive datetimes stored as microseconds since 1970 in a 'q' array
+KIND_OBJECT = "O"
+
+# python type -> column kind, types which are not present are stored as objects
+TYPE_KINDS: dict[type, str] = {
+    int: KIND_INT,
+    float: KIND_FLOAT,
+    bool: KIND_BOOL,
+    dt.datetime: KIND_DATETIME,
+}
+
+_INT_MIN = -2 ** 63
+_INT_MAX = 2 ** 63 - 1
+
+
+def _encode(kind: str, value):
+    """
+    :return: the value as stored in an array of the given kind, or None if it does not fit
+    """
+    value_type = type(value)
+    if kind == KIND_INT:
+        return value if value_type is int and _INT_MIN <= value <= _INT_MAX else None
+    if kind == KIND_FLOAT:
+        return value if value_type is float else None
+    if kind == KIND_BOOL:
+        return int(value) if value_type is bool else None
+    if kind == KIND_DATETIME:
+        return (value - _EPOCH) // _MICROSECOND if value_type is dt.datetime and value.tzinfo is None else None
+    return None
+
+
+def _decode(kind: str, value):
+    if kind == KIND_BOOL:
+        return value != 0
+    if kind == KIND_DATETIME:
+        return _EPOCH + value * _MICROSECOND
+    return value
+
+
+class ColumnarTabular(Tabular):
+    def __init__(self, columns: int, types_row: list[type] | tuple[type] = None):
+        """
+        A Tabular storing its data column by column. Integer, float, bool and naive datetime columns
+        are kept in typed arrays with a null mask, other columns in plain lists.
+        The kind of a column is taken from types_row, or from the first non-null value added to it.
+        If a value does not fit the column's array, the column falls back to a list.
+        :param columns: number of columns
+        :param types_row: optional python types of the columns
+        """
+        Tabular.__init__(self, columns)
+        self.table = None
+
+        if types_row is not None and len(types_row) != columns:
+            raise TableSizeMismatchException("Lengths of the types row and the column count are different!")
+
+        self.columns: list[array | list] = []
+        self.column_kinds: list[str] = []
+        # bytearray per column with 1 for null values, None for list columns
+        self.null_masks: list[bytearray] = []
+
+        for i in range(columns):
+            kind = KIND_UNDECIDED if types_row is None else TYPE_KINDS.get(types_row[i], KIND_OBJECT)
+            self.__reset_column(i, kind)
+
+    def add_row(self, row: tuple | list, pad: bool = True) -> None:
+        """
+        Validates and adds a row to the table
+        :param row: row data
+        :param pad: whether to pad the remaining horizontal space with None
+        :return: None
+        :raises: TableOverflowException
+        :raises: TableSizeMismatchException
+        """
+        self.append_table((row,), pad)
+
+    def set_row(self, index: int, row: tuple | list, pad: bool = True) -> None:
+        """
+        Replaces the row at the index in the column arrays
+        :param index: index of the row
+        :param row: row data
+        :param pad: whether to pad the remaining horizontal space with None
+        :raises: TableSizeMismatchException
+        """
+        if len(row) > self.column_count:
+            raise TableSizeMismatchException("Table overflow, row has to many columns")
+        if not pad and len(row) != self.column_count:
+            raise TableSizeMismatchException("Row's column count is different and padding is off.")
+
+        if index < 0: index += self.row_count
+        if not 0 <= index < self.row_count: raise IndexError("row index out of range")
+
+        for i in range(self.column_count):
+            self.__set_value(index, i, row[i] if i < len(row) else None)
+
+    def append_table(self, table: tuple[tuple] | list[tuple] | list[list], pad: bool = True):
+        """
+        Appends a passed table to self, column by column
+        :param table: table data
+        :param pad: whether to pad missing column data with None
+        :return: None
+        :raises: TableOverflowException
+        :raises: TableSizeMismatchException
+        """
+        rows = table if isinstance(table, (list, tuple)) else list(table)
+        if len(rows) == 0: return
+
+        for i, row in enumerate(rows):
+            if len(row) > self.column_count:
+                raise TableSizeMismatchException(f"Table overflow, row has to many columns"
+                                                 f"\nAppended table's row {i+1} does not match.")
+            if not pad and len(row) != self.column_count:
+                raise TableSizeMismatchException(f"Appended table's column count is different and padding is off."
+                                                 f"\nAppended table's row {i+1} does not match.")
+
+        if self.row_restrict != -1 and self.row_count + len(rows) > self.row_restrict:
+            raise TableOverflowException("Table overflow, maximum number of rows reached")
+
+        for i in range(self.column_count):
+            self.__append_values(i, [row[i] if i < len(row) else None for row in rows])
+
+        self.row_count += len(rows)
+
+    def get_table(self) -> list:
+        """
+        :return: the data as a list of rows, built from the columns on every call. Use iter_rows
+        to read the rows once without building the whole table
+        """
+        return [list(row) for row in zip(*(self.get_column(i) for i in range(self.column_count)))] \
+            if self.row_count > 0 else []
+
+    def iter_rows(self) -> Iterator[tuple]:
+        """
+        :return: iterator over the rows as tuples, built from the columns one row at a time
+        """
+        if self.row_count == 0:
+            return iter(())
+        return zip(*(self.__iter_column(i) for i in range(self.column_count)))
+
+    def get_column(self, column: int | str) -> list:
+        """
+        :param column: index or name of the column
+        :return: values of the column as a list
+        """
+        i = column if type(column) is int else self.get_column_index(column)
+        kind = self.column_kinds[i]
+        values = self.columns[i]
+
+        if kind in (KIND_UNDECIDED, KIND_OBJECT):
+            return list(values)
+
+        mask = self.null_masks[i]
+        if kind in (KIND_INT, KIND_FLOAT):
+            return [None if is_null else value for value, is_null in zip(values, mask)]
+        return [None if is_null else _decode(kind, value) for value, is_null in zip(values, mask)]
+
+    def get_column_buffer(self, column: int | str) -> array | list:
+        """
+        :param column: index or name of the column
+        :return: the underlying storage of the column, for typed columns an array which can be handed
+        to numpy.frombuffer. Null positions hold zeros, see null_masks
+        """
+        return self.columns[column if type(column) is int else self.get_column_index(column)]
+
+    def discard_top_row(self) -> list:
+        return self.discard_row(0)
+
+    def discard_row(self, index: int) -> list:
+        discarded_row = self.__get_row(index)
+        for i in range(self.column_count):
+            del self.columns[i][index]
+            if self.null_masks[i] is not None:
+                del self.null_masks[i][index]
+        self.row_count -= 1
+        return discarded_row
+
+    def clear_table(self):
+        self.row_count = 0
+        for i in range(self.column_count):
+            self.__reset_column(i, self.column_kinds[i])
+
+    def create_index(self, columns: str | list[str] | tuple[str]) -> None:
+        raise TabularDataException("Hash indexes are not supported on columnar tables, find_rows scans the table")
+
+    def __getitem__(self, item: int | tuple[int, str] | tuple[int, int]):
+        if type(item) is int:
+            return self.__get_row(item)
+
+        if type(item) is tuple:
+            if len(item) != 2: raise TabularDataException("The table is 2 dimensional!")
+            if type(item[1]) is int:
+                return self.__get_value(item[0], item[1])
+            if type(item[1]) is str:
+                return self.__get_value(item[0], self.get_column_index(item[1]))
+
+        raise TabularDataException("Incorrect format!")
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def __get_row(self, index: int) -> list:
+        if index < 0: index += self.row_count
+        if not 0 <= index < self.row_count: raise IndexError("row index out of range")
+        return [self.__get_value(index, i) for i in range(self.column_count)]
+
+    def __get_value(self, row: int, column: int):
+        kind = self.column_kinds[column]
+        if kind in (KIND_UNDECIDED, KIND_OBJECT):
+            return self.columns[column][row]
+        if self.null_masks[column][row]:
+            return None
+        return _decode(kind, self.columns[column][row])
+
+    def __iter_column(self, i: int) -> Iterator:
+        kind = self.column_kinds[i]
+        values = self.columns[i]
+        if kind in (KIND_UNDECIDED, KIND_OBJECT):
+            return iter(values)
+
+        mask = self.null_masks[i]
+        if kind in (KIND_INT, KIND_FLOAT):
+            # arrays without nulls hold the values as they are
+            return iter(values) if 1 not in mask else \
+                (None if is_null else value for value, is_null in zip(values, mask))
+        return (None if is_null else _decode(kind, value) for value, is_null in zip(values, mask))
+
+    def __set_value(self, row: int, i: int, value) -> None:
+        kind = self.column_kinds[i]
+
+        if kind is KIND_UNDECIDED:
+            previous = self.columns[i]
+            previous[row] = value
+            if value is not None:
+                # the column gets its kind from the first non-null value
+                self.__reset_column(i, TYPE_KINDS.get(type(value), KIND_OBJECT))
+                self.__append_values(i, previous)
+            return
+
+        if kind == KIND_OBJECT:
+            self.columns[i][row] = value
+            return
+
+        if value is None:
+            self.columns[i][row] = 0
+            self.null_masks[i][row] = 1
+            return
+
+        encoded = _encode(kind, value)
+        if encoded is None:
+            # the value does not fit the array, keep the column as objects from now on
+            previous = self.get_column(i)
+            previous[row] = value
+            self.__reset_column(i, KIND_OBJECT)
+            self.columns[i] = previous
+            return
+
+        self.columns[i][row] = encoded
+        self.null_masks[i][row] = 0
+
+    def __reset_column(self, i: int, kind: str) -> None:
+        if i == len(self.columns):
+            self.columns.append(None)
+            self.column_kinds.append(None)
+            self.null_masks.append(None)
+
+        self.column_kinds[i] = kind
+        if kind in (KIND_UNDECIDED, KIND_OBJECT):
+            self.columns[i] = []
+            self.null_masks[i] = None
+        else:
+            self.columns[i] = array("q" if kind == KIND_DATETIME else kind)
+            self.null_masks[i] = bytearray()
+
+    def __append_values(self, i: int, values: list) -> None:
+        kind = self.column_kinds[i]
+
+        if kind is KIND_UNDECIDED:
+            sample = next((value for value in values if value is not None), None)
+            if sample is None:
+                self.columns[i].extend(values)
+                return
+            # the column gets its kind from the first non-null value, convert the nulls stored so far
+            previous = self.columns[i]
+            self.__reset_column(i, TYPE_KINDS.get(type(sample), KIND_OBJECT))
+            self.__append_values(i, previous)
+            self.__append_values(i, values)
+            return
+
+        if kind == KIND_OBJECT:
+            self.columns[i].extend(values)
+            return
+
+        encoded = []
+        mask = bytearray(len(values))
+        for j, value in enumerate(values):
+            if value is None:
+                encoded.append(0)
+                mask[j] = 1
+                continue
+            value = _encode(kind, value)
+            if value is None:
+                # the value does not fit the array, keep the column as objects from now on
+                previous = self.get_column(i)
+                self.__reset_column(i, KIND_OBJECT)
+                self.columns[i] = previous
+                self.columns[i].extend(values)
+                return
+            encoded.append(value)
+
+        self.columns[i].extend(encoded)
+        self.null_masks[i].extend(mask)
@@ -1,11 +1,27 @@
 from data_types.tabular import *
 
 class DatabaseTable(Tabular):
-    def __init__(self, name: str, header_row: list[str] | tuple[str]):
+    def __init__(self, name: str, header_row: list[str] | tuple[str], types_row: list[type] | tuple[type] = None,
+                 key_columns: list[str] | tuple[str] = ()):
         super().__init__(len(header_row))
         self.name = name
+        self.types_row = types_row
 
         self.set_header_row(header_row)
+        self.set_key_columns(key_columns)
 
     def get_table_name(self) -> str:
-        return self.name
\ No newline at end of file
+        return self.name
+
+    def set_key_columns(self, key_columns: list[str] | tuple[str]) -> None:
+        """
+        Declares the columns identifying a row, used by upserts and deletes
+        :param key_columns: names of the key columns
+        :raises: TabularDataException
+        """
+        for column in key_columns:
+            self.get_column_index(column)
+        self.key_columns = tuple(key_columns)
+
+    def get_key_columns(self) -> tuple[str]:
+        return self.key_columns
\ No newline at end of file
@@ -1,5 +1,12 @@
+from typing import Iterator
+
+# marks a discarded row until the table is compacted
+_DISCARDED = object()
+
+
 class Tabular:
     def __init__(self, columns: int):
+        self.__indexes: dict[tuple[str], tuple[list[int], dict]] = {}
         self.header_row: list[str] = []
         self.table: list[list] = []
 
@@ -8,6 +15,37 @@ class Tabular:
 
         self.row_restrict: int = -1
 
+    @property
+    def header_row(self) -> list[str]:
+        return self.__header_row
+
+    @header_row.setter
+    def header_row(self, header_row: list[str] | tuple[str]) -> None:
+        self.__header_row = header_row
+        self.__column_indexes = None  # column name -> index, built on first use
+
+    @property
+    def table(self) -> list[list]:
+        """
+        The rows of the table. Discarded rows are only marked, the list is compacted when it is accessed.
+        """
+        self.__compact()
+        return self.__rows
+
+    @table.setter
+    def table(self, table: list[list]) -> None:
+        self.__rows = table
+        self.__head = 0  # rows before __head were discarded from the top
+        self.__discarded = 0  # rows marked as _DISCARDED after __head
+        self.__live_rows: _FenwickTree = None  # counts live rows by position while rows are marked
+        if table is None: return
+
+        self.row_count = len(table)
+        for column_indexes, index in self.__indexes.values():
+            index.clear()
+            for row in table:
+                self.__index_row(column_indexes, index, row)
+
     def restrict_size(self, rows: int = -1) -> None:
         """
         Restricts the maximum size of the table.
@@ -46,10 +84,37 @@ class Tabular:
         while pad and len(new_row) < self.column_count:
             new_row.append(None)
 
-        self.table.append(new_row)
+        self.__rows.append(new_row)
+        if self.__live_rows is not None:
+            self.__live_rows.append(1)
+        for column_indexes, index in self.__indexes.values():
+            self.__index_row(column_indexes, index, new_row)
 
         self.row_count += 1
 
+    def set_row(self, index: int, row: tuple | list, pad: bool = True) -> None:
+        """
+        Replaces the row at the index, keeping the indexes of the table up to date
+        :param index: index of the row
+        :param row: row data
+        :param pad: whether to pad the remaining horizontal space with None
+        :raises: TableSizeMismatchException
+        """
+        if len(row) > self.column_count:
+            raise TableSizeMismatchException("Table overflow, row has to many columns")
+        if not pad and len(row) != self.column_count:
+            raise TableSizeMismatchException("Row's column count is different and padding is off.")
+
+        new_row: list = list(row)
+        while pad and len(new_row) < self.column_count:
+            new_row.append(None)
+
+        position = self.__get_position(index)
+        for column_indexes, column_index in self.__indexes.values():
+            self.__unindex_row(column_indexes, column_index, self.__rows[position])
+            self.__index_row(column_indexes, column_index, new_row)
+        self.__rows[position] = new_row
+
     def append_table(self, table: tuple[tuple] | list[tuple] | list[list], pad: bool = True):
         """
         Appends a passed table to self
@@ -85,11 +150,10 @@ class Tabular:
             return None
 
 
-        if self.table[0] is None: raise TableSizeMismatchException("There is no header row to read!")
+        if self.row_count <= 0 or self[0] is None: raise TableSizeMismatchException("There is no header row to read!")
 
         new_header_row = []
-        for i, obj in enumerate(self.table[0]):
-            value = self.table[0][i]
+        for i, value in enumerate(self[0]):
             if type(value) is not str:
                 raise TabularDataException(f"Header row's data is not string. Index {i}")
             new_header_row.append(value)
@@ -97,8 +161,7 @@ class Tabular:
         __validate_header_row(new_header_row)
         self.header_row = new_header_row
 
-        self.table = self.table[1:]
-        self.row_count -= 1
+        self.discard_top_row()
 
     def get_row_count(self):
         return self.row_count
@@ -109,29 +172,148 @@ class Tabular:
     def get_table(self) -> list:
         return self.table
 
+    def iter_rows(self) -> Iterator[list | tuple]:
+        """
+        :return: iterator over the rows, for reading them once. Tables not storing rows (see ColumnarTabular)
+        produce them one at a time instead of building the whole table
+        """
+        return iter(self.table)
+
     def get_column_index(self, column: str) -> int:
         if len(self.header_row) <= 0:
             raise TabularDataException("Table has no header row to reference!")
+
+        column_indexes = self.__column_indexes
+        if column_indexes is None:
+            column_indexes = {}
+            for i, name in enumerate(self.header_row):
+                column_indexes.setdefault(name, i)
+            self.__column_indexes = column_indexes
+
         try:
-            return self.header_row.index(column)
-        except ValueError as e:
+            return column_indexes[column]
+        except KeyError:
             raise TabularDataException(f"No column of name {column}")
 
     def discard_top_row(self) -> list:
-        discarded_row = self.table[0]
-        self.table = self.table[1:]
-        self.row_count -= 1
-        return discarded_row
+        return self.discard_row(0)
 
     def discard_row(self, index: int) -> list:
-        discarded_row = self.table[index]
-        self.table = self.table[:index] + self.table[index+1:]
+        """
+        Removes a row in amortized constant time (logarithmic while other rows in the middle are discarded).
+        The rows are marked as discarded and the table is compacted once they make up most of it.
+        :param index: index of the row
+        :return: the discarded row
+        """
+        position = self.__get_position(index)
+        discarded_row = self.__rows[position]
+
+        if position == self.__head:
+            self.__head += 1
+        elif self.__discarded == 0 and position == len(self.__rows) - 1:
+            self.__rows.pop()
+        else:
+            if self.__live_rows is None:
+                self.__live_rows = _FenwickTree([0] * self.__head + [1] * (len(self.__rows) - self.__head))
+            self.__rows[position] = _DISCARDED
+            self.__discarded += 1
+
+        if self.__live_rows is not None:
+            self.__live_rows.add(position, -1)
+        for column_indexes, index in self.__indexes.values():
+            self.__unindex_row(column_indexes, index, discarded_row)
+
         self.row_count -= 1
+        if self.__head + self.__discarded > max(self.row_count, 16):
+            self.__compact()
         return discarded_row
 
     def clear_table(self):
         self.row_count = 0
-        self.table.clear()
+        self.__rows.clear()
+        self.__head = 0
+        self.__discarded = 0
+        self.__live_rows = None
+        for column_indexes, index in self.__indexes.values():
+            index.clear()
+
+    def create_index(self, columns: str | list[str] | tuple[str]) -> None:
+        """
+        Creates a hash index on the columns, maintained by add_row and discard_row, for find_rows.
+        Values changed in place in the rows of the table are not reindexed, recreate the index after that.
+        :param columns: name or names of the indexed columns
+        :raises: TabularDataException
+        """
+        columns = (columns,) if type(columns) is str else tuple(columns)
+        column_indexes = [self.get_column_index(column) for column in columns]
+
+        index: dict[tuple, list] = {}
+        for row in self.table:
+            self.__index_row(column_indexes, index, row)
+        self.__indexes[columns] = (column_indexes, index)
+
+    def drop_index(self, columns: str | list[str] | tuple[str]) -> None:
+        self.__indexes.pop((columns,) if type(columns) is str else tuple(columns), None)
+
+    def find_rows(self, columns: str | list[str] | tuple[str], values) -> list[list]:
+        """
+        Finds the rows with the given values in the columns, in constant time if the columns are indexed
+        (see create_index) and by scanning the table otherwise
+        :param columns: name or names of the columns
+        :param values: the value, or a tuple of values if there are multiple columns
+        :return: list of the matching rows
+        """
+        columns = (columns,) if type(columns) is str else tuple(columns)
+        key = (values,) if len(columns) == 1 else tuple(values)
+
+        indexed = self.__indexes.get(columns)
+        if indexed is not None:
+            return list(indexed[1].get(key, ()))
+
+        column_indexes = [self.get_column_index(column) for column in columns]
+        return [row for row in self.get_table() if tuple(row[i] for i in column_indexes) == key]
+
+    def __get_position(self, index: int) -> int:
+        """
+        :return: position in __rows of the row at the index
+        """
+        if index < 0: index += self.row_count
+        if not 0 <= index < self.row_count: raise IndexError("row index out of range")
+
+        if self.__discarded == 0:
+            return self.__head + index
+        return self.__live_rows.find(index + 1)
+
+    def __compact(self) -> None:
+        if self.__head == 0 and self.__discarded == 0: return
+
+        rows = self.__rows[self.__head:]
+        if self.__discarded > 0:
+            rows = [row for row in rows if row is not _DISCARDED]
+        self.__rows = rows
+        self.__head = 0
+        self.__discarded = 0
+        self.__live_rows = None
+
+    @staticmethod
+    def __index_row(column_indexes: list[int], index: dict, row: list) -> None:
+        key = tuple(row[i] for i in column_indexes)
+        rows = index.get(key)
+        if rows is None:
+            index[key] = [row]
+        else:
+            rows.append(row)
+
+    @staticmethod
+    def __unindex_row(column_indexes: list[int], index: dict, row: list) -> None:
+        key = tuple(row[i] for i in column_indexes)
+        rows = index[key]
+        for i, indexed_row in enumerate(rows):
+            if indexed_row is row:
+                del rows[i]
+                break
+        if len(rows) == 0:
+            del index[key]
 
     def is_empty(self) -> bool:
         return self.row_count == 0 or (self.row_count == 1 and (self[0] is None or self[0][0] is None))
@@ -141,11 +323,11 @@ class Tabular:
 
     def __getitem__(self, item: int | tuple[int, str] | tuple[int, int]):
         if type(item) is int:
-            return self.table[item]
+            return self.__rows[self.__get_position(item)]
 
         if type(item) is tuple:
             if len(item) != 2: raise TabularDataException("The table is 2 dimensional!")
-            row = self.table[item[0]]
+            row = self.__rows[self.__get_position(item[0])]
             if type(item[1]) is int:
                 return row[item[1]]
             if type(item[1]) is str:
@@ -154,7 +336,53 @@ class Tabular:
         raise TabularDataException("Incorrect format!")
 
     def __len__(self) -> int:
-        return len(self.table)
+        return self.row_count
+
+
+class _FenwickTree:
+    def __init__(self, values: list[int]):
+        """
+        Binary indexed tree over a list of counts, with logarithmic updates and prefix sums
+        :param values: initial counts
+        """
+        self.tree: list[int] = [0] + values
+        for i in range(1, len(self.tree)):
+            parent = i + (i & -i)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[i]
+
+    def add(self, position: int, delta: int) -> None:
+        i = position + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def append(self, value: int) -> None:
+        i = len(self.tree)
+        self.tree.append(value + self.prefix_sum(i - 1) - self.prefix_sum(i - (i & -i)))
+
+    def prefix_sum(self, count: int) -> int:
+        """
+        :return: sum of the first count values
+        """
+        total = 0
+        while count > 0:
+            total += self.tree[count]
+            count -= count & -count
+        return total
+
+    def find(self, k: int) -> int:
+        """
+        :return: the lowest position at which the prefix sum reaches k
+        """
+        position = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step > 0:
+            if position + step < len(self.tree) and self.tree[position + step] < k:
+                position += step
+                k -= self.tree[position]
+            step >>= 1
+        return position
 
 
 class TabularDataException(Exception):
@@ -0,0 +1,284 @@
+import datetime
+import gzip
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from collections import deque
+
+_STOP = object()
+
+
+class LogWriter:
+    def __init__(self, directory: str = "log", max_bytes: int = 10 * 1024 * 1024, flush_interval: float = 1,
+                 retention_days: int = None, compress: bool = True, max_queued: int = 100000):
+        """
+        Writes log messages to <directory>/<date> from a background thread. Messages are queued by write
+        and written in batches, the file is flushed when the queue runs empty or every flush_interval seconds.
+        A day's file is rotated to <date>.<n> once it grows over max_bytes, and rotated files as well as the
+        files of past days are compressed with gzip.
+        :param directory: directory of the log files
+        :param max_bytes: size of a file at which it is rotated, None to rotate by date only
+        :param flush_interval: maximum seconds a written message stays in the file buffer under load
+        :param retention_days: age in days after which files are deleted, None to keep them
+        :param compress: compress rotated files and files of past days
+        :param max_queued: number of queued messages at which write blocks until the writer catches up
+        """
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+        self.flush_interval: float = flush_interval
+        self.retention_days: int = retention_days
+        self.compress: bool = compress
+
+        self.__queue: queue.Queue = queue.Queue(max_queued)
+        self.__thread: threading.Thread = None
+        self.__lock = threading.Lock()
+        self.__closed: bool = False
+        self.__late_lock = threading.Lock()  # serialises the messages written after close
+
+        self.__file = None
+        self.__date: datetime.date = None
+        self.__size: int = 0
+        self.__last_flush: float = 0
+        self.__failing: bool = False  # whether the last record could not be written to the file
+
+        # (date, filename) of the files in the directory in the order they were written, the directory
+        # is listed once on start, afterwards the files created by rotation are appended
+        self.__files: deque[tuple[datetime.date, str]] = deque()
+        self.__rotations: dict[datetime.date, int] = {}  # date -> number of files rotated by size
+
+    def start(self) -> None:
+        with self.__lock:
+            if self.__closed or self.__thread is not None: return
+
+            os.makedirs(self.directory, exist_ok=True)
+            self.__scan_directory()
+            self.__thread = threading.Thread(target=self.__run, name="log_writer", daemon=True)
+            self.__thread.start()
+
+        self.enforce_retention()
+
+    def write(self, text: str) -> None:
+        """
+        Queues a message, starting the writer if needed. Once the writer is closed the message is
+        appended to the file directly
+        :param text: the message, written as is
+        """
+        if self.__closed:
+            self.__write_late(datetime.date.today(), text)
+            return
+
+        if self.__thread is None:
+            self.start()
+        self.__queue.put((datetime.date.today(), text))
+
+    def flush(self, timeout: float = None) -> None:
+        """
+        Waits until the messages queued so far are written to the file
+        :param timeout: maximum seconds to wait, None to wait indefinitely
+        """
+        if self.__closed or self.__thread is None: return
+
+        flushed = threading.Event()
+        self.__queue.put(flushed)
+        flushed.wait(timeout)
+
+    def close(self) -> None:
+        """
+        Writes the queued messages and stops the writer, messages written afterwards are appended
+        to the file directly
+        """
+        with self.__lock:
+            if self.__closed: return
+            self.__closed = True
+            thread = self.__thread
+        if thread is None: return
+
+        self.__queue.put(_STOP)
+        thread.join()
+
+        # messages queued by writes which raced with close
+        while True:
+            try:
+                item = self.__queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                self.__write_late(*item)
+            elif isinstance(item, threading.Event):
+                item.set()
+
+    def enforce_retention(self, retention_days: int = None) -> None:
+        """
+        Deletes the files older than retention_days, only the oldest known files are looked at
+        :param retention_days: overrides the writer's retention_days
+        """
+        retention_days = self.retention_days if retention_days is None else retention_days
+        if retention_days is None: return
+
+        today = datetime.date.today()
+        with self.__lock:
+            while len(self.__files) > 0 and (today - self.__files[0][0]).days > retention_days:
+                _, filename = self.__files.popleft()
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    pass
+
+    def __run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                item = self.__queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            flushed = []
+            try:
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                    elif isinstance(item, threading.Event):
+                        flushed.append(item)
+                    else:
+                        self.__try_write_record(*item)
+
+                    try:
+                        item = self.__queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if time.monotonic() - self.__last_flush >= self.flush_interval:
+                        self.__try_flush_file()
+
+                self.__try_flush_file()
+            finally:
+                for event in flushed:
+                    event.set()
+
+        self.__close_file()
+
+    def __try_write_record(self, date: datetime.date, text: str) -> None:
+        """
+        Writes the record, or to stderr if the file can not be written (e.g. the disk is full),
+        so that the writer keeps running and tries the file again with the next record
+        """
+        try:
+            self.__write_record(date, text)
+            self.__failing = False
+        except Exception as e:
+            self.__handle_error(e)
+            sys.stderr.write(text)
+
+    def __try_flush_file(self) -> None:
+        try:
+            self.__flush_file()
+        except Exception as e:
+            self.__handle_error(e)
+
+    def __handle_error(self, error: Exception) -> None:
+        if not self.__failing:
+            sys.stderr.write(f"Writing the log to {self.directory} failed, writing to stderr until it recovers:\n"
+                             f"{error}\n")
+            self.__failing = True
+        # the file is opened again by the next record
+        self.__close_file()
+        self.__date = None
+        self.__last_flush = time.monotonic()
+
+    def __close_file(self) -> None:
+        file, self.__file = self.__file, None
+        if file is None: return
+        try:
+            file.close()
+        except OSError:
+            pass
+
+    def __write_record(self, date: datetime.date, text: str) -> None:
+        if date != self.__date:
+            self.__open(date)
+        elif self.max_bytes is not None and self.__size >= self.max_bytes:
+            self.__rotate_by_size()
+
+        self.__file.write(text)
+        self.__size += len(text.encode("utf-8"))
+
+    def __flush_file(self) -> None:
+        if self.__file is not None:
+            self.__file.flush()
+        self.__last_flush = time.monotonic()
+
+    def __open(self, date: datetime.date) -> None:
+        previous_date = self.__date
+        if self.__file is not None:
+            self.__file.close()
+
+        self.__date = date
+        path = os.path.join(self.directory, str(date))
+        self.__file = open(path, "a", encoding="utf-8")
+        self.__size = os.path.getsize(path)
+        self.__remember(date, str(date))
+
+        if previous_date is not None:
+            self.__compress(str(previous_date))
+            self.enforce_retention()
+
+    def __write_late(self, date: datetime.date, text: str) -> None:
+        with self.__late_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, str(date)), "a", encoding="utf-8") as f:
+                f.write(text)
+
+    def __rotate_by_size(self) -> None:
+        self.__file.close()
+        self.__file = None
+
+        date = self.__date
+        self.__rotations[date] = self.__rotations.get(date, 0) + 1
+        rotated = f"{date}.{self.__rotations[date]}"
+        os.replace(os.path.join(self.directory, str(date)), os.path.join(self.directory, rotated))
+        self.__forget(str(date))
+        self.__remember(date, rotated)
+        self.__compress(rotated)
+
+        self.__date = None
+        self.__open(date)
+
+    def __compress(self, filename: str) -> None:
+        if not self.compress: return
+
+        path = os.path.join(self.directory, filename)
+        if not os.path.exists(path): return
+
+        with open(path, "rb") as source, gzip.open(path + ".gz", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.remove(path)
+
+        with self.__lock:
+            self.__files = deque((date, name + ".gz" if name == filename else name) for date, name in self.__files)
+
+    def __remember(self, date: datetime.date, filename: str) -> None:
+        with self.__lock:
+            if (date, filename) not in self.__files:
+                self.__files.append((date, filename))
+
+    def __forget(self, filename: str) -> None:
+        with self.__lock:
+            self.__files = deque((date, name) for date, name in self.__files if name != filename)
+
+    def __scan_directory(self) -> None:
+        files = []
+        for filename in os.listdir(self.directory):
+            if filename[0] == '.': continue
+            try:
+                date = datetime.date.fromisoformat(filename.split(".")[0])
+            except ValueError:
+                continue
+
+            files.append((date, filename))
+            parts = filename.split(".")
+            if len(parts) > 1 and parts[1].isdigit():
+                self.__rotations[date] = max(self.__rotations.get(date, 0), int(parts[1]))
+
+        self.__files = deque(sorted(files))
@@ -0,0 +1,78 @@
+import time
+
+from metrics.metrics_registry import MetricsRegistry
+
+# stages of a synchronisation cycle reported by the instrumented code
+STAGE_CONNECT = "connect"
+STAGE_QUERY = "query"  # executing a query until its first rows are available
+STAGE_FETCH = "fetch"  # reading the rows of an executed query
+STAGE_MATERIALIZE = "materialize"  # storing the result of a view for the following state queries
+STAGE_COMPARE = "compare"
+STAGE_TRANSFORM = "transform"
+STAGE_INSERT = "insert"
+STAGE_UPSERT = "upsert"
+STAGE_DELETE = "delete"
+STAGE_REST = "rest"  # a request to a REST API
+STAGE_SYNC = "sync"  # a whole run of a SyncJob
+
+# registry the library reports to, render it or serve it with MetricsServer
+REGISTRY = MetricsRegistry()
+
+STAGE_LABELS = ("stage", "connector", "table")
+
+STAGE_DURATION = REGISTRY.histogram("pydbsync_stage_duration_seconds",
+                                    "Time spent in a stage of the synchronisation", STAGE_LABELS)
+STAGE_ERRORS = REGISTRY.counter("pydbsync_stage_errors_total",
+                                "Number of stage executions which raised an exception", STAGE_LABELS)
+ROWS = REGISTRY.counter("pydbsync_rows_total", "Number of rows moved by a stage", STAGE_LABELS)
+BYTES = REGISTRY.counter("pydbsync_bytes_total", "Number of bytes moved by a stage", STAGE_LABELS)
+
+
+class StageTimer:
+    def __init__(self, stage: str, connector: str = "", table: str = ""):
+        """
+        Context manager recording the duration, the failure and the moved rows and bytes of one stage execution
+        :param stage: one of the STAGE_ constants
+        :param connector: label of the connector the stage used, see DatabaseConnector.get_metrics_label
+        :param table: name of the synchronised table, empty if not known
+        """
+        self.labels: dict = {"stage": stage, "connector": connector, "table": "" if table is None else table}
+        self.rows: int = 0
+        self.bytes: int = 0
+        self.failed: bool = False
+        self.started: float = None
+
+    def add_rows(self, rows: int) -> None:
+        self.rows += rows
+
+    def add_bytes(self, byte_count: int) -> None:
+        self.bytes += byte_count
+
+    def fail(self) -> None:
+        """
+        Counts the execution as failed without raising, e.g. for an unsuccessful HTTP status
+        """
+        self.failed = True
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        STAGE_DURATION.observe(time.perf_counter() - self.started, **self.labels)
+        if exc_type is not None or self.failed:
+            STAGE_ERRORS.inc(**self.labels)
+        if self.rows:
+            ROWS.inc(self.rows, **self.labels)
+        if self.bytes:
+            BYTES.inc(self.bytes, **self.labels)
+
+
+def measure_stage(stage: str, connector: str = "", table: str = "") -> StageTimer:
+    """
+    Usage:
+        with measure_stage(STAGE_INSERT, connector.get_metrics_label(), table_name) as timer:
+            ...
+            timer.add_rows(row_count)
+    """
+    return StageTimer(stage, connector, table)
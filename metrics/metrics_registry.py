@@ -0,0 +1,199 @@
+import bisect
+import math
+import os
+import threading
+
+# upper bounds in seconds of the latency histogram buckets, from a fast query to a slow sync cycle
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class Metric:
+    metric_type: str = None
+
+    def __init__(self, name: str, documentation: str, label_names: list[str] | tuple[str], lock: threading.Lock):
+        """
+        A family of time series of the same name, one per combination of label values
+        :param name: name of the metric, e.g. pydbsync_rows_total
+        :param documentation: the HELP text
+        :param label_names: names of the labels
+        :param lock: lock of the registry guarding the values
+        """
+        self.name: str = name
+        self.documentation: str = documentation
+        self.label_names: tuple[str] = tuple(label_names)
+        self.lock: threading.Lock = lock
+
+    def get_label_values(self, labels: dict) -> tuple[str]:
+        if len(labels) != len(self.label_names):
+            raise MetricsException(f"{self.name} requires the labels {self.label_names}, got {tuple(labels)}")
+        try:
+            return tuple(str(labels[name]) for name in self.label_names)
+        except KeyError as e:
+            raise MetricsException(f"{self.name} requires the labels {self.label_names}, {e} is missing")
+
+    def format_labels(self, label_values: tuple[str], extra: tuple = ()) -> str:
+        pairs = list(zip(self.label_names, label_values)) + list(extra)
+        if len(pairs) == 0: return ""
+        return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> list[str]:
+        """
+        :return: lines of the metric in the Prometheus text exposition format
+        """
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: list[str] | tuple[str], lock: threading.Lock):
+        super().__init__(name, documentation, label_names, lock)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """
+        :param amount: non negative amount to add
+        :param labels: value of every label of the metric
+        """
+        if amount < 0:
+            raise MetricsException(f"Counter {self.name} can not be decreased")
+        label_values = self.get_label_values(labels)
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self.lock:
+            return self.values.get(self.get_label_values(labels), 0)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self.lock:
+            for label_values, value in self.values.items():
+                lines.append(f"{self.name}{self.format_labels(label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: list[str] | tuple[str], lock: threading.Lock,
+                 buckets: list[float] | tuple[float] = DEFAULT_BUCKETS):
+        """
+        :param buckets: sorted upper bounds of the buckets, +Inf is added automatically
+        """
+        super().__init__(name, documentation, label_names, lock)
+        self.buckets: tuple[float] = tuple(sorted(buckets))
+        # label values -> [bucket counts (not cumulative, the last one is +Inf), sum, count]
+        self.values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        :param value: the observed value, e.g. seconds a stage took
+        :param labels: value of every label of the metric
+        """
+        label_values = self.get_label_values(labels)
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(label_values)
+            if series is None:
+                series = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0, 0]
+            series[0][bucket] += 1
+            series[1] += value
+            series[2] += 1
+
+    def get_sum(self, **labels) -> float:
+        with self.lock:
+            series = self.values.get(self.get_label_values(labels))
+            return 0 if series is None else series[1]
+
+    def get_count(self, **labels) -> int:
+        with self.lock:
+            series = self.values.get(self.get_label_values(labels))
+            return 0 if series is None else series[2]
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self.lock:
+            for label_values, (bucket_counts, total, count) in self.values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (math.inf,), bucket_counts):
+                    cumulative += bucket_count
+                    le = (("le", "+Inf" if bound == math.inf else _format_value(bound)),)
+                    lines.append(f"{self.name}_bucket{self.format_labels(label_values, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{self.format_labels(label_values)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{self.format_labels(label_values)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Thread safe collection of metrics rendered together in the Prometheus text exposition format
+        """
+        self.lock: threading.Lock = threading.Lock()
+        self.metrics: dict[str, Metric] = {}
+
+    def counter(self, name: str, documentation: str, label_names: list[str] | tuple[str] = ()) -> Counter:
+        """
+        :return: the counter of the given name, created on first use
+        """
+        return self.__register(Counter, name, documentation, label_names)
+
+    def histogram(self, name: str, documentation: str, label_names: list[str] | tuple[str] = (),
+                  buckets: list[float] | tuple[float] = DEFAULT_BUCKETS) -> Histogram:
+        """
+        :return: the histogram of the given name, created on first use
+        """
+        return self.__register(Histogram, name, documentation, label_names, buckets)
+
+    def render(self) -> str:
+        """
+        :return: all of the metrics in the Prometheus text exposition format
+        """
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "".join(line + "\n" for metric in metrics for line in metric.render())
+
+    def write_text_file(self, filename: str) -> None:
+        """
+        Writes the metrics to a file, e.g. for the textfile collector of the node exporter.
+        The file is replaced atomically, so a scrape never sees it half written.
+        :param filename: path of the .prom file
+        """
+        temporary_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(temporary_filename, "w") as f:
+            f.write(self.render())
+        os.replace(temporary_filename, filename)
+
+    def clear(self) -> None:
+        """
+        Resets the values of all of the metrics
+        """
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+    def __register(self, metric_class: type, name: str, documentation: str, label_names, *args) -> Metric:
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, documentation, label_names, self.lock, *args)
+            elif type(metric) is not metric_class or metric.label_names != tuple(label_names):
+                raise MetricsException(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf: return "+Inf"
+    if float(value).is_integer(): return str(int(value))
+    return repr(float(value))
+
+
+class MetricsException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
@@ -0,0 +1,40 @@
+import random
+
+
+class ExponentialBackoff:
+    def __init__(self, initial_delay: float = 1, max_delay: float = 60, multiplier: float = 2,
+                 jitter: bool = True):
+        """
+        Delays growing exponentially with the number of failed attempts
+        :param initial_delay: seconds to wait after the first failure
+        :param max_delay: upper bound of a delay in seconds
+        :param multiplier: factor the delay grows by with every further failure
+        :param jitter: draw the delay uniformly between half of it and all of it, so that clients
+        which failed together do not retry together
+        """
+        if initial_delay < 0 or max_delay < initial_delay or multiplier < 1:
+            raise BackoffException(f"Invalid backoff initial_delay={initial_delay} max_delay={max_delay} "
+                             f"multiplier={multiplier}")
+
+        self.initial_delay: float = initial_delay
+        self.max_delay: float = max_delay
+        self.multiplier: float = multiplier
+        self.jitter: bool = jitter
+
+    def get_delay(self, failures: int, initial_delay: float = None) -> float:
+        """
+        :param failures: number of consecutive failed attempts, at least 1
+        :param initial_delay: overrides the initial delay of the backoff
+        :return: seconds to wait before the next attempt
+        """
+        initial_delay = self.initial_delay if initial_delay is None else initial_delay
+        delay = min(self.max_delay, initial_delay * self.multiplier ** max(failures - 1, 0))
+        if self.jitter:
+            delay = random.uniform(delay / 2, delay)
+        return delay
+
+
+class BackoffException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
@@ -0,0 +1,75 @@
+import threading
+import time
+
+# requests pass, failures are counted
+CIRCUIT_CLOSED = "closed"
+# requests are rejected until reset_timeout has passed since the circuit opened
+CIRCUIT_OPEN = "open"
+# a single trial request is let through, its outcome closes or reopens the circuit
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30, half_open_retry_after: float = None):
+        """
+        A thread safe circuit breaker of a single endpoint. After failure_threshold consecutive failures
+        requests to the endpoint are rejected without being sent, so a dead endpoint fails fast
+        instead of holding up its callers.
+        :param failure_threshold: number of consecutive failures opening the circuit
+        :param reset_timeout: seconds the circuit stays open before a trial request is let through,
+        also the time after which a trial request which never reported back is replaced by another one
+        :param half_open_retry_after: seconds the requests rejected while the trial request runs are told
+        to wait, reset_timeout / 10 by default
+        """
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.half_open_retry_after: float = reset_timeout / 10 if half_open_retry_after is None \
+            else half_open_retry_after
+
+        self.__state: str = CIRCUIT_CLOSED
+        self.__failures: int = 0
+        self.__opened_at: float = None
+        self.__trial_started_at: float = None
+        self.__lock = threading.Lock()
+
+    def get_state(self) -> str:
+        with self.__lock:
+            return self.__state
+
+    def allow(self) -> bool:
+        """
+        :return: whether a request may be sent now, a half open circuit lets a single request through
+        """
+        with self.__lock:
+            if self.__state == CIRCUIT_CLOSED:
+                return True
+
+            now = time.monotonic()
+            if (self.__state == CIRCUIT_OPEN and now - self.__opened_at >= self.reset_timeout) or \
+                    (self.__state == CIRCUIT_HALF_OPEN and now - self.__trial_started_at >= self.reset_timeout):
+                self.__state = CIRCUIT_HALF_OPEN
+                self.__trial_started_at = now
+                return True
+            return False
+
+    def get_retry_after(self) -> float:
+        """
+        :return: seconds until the circuit may let a request through again, 0 if it is closed.
+        While a trial request runs, half_open_retry_after
+        """
+        with self.__lock:
+            if self.__state == CIRCUIT_CLOSED: return 0
+            if self.__state == CIRCUIT_HALF_OPEN: return self.half_open_retry_after
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.__opened_at))
+
+    def record_success(self) -> None:
+        with self.__lock:
+            self.__state = CIRCUIT_CLOSED
+            self.__failures = 0
+
+    def record_failure(self) -> None:
+        with self.__lock:
+            self.__failures += 1
+            if self.__state == CIRCUIT_HALF_OPEN or self.__failures >= self.failure_threshold:
+                self.__state = CIRCUIT_OPEN
+                self.__opened_at = time.monotonic()
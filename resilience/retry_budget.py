@@ -0,0 +1,44 @@
+import threading
+import time
+from collections import deque
+
+
+class RetryBudget:
+    def __init__(self, ratio: float = 0.2, min_retries_per_second: float = 1, window: float = 10):
+        """
+        Limits retries to a share of the requests sent to an endpoint, so that retries can not multiply
+        the load on an endpoint which is struggling already
+        :param ratio: retries allowed per request sent within the window
+        :param min_retries_per_second: retries allowed regardless of the number of requests, so that
+        rarely called endpoints can be retried as well
+        :param window: seconds over which requests and retries are counted
+        """
+        self.ratio: float = ratio
+        self.min_retries_per_second: float = min_retries_per_second
+        self.window: float = window
+
+        self.__requests: deque[float] = deque()  # time.monotonic() of the requests in the window
+        self.__retries: deque[float] = deque()
+        self.__lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self.__lock:
+            self.__requests.append(time.monotonic())
+
+    def try_withdraw(self) -> bool:
+        """
+        Takes a retry out of the budget
+        :return: False if the budget is exhausted and the request must not be retried
+        """
+        with self.__lock:
+            now = time.monotonic()
+            for timestamps in (self.__requests, self.__retries):
+                while len(timestamps) > 0 and now - timestamps[0] > self.window:
+                    timestamps.popleft()
+
+            allowed = max(self.min_retries_per_second * self.window, self.ratio * len(self.__requests))
+            if len(self.__retries) >= allowed:
+                return False
+
+            self.__retries.append(now)
+            return True
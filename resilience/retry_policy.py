@@ -0,0 +1,240 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Awaitable
+
+import support_functions as sf
+from metrics.instrumentation import REGISTRY
+from resilience.backoff import ExponentialBackoff
+from resilience.circuit_breaker import CircuitBreaker, CIRCUIT_HALF_OPEN
+from resilience.retry_budget import RetryBudget
+
+RETRIES = REGISTRY.counter("pydbsync_retries_total", "Number of retried attempts", ["endpoint"])
+REJECTIONS = REGISTRY.counter("pydbsync_circuit_rejections_total",
+                              "Number of calls rejected by an open circuit breaker", ["endpoint"])
+
+# (time.monotonic() deadline, max wait) of the innermost retry_scope
+_SCOPE: ContextVar[tuple[float, float]] = ContextVar("retry_scope", default=None)
+
+
+@contextmanager
+def retry_scope(deadline: float = None, max_wait: float = None):
+    """
+    Limits the retries of all calls made within the block (in the same thread or task), on top of their policies.
+    Usage:
+        with retry_scope(max_wait=0):
+            data_source.synchronize(db_connector)
+    :param deadline: seconds after which the calls made within are not retried any more
+    :param max_wait: longest wait in between two attempts. A call which would wait longer raises
+    RetryException with retry_after instead, so that the caller can be run again later, e.g. by a scheduler,
+    instead of holding its thread. 0 to never wait
+    """
+    token = _SCOPE.set((None if deadline is None else time.monotonic() + deadline, max_wait))
+    try:
+        yield
+    finally:
+        _SCOPE.reset(token)
+
+
+class RetryPolicy:
+    def __init__(self, backoff: ExponentialBackoff = None, max_attempts: int = None, deadline: float = 60,
+                 retryable: Callable[[Exception], bool] = None,
+                 failure_threshold: int = 5, reset_timeout: float = 30,
+                 budget_ratio: float = 0.2, min_retries_per_second: float = 1):
+        """
+        Retries failed calls with jittered exponential backoff, guarded per endpoint by a circuit breaker
+        and a retry budget. A call which can not succeed in time raises a RetryException carrying
+        retry_after, so that a scheduler can run it again later instead of a worker waiting for it.
+        Share a policy between connectors to share the breakers and budgets of their endpoints.
+        :param backoff: delays between the attempts, ExponentialBackoff() by default
+        :param max_attempts: maximum number of attempts of a call, None for no limit
+        :param deadline: seconds after which a call stops retrying, None for no limit
+        :param retryable: func(exception) -> bool, whether a failure is transient. By default all are.
+        Failures which are not retryable are raised at once and do not count against the circuit breaker
+        :param failure_threshold: consecutive failures opening an endpoint's circuit, see CircuitBreaker
+        :param reset_timeout: seconds an open circuit rejects calls, see CircuitBreaker
+        :param budget_ratio: retries allowed per call of an endpoint, see RetryBudget
+        :param min_retries_per_second: retries always allowed per endpoint, see RetryBudget
+        """
+        self.backoff: ExponentialBackoff = ExponentialBackoff() if backoff is None else backoff
+        self.max_attempts: int = max_attempts
+        self.deadline: float = deadline
+        self.retryable: Callable[[Exception], bool] = retryable
+
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.budget_ratio: float = budget_ratio
+        self.min_retries_per_second: float = min_retries_per_second
+
+        self.__circuit_breakers: dict[str, CircuitBreaker] = {}
+        self.__budgets: dict[str, RetryBudget] = {}
+        self.__lock = threading.Lock()
+
+    def get_circuit_breaker(self, endpoint: str) -> CircuitBreaker:
+        with self.__lock:
+            circuit_breaker = self.__circuit_breakers.get(endpoint)
+            if circuit_breaker is None:
+                circuit_breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self.__circuit_breakers[endpoint] = circuit_breaker
+            return circuit_breaker
+
+    def get_budget(self, endpoint: str) -> RetryBudget:
+        with self.__lock:
+            budget = self.__budgets.get(endpoint)
+            if budget is None:
+                budget = RetryBudget(self.budget_ratio, self.min_retries_per_second)
+                self.__budgets[endpoint] = budget
+            return budget
+
+    def call(self, func: Callable, endpoint: str, deadline: float = None, initial_delay: float = None,
+             description: str = None):
+        """
+        Calls func until it succeeds, waiting with time.sleep in between
+        :param func: func() -> result, raising an exception on failure
+        :param endpoint: name of the called endpoint, e.g. the connector's metrics label
+        :param deadline: overrides the policy's deadline
+        :param initial_delay: overrides the backoff's initial delay
+        :param description: what is called, for the log
+        :return: the result of func
+        :raises: RetryException if the call did not succeed in time, CircuitOpenException if the
+        endpoint's circuit is open, or the failure of func if it is not retryable
+        """
+        attempt = _RetryAttempt(self, endpoint, deadline, initial_delay, description)
+        while True:
+            wait = attempt.begin()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            try:
+                result = func()
+            except Exception as e:
+                time.sleep(attempt.fail(e))
+                continue
+            attempt.succeed()
+            return result
+
+    async def call_async(self, func: Callable[[], Awaitable], endpoint: str, deadline: float = None,
+                         initial_delay: float = None, description: str = None):
+        """
+        Awaits func() until it succeeds, waiting with asyncio.sleep in between, see call
+        :param func: func() -> awaitable, e.g. an async function
+        """
+        attempt = _RetryAttempt(self, endpoint, deadline, initial_delay, description)
+        while True:
+            wait = attempt.begin()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                result = await func()
+            except Exception as e:
+                await asyncio.sleep(attempt.fail(e))
+                continue
+            attempt.succeed()
+            return result
+
+    def is_retryable(self, exception: Exception) -> bool:
+        return self.retryable is None or self.retryable(exception)
+
+
+class _RetryAttempt:
+    def __init__(self, policy, endpoint: str, deadline: float, initial_delay: float, description: str):
+        """
+        Book keeping of a single call of RetryPolicy.call or RetryPolicy.call_async
+        """
+        self.policy: RetryPolicy = policy
+        self.endpoint: str = endpoint
+        self.deadline: float = policy.deadline if deadline is None else deadline
+        self.initial_delay: float = initial_delay
+        self.description: str = endpoint if description is None else description
+
+        self.circuit_breaker: CircuitBreaker = policy.get_circuit_breaker(endpoint)
+        self.budget: RetryBudget = policy.get_budget(endpoint)
+        self.started: float = time.monotonic()
+        self.failures: int = 0
+
+        self.budget.record_request()
+
+    def begin(self) -> float:
+        """
+        :return: seconds to wait before calling begin again, 0 if the call may be made now
+        :raises: CircuitOpenException if the endpoint's circuit is open, or half open and the trial
+        request does not finish in time
+        """
+        if self.circuit_breaker.allow(): return 0
+
+        REJECTIONS.inc(endpoint=self.endpoint)
+        retry_after = self.circuit_breaker.get_retry_after()
+        if self.circuit_breaker.get_state() == CIRCUIT_HALF_OPEN and self.__may_wait(retry_after):
+            # another call is trying the endpoint, its outcome is waited for
+            return retry_after
+        raise CircuitOpenException(f"Circuit of {self.endpoint} is open, not calling {self.description}",
+                                   retry_after)
+
+    def __may_wait(self, delay: float) -> bool:
+        if self.deadline is not None and time.monotonic() - self.started + delay > self.deadline:
+            return False
+        scope = _SCOPE.get()
+        if scope is not None:
+            deadline_at, max_wait = scope
+            if deadline_at is not None and time.monotonic() + delay > deadline_at: return False
+            if max_wait is not None and delay > max_wait: return False
+        return True
+
+    def succeed(self) -> None:
+        self.circuit_breaker.record_success()
+
+    def fail(self, exception: Exception) -> float:
+        """
+        :return: seconds to wait before the next attempt
+        :raises: the exception if it is not to be retried
+        """
+        if not self.policy.is_retryable(exception):
+            # the endpoint answered, e.g. with a client error, so it is up
+            self.circuit_breaker.record_success()
+            raise exception
+
+        self.failures += 1
+        self.circuit_breaker.record_failure()
+        delay = max(self.policy.backoff.get_delay(self.failures, self.initial_delay),
+                    self.circuit_breaker.get_retry_after())
+
+        if self.policy.max_attempts is not None and self.failures >= self.policy.max_attempts:
+            raise RetryException(f"{self.description} failed {self.failures} times", delay) from exception
+        if self.deadline is not None and time.monotonic() - self.started + delay > self.deadline:
+            raise RetryException(f"{self.description} did not succeed within {self.deadline} s", delay) \
+                from exception
+        scope = _SCOPE.get()
+        if scope is not None:
+            deadline_at, max_wait = scope
+            if deadline_at is not None and time.monotonic() + delay > deadline_at:
+                raise RetryException(f"{self.description} did not succeed within the deadline of its scope", delay) \
+                    from exception
+            if max_wait is not None and delay > max_wait:
+                raise RetryException(f"{self.description} failed, to be retried in {delay:.1f} s", delay) \
+                    from exception
+        if not self.budget.try_withdraw():
+            raise RetryException(f"Retry budget of {self.endpoint} is exhausted", delay) from exception
+
+        RETRIES.inc(endpoint=self.endpoint)
+        sf.print_to_console(f"{type(exception).__name__} occurred:\n{exception}\n"
+                            f"Retrying {self.description} in {delay:.1f} s ...")
+        return delay
+
+
+class RetryException(Exception):
+    def __init__(self, message, retry_after: float = None):
+        """
+        :param message:
+        :param retry_after: seconds after which the call should be tried again
+        """
+        self.message = message
+        self.retry_after: float = retry_after
+        super().__init__(message)
+
+
+class CircuitOpenException(RetryException):
+    def __init__(self, message, retry_after: float = None):
+        super().__init__(message, retry_after)
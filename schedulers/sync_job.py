@@ -0,0 +1,90 @@
+from typing import Callable
+
+from connectors.database_connector import DatabaseConnector
+from data_sources.database_data_source import DatabaseDataSource
+from resilience.backoff import ExponentialBackoff
+
+
+class SyncJob:
+    def __init__(self, name: str, sync: Callable, interval: float, connectors: list | tuple = (),
+                 backoff: ExponentialBackoff = None, max_retry_wait: float = 0, deadline: float = None):
+        """
+        A periodically run synchronisation task
+        :param name: unique name of the job, e.g. the name of the synchronised table
+        :param sync: func() -> int | None, performs a single synchronisation and optionally returns the number of moved rows
+        :param interval: seconds between the starts of consecutive runs
+        :param connectors: connectors used by the job, counted against the scheduler's per connector limits
+        :param backoff: delays after consecutive failed runs, which replace the interval until a run succeeds.
+        None to keep the interval, unless the failure asks to be retried later (see RetryException.retry_after)
+        :param max_retry_wait: longest wait in between two attempts of a call made by a run, see retry_scope.
+        By default a failed call ends the run and the job is rescheduled, so that waiting does not hold a worker
+        :param deadline: seconds after which the calls made by a run are not retried any more, None for no limit
+        """
+        self.name: str = name
+        self.sync: Callable = sync
+        self.interval: float = interval
+        self.connectors: tuple = tuple(connectors)
+        self.backoff: ExponentialBackoff = backoff
+        self.max_retry_wait: float = max_retry_wait
+        self.deadline: float = deadline
+
+    @classmethod
+    def from_data_source(cls, name: str, data_source: DatabaseDataSource, db_connector: DatabaseConnector,
+                         interval: float, connectors: list | tuple = None, **kwargs):
+        """
+        Creates a job applying the change set of a DatabaseDataSource to the target on every run
+        :param name: unique name of the job
+        :param data_source: the synchronised data source
+        :param db_connector: connector of the target database
+        :param interval: seconds between the starts of consecutive runs
+        :param connectors: connectors used by the job, by default db_connector and the connectors
+        of the data source's state controllers
+        :param kwargs: backoff, max_retry_wait and deadline, see __init__
+        :return: a new SyncJob
+        """
+        def sync() -> int:
+            return data_source.synchronize(db_connector)
+
+        if connectors is None:
+            connectors = [db_connector]
+            for state_controller in (data_source.source_state_controller, data_source.target_state_controller):
+                connector = getattr(state_controller, "db_connector", None)
+                if connector is not None and all(connector is not known for known in connectors):
+                    connectors.append(connector)
+
+        return cls(name, sync, interval, connectors, **kwargs)
+
+
+class SyncJobStats:
+    def __init__(self, name: str):
+        """
+        Running statistics of a SyncJob
+        :param name: name of the job
+        """
+        self.name: str = name
+        self.runs: int = 0
+        self.failures: int = 0
+        self.consecutive_failures: int = 0
+        self.running: bool = False
+
+        self.last_started: float = None  # time.time() of the last start
+        self.last_latency: float = None  # seconds the last run took
+        self.average_latency: float = None  # exponentially weighted average of run time in seconds
+        self.max_latency: float = None
+        self.last_rows: int = None  # rows moved by the last run
+        self.total_rows: int = 0
+        self.last_error: Exception = None
+
+        self.next_run: float = None  # time.time() at which the job is due next
+        self.lag: float = 0  # seconds the last start was late for, grows when workers or connectors are saturated
+
+    def copy(self):
+        stats = SyncJobStats(self.name)
+        for key, value in vars(self).items():
+            setattr(stats, key, value)
+        return stats
+
+    def __str__(self):
+        return (f"{self.name}: runs={self.runs} failures={self.failures} running={self.running} "
+                f"last_latency={self.last_latency} average_latency={self.average_latency} "
+                f"lag={self.lag} last_rows={self.last_rows}")
@@ -0,0 +1,229 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import support_functions as sf
+from metrics.instrumentation import measure_stage, STAGE_SYNC
+from resilience.retry_policy import retry_scope, RetryException
+from schedulers.sync_job import SyncJob, SyncJobStats
+
+
+class SyncScheduler:
+    def __init__(self, max_workers: int = 4, default_connector_limit: int = None):
+        """
+        Runs SyncJobs concurrently, each on its own interval, on a bounded pool of worker threads.
+        A job never runs twice at the same time, and a job which is due while all workers or one
+        of its connectors are busy waits without holding up the other jobs.
+        :param max_workers: maximum number of jobs running at the same time
+        :param default_connector_limit: maximum number of jobs using the same connector at the same time,
+        None for no limit. Can be overridden per connector with set_connector_limit
+        """
+        self.max_workers: int = max_workers
+        self.default_connector_limit: int = default_connector_limit
+
+        self.__executor: ThreadPoolExecutor = None
+        self.__thread: threading.Thread = None
+        self.__condition = threading.Condition()
+        self.__stopped: bool = True
+
+        self.__jobs: dict[str, SyncJob] = {}
+        self.__stats: dict[str, SyncJobStats] = {}
+        self.__due_times: dict[str, float] = {}
+
+        self.__queue: list = []  # heap of (due time, sequence number, job name) of jobs not yet due
+        self.__sequence = itertools.count()
+        self.__waiting: list[str] = []  # names of due jobs waiting for a worker or a connector, in due order
+        self.__running: set[SyncJob] = set()  # jobs with a run in progress, a removed job until its run ends
+
+        self.__connector_limits: dict[int, int] = {}
+        self.__connector_usage: dict[int, int] = {}
+
+    def add_job(self, job: SyncJob, start_delay: float = 0) -> None:
+        """
+        Adds a job to the schedule
+        :param job: the job, its name has to be unique
+        :param start_delay: seconds until the first run
+        """
+        with self.__condition:
+            if job.name in self.__jobs:
+                raise SyncSchedulerException(f"A job named {job.name} is already scheduled")
+
+            self.__jobs[job.name] = job
+            self.__stats[job.name] = SyncJobStats(job.name)
+            self.__push(job.name, time.time() + start_delay)
+            self.__condition.notify_all()
+
+    def remove_job(self, name: str) -> None:
+        """
+        Removes a job and its statistics from the schedule, a run in progress is allowed to finish.
+        A job added under the same name afterwards is not affected by that run
+        :param name: name of the job
+        """
+        with self.__condition:
+            self.__jobs.pop(name, None)
+            self.__stats.pop(name, None)
+            self.__due_times.pop(name, None)
+            if name in self.__waiting:
+                self.__waiting.remove(name)
+
+    def set_connector_limit(self, connector, limit: int) -> None:
+        """
+        :param connector: a connector used by jobs
+        :param limit: maximum number of jobs using the connector at the same time, None for no limit
+        """
+        with self.__condition:
+            self.__connector_limits[id(connector)] = limit
+            self.__condition.notify_all()
+
+    def start(self) -> None:
+        with self.__condition:
+            if not self.__stopped: return
+            self.__stopped = False
+
+        self.__executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="sync_worker")
+        self.__thread = threading.Thread(target=self.__run, name="sync_scheduler", daemon=True)
+        self.__thread.start()
+
+    def stop(self, wait: bool = True) -> None:
+        """
+        Stops starting new runs
+        :param wait: wait for the runs in progress to finish
+        """
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify_all()
+
+        if self.__thread is not None:
+            self.__thread.join()
+        if self.__executor is not None:
+            self.__executor.shutdown(wait)
+
+    def get_stats(self) -> dict[str, SyncJobStats]:
+        """
+        :return: a snapshot of the statistics of every job, with lag updated for jobs which are overdue
+        """
+        now = time.time()
+        with self.__condition:
+            snapshot = {}
+            for name, stats in self.__stats.items():
+                stats = stats.copy()
+                if name in self.__waiting:
+                    stats.lag = now - self.__due_times[name]
+                snapshot[name] = stats
+            return snapshot
+
+    def get_backlog(self) -> list[str]:
+        """
+        :return: names of the jobs which are due but waiting for a free worker or connector
+        """
+        with self.__condition:
+            return list(self.__waiting)
+
+    def __run(self) -> None:
+        with self.__condition:
+            while not self.__stopped:
+                now = time.time()
+
+                while len(self.__queue) > 0 and self.__queue[0][0] <= now:
+                    due, _, name = heapq.heappop(self.__queue)
+                    if self.__due_times.get(name) == due:
+                        self.__waiting.append(name)
+
+                for name in list(self.__waiting):
+                    if len(self.__running) >= self.max_workers: break
+                    if self.__can_start(self.__jobs[name]):
+                        self.__waiting.remove(name)
+                        self.__start(self.__jobs[name], now)
+
+                timeout = None if len(self.__queue) == 0 else max(self.__queue[0][0] - now, 0)
+                self.__condition.wait(timeout)
+
+    def __can_start(self, job: SyncJob) -> bool:
+        for connector in job.connectors:
+            limit = self.__connector_limits.get(id(connector), self.default_connector_limit)
+            if limit is not None and self.__connector_usage.get(id(connector), 0) >= limit:
+                return False
+        return True
+
+    def __start(self, job: SyncJob, now: float) -> None:
+        stats = self.__stats[job.name]
+        stats.running = True
+        stats.last_started = now
+        stats.lag = now - self.__due_times[job.name]
+
+        self.__running.add(job)
+        for connector in job.connectors:
+            self.__connector_usage[id(connector)] = self.__connector_usage.get(id(connector), 0) + 1
+
+        self.__executor.submit(self.__execute, job, stats, self.__due_times[job.name])
+
+    def __execute(self, job: SyncJob, stats: SyncJobStats, due: float) -> None:
+        started = time.perf_counter()
+        rows, error = None, None
+        try:
+            with measure_stage(STAGE_SYNC, table=job.name) as timer, retry_scope(job.deadline, job.max_retry_wait):
+                rows = job.sync()
+                timer.add_rows(rows or 0)
+        except Exception as e:
+            error = e
+            sf.print_to_console(f"Sync job {job.name} failed:\n{e}")
+        latency = time.perf_counter() - started
+
+        with self.__condition:
+            stats.running = False
+            stats.runs += 1
+            stats.last_latency = latency
+            stats.max_latency = latency if stats.max_latency is None else max(stats.max_latency, latency)
+            stats.average_latency = latency if stats.average_latency is None \
+                else 0.8 * stats.average_latency + 0.2 * latency
+
+            if error is None:
+                stats.last_rows = rows
+                stats.total_rows += rows or 0
+                stats.consecutive_failures = 0
+            else:
+                stats.failures += 1
+                stats.consecutive_failures += 1
+                stats.last_error = error
+
+            self.__running.discard(job)
+            for connector in job.connectors:
+                self.__connector_usage[id(connector)] -= 1
+
+            # the job may have been removed, or replaced by another one of the same name, while it ran
+            if self.__jobs.get(job.name) is job:
+                retry_delay = self.__get_retry_delay(job, stats, error)
+                if retry_delay is not None:
+                    self.__push(job.name, time.time() + retry_delay)
+                else:
+                    # keep the fixed rate, but do not try to catch up on runs missed by a slow run
+                    self.__push(job.name, max(due + job.interval, time.time()))
+
+            self.__condition.notify_all()
+
+    @staticmethod
+    def __get_retry_delay(job: SyncJob, stats: SyncJobStats, error: Exception) -> float | None:
+        """
+        :return: seconds until a failed job is run again, None to run it at its interval
+        """
+        if error is None: return None
+
+        delay = None
+        if job.backoff is not None:
+            delay = job.backoff.get_delay(stats.consecutive_failures)
+        if isinstance(error, RetryException) and error.retry_after is not None:
+            delay = error.retry_after if delay is None else max(delay, error.retry_after)
+        return delay
+
+    def __push(self, name: str, due: float) -> None:
+        self.__due_times[name] = due
+        self.__stats[name].next_run = due
+        heapq.heappush(self.__queue, (due, next(self.__sequence), name))
+
+
+class SyncSchedulerException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
@@ -0,0 +1,47 @@
+from typing import AsyncIterator
+
+from connectors.async_database_connector import AsyncDatabaseConnector
+from data_types.database_table import DatabaseTable
+from state_controllers.async_state_controller import AsyncStateController
+
+
+class AsyncDatabaseTableStateController(AsyncStateController):
+    def __init__(self, db_connector: AsyncDatabaseConnector, table_name: str, query: str):
+        """
+        asyncio variant of DatabaseTableStateController
+        :param db_connector: AsyncDatabaseConnector object on which a query will be performed
+        :param table_name: name of the state table
+        :param query: query string on which .format() will be called with the given kwargs when fetching the state
+        """
+        self.db_connector: AsyncDatabaseConnector = db_connector
+        self.table_name: str = table_name
+        self.query: str = query
+
+    async def get_state(self, **kwargs) -> DatabaseTable:
+        """
+        Returns the state in a DatabaseTable object.
+        :param kwargs: arguments to be placed into query.format(**kwargs) before running the query
+        :return:
+        """
+        return await self.db_connector.execute_sql_query(self.format_query(**kwargs), self.table_name)
+
+    async def stream_state(self, chunk_size: int = None, **kwargs) -> AsyncIterator[DatabaseTable]:
+        """
+        Streams the state in DatabaseTable chunks of at most chunk_size rows
+        :param chunk_size: maximum number of rows in a chunk, the connector's fetch_chunk_size by default
+        :param kwargs: arguments to be placed into query.format(**kwargs) before running the query
+        :return:
+        """
+        chunks = self.db_connector.stream_sql_query(self.format_query(**kwargs), self.table_name, chunk_size)
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    def format_query(self, **kwargs) -> str:
+        """
+        :param kwargs: arguments to be placed into query.format(**kwargs)
+        :return: the query to run
+        """
+        return self.query.format(**kwargs)
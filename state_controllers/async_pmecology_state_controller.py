@@ -0,0 +1,25 @@
+from connectors.async_pmecology_rest_api_connector import AsyncPmecologyRestApiConnector
+from data_types.database_table import DatabaseTable
+from state_controllers.async_state_controller import AsyncStateController
+
+
+class AsyncPmecologyStateController(AsyncStateController):
+    def __init__(self, api_connector: AsyncPmecologyRestApiConnector, table_name: str):
+        """
+        asyncio variant of PmecologyStateController
+        :param api_connector: the appropriate AsyncPmecologyRestApiConnector
+        :param table_name: name of the resulting table
+        """
+        self.api_connector: AsyncPmecologyRestApiConnector = api_connector
+        self.table_name: str = table_name
+
+    async def get_state(self, **kwargs) -> DatabaseTable:
+        """
+        Gets the currents state of the source
+        :param kwargs: timestamp, records and descending, see PmecologyStateController.get_state
+        :return:
+        """
+        return await self.api_connector.get_sensor_data(self.table_name,
+                                                        kwargs["timestamp"],
+                                                        kwargs["records"],
+                                                        kwargs["descending"])
@@ -0,0 +1,34 @@
+from abc import abstractmethod
+from typing import AsyncIterator
+
+
+class AsyncStateController:
+    """
+    asyncio variant of StateController
+    """
+    @abstractmethod
+    async def get_state(self, **kwargs):
+        pass
+
+    async def stream_state(self, chunk_size: int = None, **kwargs) -> AsyncIterator:
+        """
+        Returns the state as an asynchronous iterator of chunks. Controllers able to fetch the state
+        incrementally override this, by default the whole state is a single chunk.
+        :param chunk_size: maximum number of rows in a chunk
+        :param kwargs: same as in get_state
+        """
+        state = await self.get_state(**kwargs)
+        if state is not None:
+            yield state
+
+    async def commit(self) -> None:
+        """
+        Called once the change computed from the last fetched state has been written to the target.
+        """
+        pass
+
+    async def invalidate(self) -> None:
+        """
+        Called when a cycle ends without a change to write, see StateController.invalidate
+        """
+        pass
@@ -1,3 +1,5 @@
+from typing import Iterator
+
 from data_types.database_table import DatabaseTable
 from state_controllers.state_controller import StateController
 from connectors.database_connector import DatabaseConnector
@@ -23,6 +25,31 @@ class DatabaseTableStateController(StateController):
         :return:
         """
 
-        formatted_query = self.query.format(**kwargs)
+        formatted_query = self.format_query(**kwargs)
         state = self.db_connector.execute_sql_query(formatted_query, self.table_name)
         return state
+
+    def stream_state(self, chunk_size: int = None, **kwargs) -> Iterator[DatabaseTable]:
+        """
+        Returns the state as an iterator of DatabaseTable chunks fetched one after another.
+        :param chunk_size: maximum number of rows in a chunk, the connector's fetch_chunk_size by default
+        :param kwargs: arguments to be placed into query.format(**kwargs) before running the query
+        :return:
+        """
+
+        formatted_query = self.format_query(**kwargs)
+        return self.db_connector.stream_sql_query(formatted_query, self.table_name, chunk_size)
+
+    def get_state_key(self, **kwargs) -> str:
+        """
+        :param kwargs: arguments to be placed into query.format(**kwargs)
+        :return: the query to run, see StateController.get_state_key
+        """
+        return self.query.format(**kwargs)
+
+    def format_query(self, **kwargs) -> str:
+        """
+        :param kwargs: arguments to be placed into query.format(**kwargs)
+        :return: the query to run
+        """
+        return self.query.format(**kwargs)
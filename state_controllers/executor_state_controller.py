@@ -0,0 +1,44 @@
+import asyncio
+import functools
+from concurrent.futures import Executor
+from typing import AsyncIterator
+
+from state_controllers.async_state_controller import AsyncStateController
+from state_controllers.state_controller import StateController
+
+_END_OF_STREAM = object()
+
+
+class ExecutorStateController(AsyncStateController):
+    def __init__(self, state_controller: StateController, executor: Executor = None):
+        """
+        Adapts a blocking StateController (e.g. one keeping a watermark or a virtual view)
+        to AsyncStateController by running its methods in an executor
+        :param state_controller: the adapted controller
+        :param executor: executor the methods run in, the event loop's default executor if None.
+        Use a single worker executor for a controller whose connector has no connection pool
+        """
+        self.state_controller: StateController = state_controller
+        self.executor: Executor = executor
+
+    async def get_state(self, **kwargs):
+        return await self.__run(functools.partial(self.state_controller.get_state, **kwargs))
+
+    async def stream_state(self, chunk_size: int = None, **kwargs) -> AsyncIterator:
+        chunks = self.state_controller.stream_state(chunk_size, **kwargs)
+        try:
+            while True:
+                chunk = await self.__run(next, chunks, _END_OF_STREAM)
+                if chunk is _END_OF_STREAM: break
+                yield chunk
+        finally:
+            await self.__run(chunks.close)
+
+    async def commit(self) -> None:
+        await self.__run(self.state_controller.commit)
+
+    async def invalidate(self) -> None:
+        await self.__run(self.state_controller.invalidate)
+
+    async def __run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
@@ -0,0 +1,74 @@
+from typing import Iterator
+
+from connectors.database_connector import DatabaseConnector
+from data_types.database_table import DatabaseTable
+from state_controllers.database_table_state_controller import DatabaseTableStateController
+from state_controllers.watermark import Watermark
+
+
+class IncrementalDatabaseTableStateController(DatabaseTableStateController):
+    def __init__(self, db_connector: DatabaseConnector, table_name: str, query: str, watermark: Watermark,
+                 advance_watermark: bool = True):
+        """
+        Creates a DatabaseTableStateController fetching only the rows past a watermark
+        :param db_connector: DatabaseConnector object on which a query will be performed
+        :param table_name: name of the state table
+        :param query: query string on which .format() will be called with the given kwargs when fetching the state.
+        Place {watermark_condition} in its WHERE clause, e.g. "SELECT * FROM t WHERE {watermark_condition}".
+        The watermark is bound as a parameter once it is set, with "%s" placeholders (psycopg2) literal % signs
+        in the query have to be written as %%, the first query without a watermark runs without parameters
+        :param watermark: the watermark, share the same object between the source and the target controller
+        so that both states cover the same window
+        :param advance_watermark: whether fetched rows raise the watermark, set to False for the target controller
+        """
+        super().__init__(db_connector, table_name, query)
+
+        self.watermark: Watermark = watermark
+        self.advance_watermark: bool = advance_watermark
+
+    def get_state(self, **kwargs) -> DatabaseTable:
+        """
+        Returns the rows past the watermark in a DatabaseTable object.
+        :param kwargs: arguments to be placed into query.format(**kwargs) before running the query
+        :return:
+        """
+        formatted_query, params = self.__format_query(**kwargs)
+        state = self.db_connector.execute_sql_query(formatted_query, self.table_name, params)
+
+        if self.advance_watermark:
+            self.watermark.observe(state)
+        return state
+
+    def stream_state(self, chunk_size: int = None, **kwargs) -> Iterator[DatabaseTable]:
+        formatted_query, params = self.__format_query(**kwargs)
+
+        for chunk in self.db_connector.stream_sql_query(formatted_query, self.table_name, chunk_size, params):
+            if self.advance_watermark:
+                self.watermark.observe(chunk)
+            yield chunk
+
+    def get_state_key(self, **kwargs) -> tuple[str, tuple]:
+        """
+        :return: the query and the watermark it is run with, see StateController.get_state_key
+        """
+        formatted_query, params = self.__format_query(**kwargs)
+        return formatted_query, tuple(params or ())
+
+    def commit(self) -> None:
+        """
+        Moves the watermark past the fetched rows, called once they have been written to the target
+        """
+        if self.advance_watermark:
+            self.watermark.commit()
+
+    def __format_query(self, **kwargs) -> tuple[str, list | None]:
+        """
+        The watermark's value is bound as a parameter rather than inlined, so that any type the driver
+        can bind (datetime, rowversion bytes, ...) works on every database
+        :return: the query with the watermark condition in place, and the values to bind to its placeholders.
+        None rather than no values without a watermark, drivers like psycopg2 only parse placeholders
+        (and % signs) when values are passed
+        """
+        condition, params = self.watermark.get_condition(self.db_connector.placeholder)
+        params = params * self.query.count("{watermark_condition}")
+        return self.query.format(watermark_condition=condition, **kwargs), params if params else None
@@ -0,0 +1,178 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+from connectors.database_connector import DatabaseConnector
+from data_types.database_table import DatabaseTable
+from state_controllers.database_table_state_controller import DatabaseTableStateController
+
+# partitions are ranges of equal width between the lowest and the highest key, for numeric and temporal keys
+PARTITION_MODE_RANGE = "range"
+# partitions hold (nearly) equal numbers of rows, bounds are computed on the server with NTILE, for any orderable key
+PARTITION_MODE_NTILE = "ntile"
+
+_END_OF_PARTITION = object()
+
+
+class PartitionedDatabaseTableStateController(DatabaseTableStateController):
+    def __init__(self, db_connector: DatabaseConnector, table_name: str, query: str, key_column: str,
+                 partitions: int = 4, partition_mode: str = PARTITION_MODE_RANGE, key_table: str = None,
+                 buffered_chunks: int = 2, reserved_connections: int = 1):
+        """
+        Creates a DatabaseTableStateController fetching the state in key ranges concurrently, each on its own
+        connection. Call db_connector.use_connection_pool with max_size of at least
+        partitions + reserved_connections first, without a pool the partitions are fetched one after another.
+        :param db_connector: DatabaseConnector object on which the queries will be performed
+        :param table_name: name of the state table
+        :param query: query string on which .format() will be called with the given kwargs when fetching the state.
+        Place {partition_condition} in its WHERE clause and order it by key_column to get the state in key order,
+        e.g. "SELECT * FROM t WHERE {partition_condition} ORDER BY id". The condition binds its bounds
+        as parameters, so literal % signs have to be doubled for drivers of the format paramstyle
+        :param key_column: orderable column the state is partitioned on, rows with a NULL key go to the first partition
+        :param partitions: number of key ranges fetched concurrently
+        :param partition_mode: PARTITION_MODE_RANGE or PARTITION_MODE_NTILE
+        :param key_table: table the key bounds are computed on, table_name by default
+        :param buffered_chunks: chunks each partition fetches ahead of the consumer in stream_state
+        :param reserved_connections: connections of the pool stream_state leaves to other users. Partitions
+        fetched ahead hold their connections while they wait for the consumer, so if the partition being
+        consumed, or the consumer itself, had to wait for one of them, the stream would deadlock.
+        At least the number of connections the other users of the pool hold while the state is streamed,
+        e.g. 2 if the pool also serves the stream of the other state and the writes in DIFF_MODE_SORTED_MERGE
+        """
+        super().__init__(db_connector, table_name, query)
+
+        if partition_mode not in (PARTITION_MODE_RANGE, PARTITION_MODE_NTILE):
+            raise PartitionedStateControllerException(f"Unknown partition mode {partition_mode}")
+
+        self.key_column: str = key_column
+        self.partitions: int = partitions
+        self.partition_mode: str = partition_mode
+        self.key_table: str = table_name if key_table is None else key_table
+        self.buffered_chunks: int = buffered_chunks
+        self.reserved_connections: int = reserved_connections
+
+    def get_state(self, **kwargs) -> DatabaseTable:
+        """
+        Fetches all of the partitions concurrently and concatenates them in key order.
+        :param kwargs: arguments to be placed into query.format(**kwargs) before running the queries
+        :return:
+        """
+        queries = self.get_partition_queries(**kwargs)
+
+        with ThreadPoolExecutor(self.__get_worker_count(len(queries)), thread_name_prefix="partition") as executor:
+            results = list(executor.map(lambda partition: self.db_connector.execute_sql_query(
+                partition[0], self.table_name, partition[1]), queries))
+
+        state = results[0]
+        for result in results[1:]:
+            state.append_table(result.get_table())
+        return state
+
+    def stream_state(self, chunk_size: int = None, **kwargs) -> Iterator[DatabaseTable]:
+        """
+        Streams all of the partitions concurrently and yields their chunks in key order. Every partition
+        buffers at most buffered_chunks chunks while it waits for the partitions before it to be consumed.
+        At most pool.max_size - reserved_connections partitions are streamed at a time.
+        :param chunk_size: maximum number of rows in a chunk, the connector's fetch_chunk_size by default
+        :param kwargs: arguments to be placed into query.format(**kwargs) before running the queries
+        :return:
+        """
+        queries = self.get_partition_queries(**kwargs)
+        cancelled = threading.Event()
+        outputs = [queue.Queue(self.buffered_chunks) for _ in queries]
+
+        executor = ThreadPoolExecutor(self.__get_worker_count(len(queries), self.reserved_connections),
+                                      thread_name_prefix="partition")
+        try:
+            # partitions start in key order, so the partition being consumed always holds a worker,
+            # and with reserved_connections left to the other users of the pool, a connection
+            for (query, params), output in zip(queries, outputs):
+                executor.submit(self.__produce, query, params, chunk_size, output, cancelled)
+
+            for output in outputs:
+                item = output.get()
+                while item is not _END_OF_PARTITION:
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+                    item = output.get()
+        finally:
+            cancelled.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_state_key(self, **kwargs) -> str:
+        """
+        :return: the query with the partition condition left out, the partitions together always cover
+        the whole query. See StateController.get_state_key
+        """
+        return self.query.format(partition_condition="{partition_condition}", **kwargs)
+
+    def get_partition_queries(self, **kwargs) -> list[tuple[str, list]]:
+        """
+        :param kwargs: arguments to be placed into query.format(**kwargs)
+        :return: (query, params) of every partition in key order
+        """
+        queries = []
+        for i, key_range in enumerate(self.get_key_ranges()):
+            condition, params = self.db_connector.get_range_condition(self.key_column, *key_range)
+            if i == 0:
+                condition = f"({condition} OR {self.key_column} IS NULL)"
+            queries.append((self.query.format(partition_condition=condition, **kwargs), params))
+        return queries
+
+    def get_key_ranges(self) -> list[tuple]:
+        """
+        :return: (lower, upper, upper_inclusive) ranges of the partitions in key order. The first range is
+        open below and the last one above, so rows added after the bounds were computed are fetched as well
+        """
+        if self.partition_mode == PARTITION_MODE_NTILE:
+            bounds = self.db_connector.get_key_quantiles(self.key_table, self.key_column, self.partitions)
+            if len(bounds) == 0: return [(None, None, False)]
+            bounds = [None] + bounds[1:] + [None]
+            return [(bounds[i], bounds[i + 1], False) for i in range(len(bounds) - 1)]
+
+        lower, upper = self.db_connector.get_key_bounds(self.key_table, self.key_column)
+        if lower is None: return [(None, None, False)]
+
+        ranges = self.db_connector.split_key_range(lower, upper, True, self.partitions)
+        ranges[0] = (None,) + ranges[0][1:]
+        ranges[-1] = ranges[-1][:1] + (None, False)
+        return ranges
+
+    def __get_worker_count(self, partition_count: int, reserved_connections: int = 0) -> int:
+        # more workers than pooled connections could take the connection the consumed partition waits for
+        if self.db_connector.pool is None: return 1
+        return max(1, min(partition_count, self.db_connector.pool.max_size - reserved_connections))
+
+    def __produce(self, query: str, params: list, chunk_size: int, output: queue.Queue,
+                  cancelled: threading.Event) -> None:
+        try:
+            chunks = self.db_connector.stream_sql_query(query, self.table_name, chunk_size, params)
+            try:
+                for chunk in chunks:
+                    if not self.__put(output, chunk, cancelled): return
+            finally:
+                chunks.close()
+            self.__put(output, _END_OF_PARTITION, cancelled)
+        except Exception as e:
+            self.__put(output, e, cancelled)
+
+    @staticmethod
+    def __put(output: queue.Queue, item, cancelled: threading.Event) -> bool:
+        """
+        :return: False if the consumer stopped before the item could be queued
+        """
+        while not cancelled.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+class PartitionedStateControllerException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
@@ -1,7 +1,42 @@
 from abc import abstractmethod
+from typing import Iterator
 
 
 class StateController:
     @abstractmethod
     def get_state(self, **kwargs):
         pass
+
+    def stream_state(self, chunk_size: int = None, **kwargs) -> Iterator:
+        """
+        Returns the state as an iterator of chunks. Controllers able to fetch the state
+        incrementally override this, by default the whole state is a single chunk.
+        :param chunk_size: maximum number of rows in a chunk
+        :param kwargs: same as in get_state
+        """
+        state = self.get_state(**kwargs)
+        if state is not None:
+            yield state
+
+    def get_state_key(self, **kwargs):
+        """
+        Identifies the rows get_state(**kwargs) fetches, e.g. to tell whether a cached state answers it.
+        Controllers whose query changes between calls with the same kwargs override this.
+        :param kwargs: same as in get_state
+        :return: a picklable value, equal for calls fetching the same rows
+        """
+        return dict(kwargs)
+
+    def commit(self) -> None:
+        """
+        Called once the change computed from the last fetched state has been written to the target.
+        Controllers keeping track of what was synchronised (e.g. a watermark) override this.
+        """
+        pass
+
+    def invalidate(self) -> None:
+        """
+        Called when a cycle ends without a change to write. Controllers reusing what they fetched
+        within a cycle (e.g. a materialized view) override this, so that the next cycle sees new data.
+        """
+        pass
@@ -1,25 +1,59 @@
+import re
+import threading
+import time
+import uuid
+from typing import Iterator
+
 from state_controllers.database_table_state_controller import DatabaseTableStateController
 from data_types.database_table import DatabaseTable
 from connectors.database_connector import DatabaseConnector
+import support_functions as sf
+from metrics.instrumentation import measure_stage, STAGE_MATERIALIZE
+
+# the view is inlined as a subquery into every state query
+VIEW_MODE_INLINE = "inline"
+# the view is stored in a table once per cycle and the state queries read the table
+VIEW_MODE_TEMP_TABLE = "temp_table"
+# the results of the state queries are cached locally once per cycle
+VIEW_MODE_LOCAL = "local"
+
+_VIEW_REFERENCE = re.compile(r"\b(FROM|JOIN)(\s+)v_view\b", re.IGNORECASE)
 
 
 class VirtualViewDatabaseTableStateController(DatabaseTableStateController):
-    def __init__(self, db_connector: DatabaseConnector, table_name: str, query: str, virtual_view_query: str):
+    def __init__(self, db_connector: DatabaseConnector, table_name: str, query: str, virtual_view_query: str,
+                 view_mode: str = VIEW_MODE_INLINE, ttl: float = 300, materialized_table: str = None):
         """
         Creates a DatabaseTableStateController
         :param db_connector: DatabaseConnector object on which a query will be performed
         :param table_name: name of the state table
         :param query: query string on which .format() will be called with the given kwargs when fetching the state
         indicate the virtual view table as v_view in your query
-        :param virtual_view_query: a query on top of which the query will be called
+        :param virtual_view_query: a query on top of which the query will be called, it is not formatted
+        :param view_mode: VIEW_MODE_INLINE, VIEW_MODE_TEMP_TABLE or VIEW_MODE_LOCAL.
+        A materialized view (or cached state) is reused until commit is called at the end of the cycle,
+        or until it is older than ttl
+        :param ttl: maximum age in seconds of a materialized view or a cached state, None for no limit
+        :param materialized_table: prefix of the name of the table the view is stored in, v_view_<table_name>
+        by default. Every materialization gets a table of its own, <materialized_table>_<random suffix>, so
+        concurrent controllers and processes never share one. The table is temporary, unless db_connector
+        uses a connection pool: temporary tables are only visible to the connection which created them,
+        so the table is then created as a regular table, which is dropped by commit
         """
+        super().__init__(db_connector, table_name, query)
 
-        self.virtual_view_query = virtual_view_query
-        self.db_connector: DatabaseConnector = db_connector
-        self.table_name: str = table_name
-        self.query: str = query
+        if view_mode not in (VIEW_MODE_INLINE, VIEW_MODE_TEMP_TABLE, VIEW_MODE_LOCAL):
+            raise VirtualViewException(f"Unknown view mode {view_mode}")
 
-        super().__init__(db_connector, table_name, query)
+        self.virtual_view_query: str = virtual_view_query
+        self.view_mode: str = view_mode
+        self.ttl: float = ttl
+        self.materialized_table: str = f"v_view_{table_name}" if materialized_table is None else materialized_table
+
+        self.__materialized_name: str = None  # name the materialized table is queried by
+        self.__materialized_at: float = None  # time.time() of the last materialization
+        self.__materialize_lock = threading.Lock()
+        self.__cached_states: dict[str, tuple[float, DatabaseTable]] = {}  # query -> (time.time(), state)
 
     def get_state(self, **kwargs) -> DatabaseTable:
         """
@@ -27,5 +61,85 @@ class VirtualViewDatabaseTableStateController(DatabaseTableStateController):
         :param kwargs: arguments to be placed into query.format(**kwargs) before running the query
         :return:
         """
-        self.query = self.query.replace("v_view", f"({self.virtual_view_query}) as v_view")
-        return self.get_state()
+        formatted_query = self.format_query(**kwargs)
+        if self.view_mode != VIEW_MODE_LOCAL:
+            return self.db_connector.execute_sql_query(formatted_query, self.table_name)
+
+        cached = self.__cached_states.get(formatted_query)
+        if cached is not None and not self.__is_expired(cached[0]):
+            return cached[1]
+
+        state = self.db_connector.execute_sql_query(formatted_query, self.table_name)
+        self.__cached_states[formatted_query] = (time.time(), state)
+        return state
+
+    def stream_state(self, chunk_size: int = None, **kwargs) -> Iterator[DatabaseTable]:
+        if self.view_mode == VIEW_MODE_LOCAL:
+            yield self.get_state(**kwargs)
+            return
+        yield from super().stream_state(chunk_size, **kwargs)
+
+    def format_query(self, **kwargs) -> str:
+        """
+        :return: the formatted query with v_view replaced by the view's subquery or its materialized table
+        """
+        formatted_query = self.query.format(**kwargs)
+
+        if self.view_mode == VIEW_MODE_TEMP_TABLE:
+            view = self.materialize()
+        else:
+            view = f"({self.virtual_view_query})"
+
+        return _VIEW_REFERENCE.sub(lambda match: f"{match.group(1)}{match.group(2)}{view} AS v_view", formatted_query)
+
+    def materialize(self, force: bool = False) -> str:
+        """
+        Stores the view in a new table unless it was already stored in this cycle, the previous table is dropped
+        :param force: store it even if it is up to date
+        :return: name under which the materialized table can be queried
+        """
+        with self.__materialize_lock:
+            if force or self.__materialized_name is None or self.__is_expired(self.__materialized_at):
+                self.__drop_materialized()
+                table_name = f"{self.materialized_table}_{uuid.uuid4().hex[:12]}"
+                with measure_stage(STAGE_MATERIALIZE, self.db_connector.get_metrics_label(), self.table_name):
+                    self.__materialized_name = self.db_connector.materialize_query(
+                        self.virtual_view_query, table_name, temporary=self.db_connector.pool is None)
+                self.__materialized_at = time.time()
+
+            return self.__materialized_name
+
+    def commit(self) -> None:
+        """
+        Ends the cycle, the materialized table is dropped and the next state query materializes the view again
+        """
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """
+        Ends the cycle without a commit, the next state query materializes the view again
+        """
+        with self.__materialize_lock:
+            self.__drop_materialized()
+            self.__materialized_at = None
+        self.__cached_states.clear()
+
+    def __drop_materialized(self) -> None:
+        materialized_name, self.__materialized_name = self.__materialized_name, None
+        if materialized_name is None: return
+
+        try:
+            self.db_connector.execute_sql_statement(f"DROP TABLE IF EXISTS {materialized_name}")
+        except Exception as e:
+            # a table left behind does not affect later cycles, which use tables of their own
+            sf.print_to_console(f"Dropping the materialized view {materialized_name} failed:\n{e}")
+
+    def __is_expired(self, created_at: float) -> bool:
+        if created_at is None: return True
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+
+class VirtualViewException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
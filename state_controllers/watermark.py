@@ -0,0 +1,67 @@
+import os
+
+import support_functions as sf
+from data_types.tabular import Tabular
+
+
+class Watermark:
+    def __init__(self, column: str, initial_value=None, filename: str = None, operator: str = ">"):
+        """
+        High-water mark of a monotonically growing column (timestamp, identity, rowversion),
+        used to fetch only the rows past the last synchronised one
+        :param column: name of the column as used in queries and in the fetched header row
+        :param initial_value: value to start from when there is no persisted one, None to start from the beginning
+        :param filename: file the committed value is persisted to and restored from, None to keep it in memory only
+        :param operator: comparison used in the condition. ">=" re-reads rows sharing the mark's value, which
+        protects against rows committed late with an equal timestamp, at the cost of re-comparing them
+        """
+        self.column: str = column
+        self.filename: str = filename
+        self.operator: str = operator
+
+        self.value = initial_value
+        if filename is not None and os.path.exists(filename):
+            self.value = sf.read_object(filename)
+
+        # highest value observed since the last commit
+        self.pending = self.value
+
+    def get_condition(self, placeholder: str) -> tuple[str, list]:
+        """
+        :param placeholder: the driver's placeholder for a bound parameter, see DatabaseConnector.placeholder
+        :return: sql condition selecting the rows past the mark with a placeholder, and the values to bind to it.
+        A condition which is always true and no values if there is no mark yet
+        """
+        if self.value is None: return "1 = 1", []
+        return f"{self.column} {self.operator} {placeholder}", [self.value]
+
+    def observe(self, state: Tabular) -> None:
+        """
+        Raises the pending value to the highest value of the column in state
+        :param state: fetched rows containing the watermark column
+        """
+        if state is None or state.get_row_count() == 0: return
+
+        index = state.get_column_index(self.column)
+        values = [row[index] for row in state.get_table() if row[index] is not None]
+        if len(values) == 0: return
+
+        highest = max(values)
+        if self.pending is None or highest > self.pending:
+            self.pending = highest
+
+    def commit(self) -> None:
+        """
+        Moves the mark to the pending value, to be called once the observed rows have been synchronised
+        """
+        if self.pending == self.value: return
+
+        self.value = self.pending
+        if self.filename is not None:
+            sf.save_object(self.value, self.filename)
+
+    def rollback(self) -> None:
+        """
+        Discards the values observed since the last commit
+        """
+        self.pending = self.value
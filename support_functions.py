@@ -1,4 +1,13 @@
-import json, datetime, os, pickle
+import json, datetime, os, pickle, atexit
+
+from log_writer import LogWriter
+
+# time to keep logs in days
+LOG_TTL = 30146962
+
+# writes the log in the background, see LogWriter. Closed at exit, so that queued messages are written
+LOG_WRITER = LogWriter("log/", retention_days=LOG_TTL)
+atexit.register(LOG_WRITER.close)
 
 def save_object(obj, filename):
     with open(filename, 'w+b') as output:  # Overwrites any existing file.
@@ -9,23 +18,13 @@ def read_object(filename) -> object:
         return pickle.load(inp)
 
 def clear_log():
-    # time to keep logs in days
-    LOG_TTL = 30146962
-
-    today = datetime.date.today()
-    logs = os.listdir("log/")
-    for log in logs:
-        if log[0] == '.': continue
-
-        logtime = log.split(".")[0]
-        logtime = datetime.date.fromisoformat(logtime)
-        if (today - logtime).days > LOG_TTL:
-            os.remove(f"log/{log}")
+    # the log directory is listed once when the writer starts, afterwards only the oldest files are checked
+    LOG_WRITER.start()
+    LOG_WRITER.enforce_retention()
 
 
 def write_to_log(text):
-    with open(f"log/{datetime.date.today()}", "a") as f:
-        f.write(text)
+    LOG_WRITER.write(text)
 
 
 def print_to_console(text):
@@ -0,0 +1,63 @@
+import datetime as dt
+import os
+import tempfile
+from unittest import IsolatedAsyncioTestCase
+from benchmarks.pmecology_stub_server import PmecologyStubServer
+from connectors.async_database_connector import AsyncDatabaseConnector
+from connectors.async_pmecology_rest_api_connector import AsyncPmecologyRestApiConnector
+from connectors.pmecology_rest_api_connector import PmecologyRestApiConnector
+from connectors.sqlite_connector import SQLiteConnector
+from data_sources.async_database_data_source import AsyncDatabaseDataSource
+from state_controllers.async_database_table_state_controller import AsyncDatabaseTableStateController
+from state_controllers.async_pmecology_state_controller import AsyncPmecologyStateController
+
+
+class TestAsyncDatabaseDataSource(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = AsyncDatabaseConnector(SQLiteConnector(os.path.join(self.directory.name, "source.sqlite")))
+        self.target = AsyncDatabaseConnector(SQLiteConnector(os.path.join(self.directory.name, "target.sqlite")))
+
+        for connector, rows in ((self.source, range(100)), (self.target, range(10, 110))):
+            await connector.execute_sql_statement("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+            await connector.execute_sql_statement(
+                "INSERT INTO t VALUES " + ", ".join(f"({i}, 'row {i}')" for i in rows))
+
+    async def asyncTearDown(self):
+        await self.source.disconnect()
+        await self.target.disconnect()
+        self.directory.cleanup()
+
+    def get_data_source(self) -> AsyncDatabaseDataSource:
+        query = "SELECT * FROM t ORDER BY id"
+        return AsyncDatabaseDataSource("t", AsyncDatabaseTableStateController(self.source, "t", query),
+                                       AsyncDatabaseTableStateController(self.target, "t", query), ["id"])
+
+    async def test_synchronize(self):
+        data_source = self.get_data_source()
+
+        self.assertTrue(await data_source.has_change())
+        self.assertEqual(20, await data_source.synchronize(self.target))
+        self.assertFalse(await data_source.has_change())
+
+        source_state = await self.source.execute_sql_query("SELECT * FROM t ORDER BY id", "t")
+        target_state = await self.target.execute_sql_query("SELECT * FROM t ORDER BY id", "t")
+        self.assertEqual(source_state.get_table(), target_state.get_table())
+
+    async def test_stream_state(self):
+        chunks = [chunk async for chunk in
+                  AsyncDatabaseTableStateController(self.source, "t", "SELECT * FROM t ORDER BY id").stream_state(30)]
+
+        self.assertEqual([30, 30, 30, 10], [chunk.get_row_count() for chunk in chunks])
+
+    async def test_pmecology_state(self):
+        with PmecologyStubServer(3, 100) as server:
+            api_connector = PmecologyRestApiConnector(server.key, server.get_api_url())
+            state_controller = AsyncPmecologyStateController(AsyncPmecologyRestApiConnector(api_connector), "p")
+
+            state = await state_controller.get_state(timestamp=dt.datetime(2022, 12, 31), records=100,
+                                                     descending=False)
+            api_connector.close()
+
+        self.assertEqual(20, state.get_row_count())
+        self.assertEqual(["timestamp", "channel_0", "channel_1", "channel_2"], state.get_header_row())
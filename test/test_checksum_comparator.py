@@ -0,0 +1,82 @@
+import os
+import tempfile
+from unittest import TestCase
+from connectors.sqlite_connector import SQLiteConnector
+from data_sources.checksum_comparator import ChecksumComparator
+from data_sources.database_data_source import DatabaseDataSource
+from state_controllers.database_table_state_controller import DatabaseTableStateController
+
+
+class CountingSQLiteConnector(SQLiteConnector):
+    def __init__(self, filename: str):
+        super().__init__(filename)
+        self.checksums = 0
+
+    def get_range_checksum(self, *args, **kwargs) -> tuple:
+        self.checksums += 1
+        return super().get_range_checksum(*args, **kwargs)
+
+
+class TestChecksumComparator(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = CountingSQLiteConnector(os.path.join(self.directory.name, "source.sqlite"))
+        self.target = CountingSQLiteConnector(os.path.join(self.directory.name, "target.sqlite"))
+        for connector in (self.source, self.target):
+            connector.execute_sql_statement("CREATE TABLE t (id INTEGER UNIQUE, name TEXT)")
+            connector.execute_sql_statement(
+                "INSERT INTO t VALUES " + ", ".join(f"({i}, 'row {i}')" for i in range(1000)) + ", (NULL, 'null')")
+
+        self.comparator = ChecksumComparator(self.source, self.target, "t", "t", "id", ["id", "name"],
+                                             partitions=4, leaf_rows=50)
+
+    def tearDown(self):
+        self.source.disconnect()
+        self.target.disconnect()
+        self.directory.cleanup()
+
+    def test_changed_ranges(self):
+        self.assertFalse(self.comparator.has_change())
+        self.assertEqual([], self.comparator.find_changed_ranges())
+
+        self.source.execute_sql_statement("UPDATE t SET name = 'changed' WHERE id IN (10, 700)")
+        self.assertTrue(self.comparator.has_change())
+
+        target_state, source_state = self.comparator.fetch_changed_rows()
+        self.assertLessEqual(source_state.get_row_count(), 100)
+        self.assertIn([10, "changed"], source_state.get_table())
+        self.assertIn([700, "changed"], source_state.get_table())
+        self.assertIn([10, "row 10"], target_state.get_table())
+
+    def test_null_keys(self):
+        # rows with a NULL key are in no fetched range, so they are not reported as a change either
+        self.source.execute_sql_statement("UPDATE t SET name = 'changed' WHERE id IS NULL")
+        self.assertFalse(self.comparator.has_change())
+        self.assertEqual([], self.comparator.find_changed_ranges())
+
+    def test_reuses_has_change(self):
+        self.source.execute_sql_statement("UPDATE t SET name = 'changed' WHERE id = 10")
+
+        self.assertTrue(self.comparator.has_change())
+        self.assertEqual(4, self.source.checksums)
+
+        changed_ranges = self.comparator.find_changed_ranges()
+        bisection = self.source.checksums - 4
+
+        # without a preceding has_change the partitions are compared again
+        checksums = self.source.checksums
+        self.assertEqual(changed_ranges, self.comparator.find_changed_ranges())
+        self.assertEqual(4 + bisection, self.source.checksums - checksums)
+
+    def test_data_source(self):
+        self.target.execute_sql_statement("DELETE FROM t WHERE id = 500")
+        self.source.execute_sql_statement("UPDATE t SET name = 'changed' WHERE id = 20")
+
+        query = "SELECT id, name FROM t ORDER BY id"
+        data_source = DatabaseDataSource("t", DatabaseTableStateController(self.source, "t", query),
+                                         DatabaseTableStateController(self.target, "t", query), ["id"])
+        data_source.checksum_comparator = self.comparator
+
+        self.assertTrue(data_source.has_change())
+        self.assertEqual(2, data_source.synchronize(self.target))
+        self.assertFalse(data_source.has_change())
@@ -0,0 +1,93 @@
+import datetime as dt
+from unittest import TestCase
+from data_types.columnar_tabular import ColumnarTabular, KIND_INT, KIND_FLOAT, KIND_DATETIME, KIND_OBJECT
+from data_types.tabular import TableOverflowException, TableSizeMismatchException
+
+
+class TestColumnarTabular(TestCase):
+    def test_add_row(self):
+        tabular: ColumnarTabular = ColumnarTabular(3)
+
+        tabular.add_row([1, 2.5, dt.datetime(2023, 1, 1, 12, 30)])
+        tabular.add_row([None, 3.5])
+
+        self.assertEqual([[1, 2.5, dt.datetime(2023, 1, 1, 12, 30)], [None, 3.5, None]], tabular.get_table())
+        self.assertEqual([KIND_INT, KIND_FLOAT, KIND_DATETIME], tabular.column_kinds)
+        self.assertEqual(2, tabular.row_count)
+
+        with self.assertRaises(TableSizeMismatchException):
+            tabular.add_row([1, 2, 3, 4])
+
+        with self.assertRaises(TableSizeMismatchException):
+            tabular.add_row([1, 2], pad=False)
+
+    def test_mixed_column(self):
+        tabular: ColumnarTabular = ColumnarTabular(1)
+
+        tabular.append_table([[1], [None], ["a"]])
+
+        self.assertEqual(KIND_OBJECT, tabular.column_kinds[0])
+        self.assertEqual([1, None, "a"], tabular.get_column(0))
+
+    def test_restrict_size(self):
+        tabular: ColumnarTabular = ColumnarTabular(2)
+        tabular.restrict_size(2)
+
+        with self.assertRaises(TableOverflowException):
+            tabular.append_table([[1, 2], [1, 2], [1, 2]])
+
+    def test_get_item(self):
+        tabular: ColumnarTabular = ColumnarTabular(3)
+        tabular.append_table([
+            ["hi", "hello", "yo"],
+            [1, 2, 3],
+            [4, 5, 6]
+        ])
+
+        tabular.set_header_row()
+
+        self.assertEqual([4, 5, 6], tabular[1])
+        self.assertEqual(2, tabular[0, 1])
+        self.assertEqual(5, tabular[1, "hello"])
+
+    def test_discard_row(self):
+        tabular: ColumnarTabular = ColumnarTabular(2, [int, str])
+        tabular.append_table([[1, "a"], [2, "b"], [3, "c"]])
+
+        self.assertEqual([2, "b"], tabular.discard_row(1))
+        self.assertEqual([[1, "a"], [3, "c"]], tabular.get_table())
+        self.assertEqual(2, len(tabular))
+
+    def test_iter_rows(self):
+        tabular: ColumnarTabular = ColumnarTabular(5)
+        rows = [[1, 1.5, True, dt.datetime(2023, 1, 1), "a"],
+                [None, None, None, None, None],
+                [2 ** 63, 2.5, False, dt.datetime(1969, 12, 31, 23, 59), 1]]
+        tabular.append_table(rows)
+
+        self.assertEqual(rows, [list(row) for row in tabular.iter_rows()])
+        self.assertEqual(rows, tabular.get_table())
+        self.assertEqual([], list(ColumnarTabular(2).iter_rows()))
+
+    def test_typed_storage(self):
+        tabular: ColumnarTabular = ColumnarTabular(2, [int, float])
+        tabular.append_table([[i, float(i)] for i in range(1000)])
+
+        self.assertEqual(["q", "d"], [column.typecode for column in tabular.columns])
+        self.assertEqual(list(range(1000)), [row[0] for row in tabular.iter_rows()])
+
+    def test_set_row(self):
+        tabular: ColumnarTabular = ColumnarTabular(4)
+        tabular.append_table([[1, None, 1.5, None], [2, None, 2.5, None]])
+
+        tabular.set_row(0, [None, "a", 3.5, dt.datetime(2024, 1, 1)])
+        tabular.set_row(-1, [2 ** 64, None])
+
+        self.assertEqual([[None, "a", 3.5, dt.datetime(2024, 1, 1)], [2 ** 64, None, None, None]],
+                         tabular.get_table())
+        self.assertEqual([KIND_OBJECT, KIND_OBJECT, KIND_FLOAT, KIND_DATETIME], tabular.column_kinds)
+
+        with self.assertRaises(IndexError):
+            tabular.set_row(2, [1])
+        with self.assertRaises(TableSizeMismatchException):
+            tabular.set_row(0, [1], pad=False)
@@ -0,0 +1,50 @@
+from unittest import TestCase
+from connectors.connection_pool import ConnectionPool, ConnectionPoolException
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class TestConnectionPool(TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool(FakeConnection, lambda connection: connection.closed == 0,
+                                   min_size=1, max_size=2, checkout_timeout=0.01)
+
+    def test_reuse(self):
+        with self.pool.checkout() as first:
+            pass
+        with self.pool.checkout() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(1, self.pool.get_size())
+        self.assertEqual(2, first.rollbacks)
+
+    def test_max_size(self):
+        with self.pool.checkout(), self.pool.checkout():
+            self.assertEqual(2, self.pool.get_size())
+            with self.assertRaises(ConnectionPoolException):
+                self.pool.acquire()
+
+    def test_health_check(self):
+        with self.pool.checkout() as first:
+            first.close()
+        with self.pool.checkout() as second:
+            self.assertIsNot(first, second)
+
+        self.assertEqual(1, self.pool.get_size())
+
+    def test_close(self):
+        self.pool.close()
+
+        with self.assertRaises(ConnectionPoolException):
+            self.pool.acquire()
@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import tempfile
+from unittest import TestCase
+from connectors.database_connector import DatabaseConnector
+from connectors.sqlite_connector import SQLiteConnector
+from data_types.change_set import ChangeSet
+
+
+class FakeNamedCursor:
+    """
+    Behaves like a psycopg2 named cursor, description is None until the first fetch
+    """
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchmany(self, size):
+        self.description = (("id", None), ("name", None))
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+
+    def cursor(self):
+        return FakeNamedCursor([(i, f"row {i}") for i in range(5)])
+
+    def close(self):
+        self.closed = 1
+
+
+class TestDatabaseConnector(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connector = SQLiteConnector(os.path.join(self.directory.name, "db.sqlite"))
+        self.connector.execute_sql_statement("CREATE TABLE t (name TEXT, value INTEGER)")
+        self.connector.execute_sql_statement("INSERT INTO t VALUES ('a', 1), ('a', 1), ('b', NULL), ('c', 3)")
+
+    def tearDown(self):
+        self.connector.disconnect()
+        self.directory.cleanup()
+
+    def get_rows(self) -> list:
+        return sorted(self.connector.execute_sql_query("SELECT * FROM t", "t").get_table(),
+                      key=lambda row: (row[0], row[1] is None, row[1]))
+
+    def test_write_change_set_without_key(self):
+        change_set = ChangeSet("t", ["name", "value"])
+        change_set.deletes.append_table([["a", 1], ["b", None]])
+        change_set.inserts.append_table([["d", None]])
+
+        self.connector.write_change_set(change_set)
+
+        self.assertEqual([["a", 1], ["c", 3], ["d", None]], self.get_rows())
+
+    def test_write_change_set_is_atomic(self):
+        # the upsert fails as there is no unique constraint on name, after the delete and the insert
+        change_set = ChangeSet("t", ["name", "value"], ["name"])
+        change_set.deletes.append_table([["c", 3]])
+        change_set.inserts.append_table([["d", 4]])
+        change_set.updates.append_table([["b", 2]])
+
+        with self.assertRaises(sqlite3.Error):
+            self.connector.write_change_set(change_set, ["name"])
+
+        self.assertEqual([["a", 1], ["a", 1], ["b", None], ["c", 3]], self.get_rows())
+
+    def test_stream_from_named_cursor(self):
+        connector = DatabaseConnector({"user": "fake", "host": "fake", "database": "fake"}, FakeConnection)
+
+        chunks = list(connector.stream_sql_query("SELECT id, name FROM t", "t", 2))
+
+        self.assertEqual([2, 2, 1], [chunk.get_row_count() for chunk in chunks])
+        self.assertEqual(["id", "name"], chunks[0].get_header_row())
@@ -0,0 +1,80 @@
+import datetime as dt
+from unittest import TestCase
+from data_sources.diff_engine import DiffEngine, DiffEngineException
+from data_types.columnar_database_table import ColumnarDatabaseTable
+from data_types.database_table import DatabaseTable
+
+
+class TestDiffEngine(TestCase):
+    def setUp(self):
+        self.target = DatabaseTable("t", ["id", "name"])
+        self.target.append_table([
+            [1, "a"],
+            [2, "b"],
+            [3, "c"]
+        ])
+
+        self.source = DatabaseTable("t", ["id", "name"])
+        self.source.append_table([
+            [1, "a"],
+            [2, "x"],
+            [4, "d"]
+        ])
+
+    def test_diff_by_key(self):
+        change_set = DiffEngine(["id"]).diff(self.target, self.source, "t")
+
+        self.assertEqual([[4, "d"]], change_set.inserts.get_table())
+        self.assertEqual([[2, "x"]], change_set.updates.get_table())
+        self.assertEqual([[3, "c"]], change_set.deletes.get_table())
+
+    def test_diff_by_fingerprint(self):
+        change_set = DiffEngine().diff(self.target, self.source, "t")
+
+        self.assertEqual([[2, "x"], [4, "d"]], change_set.inserts.get_table())
+        self.assertEqual(0, change_set.updates.get_row_count())
+        self.assertEqual([[2, "b"], [3, "c"]], change_set.deletes.get_table())
+
+    def test_diff_chunks(self):
+        first_chunk = DatabaseTable("t", ["id", "name"])
+        first_chunk.add_row([4, "d"])
+        second_chunk = DatabaseTable("t", ["id", "name"])
+        second_chunk.append_table([[1, "a"], [2, "x"]])
+
+        change_set = DiffEngine(["id"]).diff(self.target, iter([first_chunk, second_chunk]), "t")
+
+        self.assertEqual([[4, "d"]], change_set.inserts.get_table())
+        self.assertEqual([[2, "x"]], change_set.updates.get_table())
+        self.assertEqual([[3, "c"]], change_set.deletes.get_table())
+
+    def test_diff_normalized(self):
+        self.source.append_table([[3, "C"]])
+        change_set = DiffEngine(["id"], str.lower).diff(self.target, self.source, "t")
+
+        self.assertEqual(0, change_set.deletes.get_row_count())
+
+    def test_duplicate_key(self):
+        self.target.add_row([1, "z"])
+
+        with self.assertRaises(DiffEngineException):
+            DiffEngine(["id"]).diff(self.target, self.source, "t")
+
+    def test_positional_diff(self):
+        change_set = DiffEngine().positional_diff(self.target, self.source, "t")
+
+        self.assertEqual([[2, "x"], [4, "d"]], change_set.inserts.get_table())
+
+    def test_diff_columnar(self):
+        target = ColumnarDatabaseTable("t", ["id", "name", "modified"])
+        target.append_table([[1, "a", None], [2, "b", dt.datetime(2024, 1, 1)], [3, "c", None]])
+        source = ColumnarDatabaseTable("t", ["id", "name", "modified"])
+        source.append_table([[1, "a", None], [2, "b", dt.datetime(2024, 1, 2)], [4, None, None]])
+
+        change_set = DiffEngine(["id"]).diff(target, source, "t")
+
+        self.assertEqual([[4, None, None]], change_set.inserts.get_table())
+        self.assertEqual([[2, "b", dt.datetime(2024, 1, 2)]], change_set.updates.get_table())
+        self.assertEqual([[3, "c", None]], change_set.deletes.get_table())
+
+        change_set = DiffEngine().positional_diff(target, source, "t")
+        self.assertEqual([[2, "b", dt.datetime(2024, 1, 2)], [4, None, None]], change_set.inserts.get_table())
@@ -0,0 +1,150 @@
+import datetime as dt
+import os
+import tempfile
+from unittest import TestCase
+from connectors.sqlite_connector import SQLiteConnector
+from data_sources.database_data_source import DatabaseDataSource
+from data_sources.target_state_cache import TargetStateCache
+from data_types.database_table import DatabaseTable
+from state_controllers.incremental_database_table_state_controller import IncrementalDatabaseTableStateController
+from state_controllers.watermark import Watermark
+
+
+def rowversion(value: int) -> bytes:
+    return value.to_bytes(8, "big")
+
+
+class TestIncrementalStateController(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = SQLiteConnector(os.path.join(self.directory.name, "source.sqlite"))
+        self.target = SQLiteConnector(os.path.join(self.directory.name, "target.sqlite"))
+        for connector in (self.source, self.target):
+            connector.execute_sql_statement("CREATE TABLE t (id INTEGER PRIMARY KEY, version BLOB, name TEXT)")
+
+        # rowversions above 255 would compare wrongly as integer literals, blobs compare bytewise
+        self.insert(self.source, [(1, 100), (2, 300), (3, 200)])
+
+    def tearDown(self):
+        self.source.disconnect()
+        self.target.disconnect()
+        self.directory.cleanup()
+
+    @staticmethod
+    def insert(connector: SQLiteConnector, rows: list) -> None:
+        table = DatabaseTable("t", ["id", "version", "name"])
+        table.append_table([[row_id, rowversion(version), f"row {row_id}"] for row_id, version in rows])
+        connector.insert_data(table)
+
+    def get_controller(self, connector: SQLiteConnector, watermark: Watermark,
+                       advance_watermark: bool = True) -> IncrementalDatabaseTableStateController:
+        return IncrementalDatabaseTableStateController(
+            connector, "t", "SELECT id, version, name FROM t WHERE {watermark_condition} ORDER BY id",
+            watermark, advance_watermark)
+
+    def test_condition(self):
+        watermark = Watermark("version")
+        self.assertEqual(("1 = 1", []), watermark.get_condition("?"))
+
+        watermark = Watermark("modified", dt.datetime(2024, 1, 1), operator=">=")
+        self.assertEqual(("modified >= %s", [dt.datetime(2024, 1, 1)]), watermark.get_condition("%s"))
+
+    def test_advance_and_commit(self):
+        watermark = Watermark("version")
+        controller = self.get_controller(self.source, watermark)
+
+        self.assertEqual([1, 2, 3], [row[0] for row in controller.get_state().get_table()])
+        self.assertIsNone(watermark.value)
+        self.assertEqual(rowversion(300), watermark.pending)
+
+        # without a commit the same window is fetched again
+        self.assertEqual(3, controller.get_state().get_row_count())
+
+        controller.commit()
+        self.assertEqual(rowversion(300), watermark.value)
+        self.assertEqual(0, controller.get_state().get_row_count())
+
+        self.insert(self.source, [(4, 400), (5, 299)])
+        self.assertEqual([4], [row[0] for row in controller.get_state().get_table()])
+
+    def test_rollback(self):
+        watermark = Watermark("version", rowversion(150))
+        controller = self.get_controller(self.source, watermark)
+
+        self.assertEqual([2, 3], [row[0] for chunk in controller.stream_state(1) for row in chunk.get_table()])
+        self.assertEqual(rowversion(300), watermark.pending)
+
+        watermark.rollback()
+        controller.commit()
+        self.assertEqual(rowversion(150), watermark.value)
+
+    def test_target_does_not_advance(self):
+        watermark = Watermark("version")
+        controller = self.get_controller(self.source, watermark, advance_watermark=False)
+
+        controller.get_state()
+        controller.commit()
+        self.assertIsNone(watermark.value)
+        self.assertIsNone(watermark.pending)
+
+    def test_persistence(self):
+        filename = os.path.join(self.directory.name, "watermark")
+        watermark = Watermark("version", filename=filename)
+        controller = self.get_controller(self.source, watermark)
+        controller.get_state()
+        self.assertFalse(os.path.exists(filename))
+
+        controller.commit()
+        restored = Watermark("version", rowversion(0), filename=filename)
+        self.assertEqual(rowversion(300), restored.value)
+        self.assertEqual(0, self.get_controller(self.source, restored).get_state().get_row_count())
+
+    def test_synchronize(self):
+        watermark = Watermark("version")
+        data_source = DatabaseDataSource("t", self.get_controller(self.source, watermark),
+                                         self.get_controller(self.target, watermark, advance_watermark=False), ["id"])
+
+        self.assertEqual(3, data_source.synchronize(self.target))
+        self.assertEqual(rowversion(300), watermark.value)
+
+        self.insert(self.source, [(4, 400)])
+        self.assertEqual(1, data_source.synchronize(self.target))
+        self.assertEqual(rowversion(400), watermark.value)
+        self.assertEqual(0, data_source.synchronize(self.target))
+
+        rows = self.target.execute_sql_query("SELECT id, version FROM t ORDER BY id", "t").get_table()
+        self.assertEqual([[i, rowversion(v)] for i, v in [(1, 100), (2, 300), (3, 200), (4, 400)]],
+                         [list(row) for row in rows])
+
+    def test_synchronize_with_target_cache(self):
+        watermark = Watermark("version")
+        target_controller = self.get_controller(self.target, watermark, advance_watermark=False)
+        data_source = DatabaseDataSource("t", self.get_controller(self.source, watermark), target_controller, ["id"])
+        data_source.target_cache = TargetStateCache()
+
+        self.assertEqual(3, data_source.synchronize(self.target))
+        self.insert(self.source, [(4, 400)])
+        # the target window moved with the watermark, the cached window of the first cycle must not be diffed
+        self.assertEqual(1, data_source.synchronize(self.target))
+
+        rows = self.target.execute_sql_query("SELECT id FROM t ORDER BY id", "t").get_table()
+        self.assertEqual([1, 2, 3, 4], [row[0] for row in rows])
+
+    def test_params_only_with_watermark(self):
+        queries = []
+        execute_sql_query = self.source.execute_sql_query
+
+        def record(query, table_name, params=None):
+            queries.append((query, params))
+            return execute_sql_query(query, table_name, params)
+
+        self.source.execute_sql_query = record
+        watermark = Watermark("version")
+        controller = IncrementalDatabaseTableStateController(
+            self.source, "t", "SELECT id, version, name FROM t WHERE {watermark_condition} AND name LIKE 'row%'",
+            watermark)
+
+        controller.get_state()
+        controller.commit()
+        controller.get_state()
+        self.assertEqual([None, [rowversion(300)]], [params for _, params in queries])
@@ -0,0 +1,99 @@
+import contextlib
+import datetime
+import gzip
+import io
+import os
+import tempfile
+import threading
+from unittest import TestCase
+from log_writer import LogWriter
+
+
+class TestLogWriter(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read_lines(self) -> list[str]:
+        lines = []
+        for filename in os.listdir(self.directory.name):
+            path = os.path.join(self.directory.name, filename)
+            with (gzip.open(path, "rt") if filename.endswith(".gz") else open(path)) as f:
+                lines += f.read().splitlines()
+        return lines
+
+    def test_rotation(self):
+        log_writer = LogWriter(self.directory.name, max_bytes=1000)
+        messages = [f"message {i}\n" for i in range(500)]
+        for message in messages:
+            log_writer.write(message)
+        log_writer.flush()
+
+        today = str(datetime.date.today())
+        filenames = os.listdir(self.directory.name)
+        self.assertIn(today, filenames)
+        self.assertIn(f"{today}.1.gz", filenames)
+        self.assertCountEqual([message.strip() for message in messages], self.read_lines())
+
+        log_writer.close()
+
+    def test_retention(self):
+        old = datetime.date.today() - datetime.timedelta(days=10)
+        for filename in (str(old), f"{old}.1.gz", ".gitkeep"):
+            with open(os.path.join(self.directory.name, filename), "w") as f:
+                f.write("x")
+
+        log_writer = LogWriter(self.directory.name, retention_days=30)
+        log_writer.write("message\n")
+        log_writer.enforce_retention(5)
+        log_writer.close()
+
+        self.assertCountEqual([str(datetime.date.today()), ".gitkeep"], os.listdir(self.directory.name))
+
+    def test_rotation_counts_bytes(self):
+        log_writer = LogWriter(self.directory.name, max_bytes=1000, compress=False)
+        messages = [f"Übertragung fehlgeschlagen für Zähler {i}\n" for i in range(200)]
+        for message in messages:
+            log_writer.write(message)
+        log_writer.close()
+
+        longest = max(len(message.encode("utf-8")) for message in messages)
+        for filename in os.listdir(self.directory.name):
+            self.assertLess(os.path.getsize(os.path.join(self.directory.name, filename)), 1000 + longest)
+        self.assertCountEqual([message.strip() for message in messages], self.read_lines())
+
+    def test_write_after_close(self):
+        log_writer = LogWriter(self.directory.name)
+        log_writer.write("before\n")
+        log_writer.close()
+        threads = threading.active_count()
+
+        log_writer.write("after\n")
+        log_writer.flush(1)
+        log_writer.close()
+
+        self.assertEqual(threads, threading.active_count())
+        self.assertEqual(["before", "after"], self.read_lines())
+
+    def test_write_error(self):
+        log_writer = LogWriter(self.directory.name, max_bytes=100, compress=False)
+        path = os.path.join(self.directory.name, str(datetime.date.today()))
+        log_writer.write("a" * 60 + "\n")
+        log_writer.flush()
+
+        # rotating the removed file fails, the message goes to stderr and the writer keeps running
+        os.remove(path)
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            log_writer.write("b" * 60 + "\n")
+            log_writer.write("c" * 60 + "\n")
+            log_writer.flush(5)
+            log_writer.write("d" * 60 + "\n")
+            log_writer.flush(5)
+        log_writer.close()
+
+        self.assertIn("failed", stderr.getvalue())
+        self.assertIn("c" * 60, stderr.getvalue())
+        self.assertEqual(["d" * 60], self.read_lines())
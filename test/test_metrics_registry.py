@@ -0,0 +1,41 @@
+from unittest import TestCase
+from metrics.metrics_registry import MetricsRegistry, MetricsException
+
+
+class TestMetricsRegistry(TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        counter = self.registry.counter("rows_total", "Rows", ["table"])
+        counter.inc(2, table="a")
+        counter.inc(table="a")
+
+        self.assertEqual(3, counter.get(table="a"))
+        self.assertIn('rows_total{table="a"} 3\n', self.registry.render())
+
+    def test_histogram(self):
+        histogram = self.registry.histogram("duration_seconds", "Duration", ["stage"], buckets=[1, 5])
+        histogram.observe(0.5, stage="fetch")
+        histogram.observe(3, stage="fetch")
+        histogram.observe(10, stage="fetch")
+
+        rendered = self.registry.render()
+        self.assertIn('duration_seconds_bucket{stage="fetch",le="1"} 1\n', rendered)
+        self.assertIn('duration_seconds_bucket{stage="fetch",le="5"} 2\n', rendered)
+        self.assertIn('duration_seconds_bucket{stage="fetch",le="+Inf"} 3\n', rendered)
+        self.assertIn('duration_seconds_sum{stage="fetch"} 13.5\n', rendered)
+        self.assertIn('duration_seconds_count{stage="fetch"} 3\n', rendered)
+
+    def test_escaped_label(self):
+        self.registry.counter("c", "C", ["table"]).inc(table='a"b')
+
+        self.assertIn('c{table="a\\"b"} 1\n', self.registry.render())
+
+    def test_wrong_labels(self):
+        counter = self.registry.counter("c", "C", ["table"])
+
+        with self.assertRaises(MetricsException):
+            counter.inc(stage="fetch")
+        with self.assertRaises(MetricsException):
+            self.registry.histogram("c", "C", ["table"])
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+from connectors.sqlite_connector import SQLiteConnector
+from state_controllers.partitioned_database_table_state_controller import PartitionedDatabaseTableStateController, \
+    PARTITION_MODE_RANGE, PARTITION_MODE_NTILE
+
+
+class TestPartitionedStateController(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connector = SQLiteConnector(os.path.join(self.directory.name, "test.sqlite"))
+        self.connector.execute_sql_statement("CREATE TABLE t (id INTEGER, name TEXT)")
+        self.connector.execute_sql_statement(
+            "INSERT INTO t VALUES " + ", ".join(f"({i}, 'row {i}')" for i in range(1000)) + ", (NULL, 'null')")
+        self.connector.use_connection_pool(1, 4)
+
+    def tearDown(self):
+        self.connector.disconnect()
+        self.directory.cleanup()
+
+    def get_controller(self, partition_mode: str) -> PartitionedDatabaseTableStateController:
+        return PartitionedDatabaseTableStateController(
+            self.connector, "t", "SELECT * FROM t WHERE {partition_condition} ORDER BY id", "id", 4, partition_mode)
+
+    def test_get_state(self):
+        for partition_mode in (PARTITION_MODE_RANGE, PARTITION_MODE_NTILE):
+            state = self.get_controller(partition_mode).get_state()
+
+            self.assertEqual([None] + list(range(1000)), [row[0] for row in state.get_table()])
+
+    def test_stream_state(self):
+        for partition_mode in (PARTITION_MODE_RANGE, PARTITION_MODE_NTILE):
+            chunks = list(self.get_controller(partition_mode).stream_state(100))
+
+            self.assertEqual([None] + list(range(1000)), [row[0] for chunk in chunks for row in chunk.get_table()])
+            self.assertTrue(all(chunk.get_row_count() <= 100 for chunk in chunks))
+
+    def test_state_key(self):
+        controller = self.get_controller(PARTITION_MODE_RANGE)
+
+        self.assertEqual("SELECT * FROM t WHERE {partition_condition} ORDER BY id", controller.get_state_key())
+        self.connector.execute_sql_statement("INSERT INTO t VALUES (5000, 'row 5000')")
+        self.assertEqual(controller.get_state_key(), self.get_controller(PARTITION_MODE_RANGE).get_state_key())
+
+    def test_key_ranges(self):
+        ranges = self.get_controller(PARTITION_MODE_RANGE).get_key_ranges()
+
+        self.assertEqual(4, len(ranges))
+        self.assertIsNone(ranges[0][0])
+        self.assertIsNone(ranges[-1][1])
+
+    def test_stream_state_with_shared_pool(self):
+        # another user of the pool, e.g. the stream of the other state, holds a connection throughout.
+        # Without a reserved connection a partition fetched ahead can take the last one and the stream hangs
+        self.connector.use_connection_pool(1, 2)
+        controller = self.get_controller(PARTITION_MODE_RANGE)
+        controller.partitions = 8
+        controller.buffered_chunks = 1
+
+        for _ in range(10):
+            rows = []
+
+            def consume():
+                with self.connector.checkout():
+                    rows.extend(row[0] for chunk in controller.stream_state(10) for row in chunk.get_table())
+
+            consumer = threading.Thread(target=consume, daemon=True)
+            consumer.start()
+            consumer.join(10)
+
+            self.assertFalse(consumer.is_alive())
+            self.assertEqual([None] + list(range(1000)), rows)
@@ -0,0 +1,48 @@
+import datetime as dt
+import os
+import tempfile
+from unittest import TestCase
+from benchmarks.pmecology_stub_server import PmecologyStubServer
+from connectors.pmecology_rest_api_connector import PmecologyRestApiConnector
+from data_sources.pmecology_backfill import PmecologyBackfill
+
+
+class TestPmecologyBackfill(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.server = PmecologyStubServer(3, 3000)
+        self.server.start()
+        self.connector = PmecologyRestApiConnector(self.server.key, self.server.get_api_url())
+
+    def tearDown(self):
+        self.connector.close()
+        self.server.stop()
+        self.directory.cleanup()
+
+    def get_backfill(self, checkpoint_filename: str = None) -> PmecologyBackfill:
+        return PmecologyBackfill(self.connector, "t", window=dt.timedelta(hours=3), workers=4, page_size=50,
+                                 checkpoint_filename=checkpoint_filename)
+
+    def test_run(self):
+        tables = []
+        rows = self.get_backfill().run(tables.append)
+
+        expected = [t for t in self.server.timestamps if t.minute % 5 == 0]
+        self.assertEqual(len(expected), rows)
+        self.assertEqual(expected, [row[0] for table in tables for row in table.get_table()])
+
+    def test_resume(self):
+        checkpoint_filename = os.path.join(self.directory.name, "checkpoint")
+        tables = []
+
+        stream = self.get_backfill(checkpoint_filename).stream()
+        for _ in range(5):
+            tables.append(next(stream))
+        stream.close()
+        # the last table was not acknowledged by requesting the next one, so it is fetched again
+        tables.pop()
+
+        self.get_backfill(checkpoint_filename).run(tables.append)
+
+        expected = [t for t in self.server.timestamps if t.minute % 5 == 0]
+        self.assertEqual(expected, [row[0] for table in tables for row in table.get_table()])
@@ -0,0 +1,42 @@
+import datetime as dt
+import time
+from unittest import TestCase
+from benchmarks.pmecology_stub_server import PmecologyStubServer
+from connectors.pmecology_rest_api_connector import PmecologyRestApiConnector
+
+
+class TestPmecologyRestApiConnector(TestCase):
+    def setUp(self):
+        self.server = PmecologyStubServer(3, 100)
+        self.server.start()
+        self.connector = PmecologyRestApiConnector(self.server.key, self.server.get_api_url(), metadata_ttl=0.2)
+
+    def tearDown(self):
+        self.connector.close()
+        self.server.stop()
+
+    def test_metadata_cache(self):
+        request_count = self.server.request_count
+        self.connector.get_first_recorded_timestamp()
+        self.connector.get_channels_data()
+        self.assertEqual(request_count, self.server.request_count)
+
+        time.sleep(0.3)
+        self.connector.get_last_recorded_timestamp()
+        self.assertEqual(request_count + 1, self.server.request_count)
+
+    def test_sensor_data(self):
+        table = self.connector.get_sensor_data("p", dt.datetime(2022, 12, 31), 10, False)
+
+        self.assertEqual(["timestamp", "channel_0", "channel_1", "channel_2"], table.get_header_row())
+        self.assertEqual(self.server.history[0]["values"]["1"], table[0, "channel_1"])
+
+    def test_unknown_channel(self):
+        self.server.channels["3"] = {"name": "channel_3", "unit": "-"}
+        for data_point in self.server.history:
+            data_point["values"]["3"] = 1.0
+
+        table = self.connector.get_sensor_data("p", dt.datetime(2022, 12, 31), 10, False)
+
+        self.assertEqual("channel_3", table.get_header_row()[-1])
+        self.assertEqual(1.0, table[0, "channel_3"])
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+from unittest import TestCase
+from resilience.backoff import ExponentialBackoff
+from resilience.circuit_breaker import CIRCUIT_HALF_OPEN
+from resilience.retry_policy import RetryPolicy, RetryException, CircuitOpenException, retry_scope
+
+
+class TestRetryPolicy(TestCase):
+    def setUp(self):
+        self.policy = RetryPolicy(ExponentialBackoff(0.001, 0.01), retryable=lambda e: isinstance(e, IOError),
+                                  failure_threshold=3, reset_timeout=60)
+        self.calls = 0
+
+    def fail_times(self, failures: int):
+        def func():
+            self.calls += 1
+            if self.calls <= failures:
+                raise IOError("unavailable")
+            return "ok"
+        return func
+
+    def test_retry(self):
+        self.assertEqual("ok", self.policy.call(self.fail_times(2), "endpoint"))
+        self.assertEqual(3, self.calls)
+
+    def test_not_retryable(self):
+        def func():
+            self.calls += 1
+            raise KeyError("bad request")
+
+        with self.assertRaises(KeyError):
+            self.policy.call(func, "endpoint")
+        self.assertEqual(1, self.calls)
+
+    def test_circuit_breaker(self):
+        with self.assertRaises(RetryException) as context:
+            self.policy.call(self.fail_times(10), "endpoint")
+        self.assertEqual(3, self.calls)
+        self.assertGreater(context.exception.retry_after, 50)
+
+        with self.assertRaises(CircuitOpenException):
+            self.policy.call(self.fail_times(0), "endpoint")
+        self.assertEqual("ok", self.policy.call(self.fail_times(0), "other endpoint"))
+
+    def test_retry_scope(self):
+        with retry_scope(max_wait=0), self.assertRaises(RetryException) as context:
+            self.policy.call(self.fail_times(1), "endpoint")
+
+        self.assertEqual(1, self.calls)
+        self.assertIsNotNone(context.exception.retry_after)
+
+    def test_call_async(self):
+        async def func():
+            return self.fail_times(2)()
+
+        self.assertEqual("ok", asyncio.run(self.policy.call_async(func, "endpoint")))
+        self.assertEqual(3, self.calls)
+
+    def test_half_open(self):
+        circuit_breaker = self.policy.get_circuit_breaker("endpoint")
+        circuit_breaker.reset_timeout = 0.01
+        circuit_breaker.half_open_retry_after = 0.005
+        for _ in range(3):
+            circuit_breaker.record_failure()
+        time.sleep(0.02)
+
+        # a trial request is running
+        self.assertTrue(circuit_breaker.allow())
+        self.assertEqual(CIRCUIT_HALF_OPEN, circuit_breaker.get_state())
+        with retry_scope(max_wait=0), self.assertRaises(CircuitOpenException) as context:
+            self.policy.call(self.fail_times(0), "endpoint")
+        self.assertGreater(context.exception.retry_after, 0)
+
+        # without a scope the call waits for the outcome of the trial
+        threading.Timer(0.05, circuit_breaker.record_success).start()
+        self.calls = 0
+        self.assertEqual("ok", self.policy.call(self.fail_times(0), "endpoint"))
+        self.assertEqual(1, self.calls)
@@ -0,0 +1,73 @@
+import random
+from unittest import TestCase
+from data_sources.diff_engine import DiffEngine, DiffEngineException
+from data_sources.sorted_merge_diff_engine import SortedMergeDiffEngine
+from data_sources.string_normalizer import StringNormalizer
+from data_types.database_table import DatabaseTable
+from unidecode import unidecode
+
+
+class TestSortedMergeDiffEngine(TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        target_rows = [[i, rng.choice("abc")] for i in range(0, 300, 2)]
+        source_rows = [[i, rng.choice("abc")] for i in range(0, 300, 3)]
+
+        self.target = DatabaseTable("t", ["id", "name"])
+        self.target.append_table(target_rows)
+        self.source = DatabaseTable("t", ["id", "name"])
+        self.source.append_table(source_rows)
+
+    def assertSameChangeSet(self, expected, actual):
+        self.assertEqual(sorted(expected.inserts.get_table()), sorted(actual.inserts.get_table()))
+        self.assertEqual(sorted(expected.updates.get_table()), sorted(actual.updates.get_table()))
+        self.assertEqual(sorted(expected.deletes.get_table()), sorted(actual.deletes.get_table()))
+
+    def test_same_as_hash_diff(self):
+        expected = DiffEngine(["id"]).diff(self.target, self.source, "t")
+        actual = SortedMergeDiffEngine(["id"]).diff(self.target, self.source, "t")
+
+        self.assertSameChangeSet(expected, actual)
+
+    def test_same_as_hash_diff_by_fingerprint(self):
+        self.target.table.sort()
+        self.source.table.sort()
+        expected = DiffEngine().diff(self.target, self.source, "t")
+        actual = SortedMergeDiffEngine().diff(self.target, self.source, "t")
+
+        self.assertSameChangeSet(expected, actual)
+
+    def test_spilled_sort(self):
+        random.Random(1).shuffle(self.target.table)
+        random.Random(2).shuffle(self.source.table)
+        expected = DiffEngine(["id"]).diff(self.target, self.source, "t")
+        actual = SortedMergeDiffEngine(["id"], presorted=False, spill_run_size=16).diff(self.target, self.source, "t")
+
+        self.assertSameChangeSet(expected, actual)
+
+    def test_chunks(self):
+        chunks = list(SortedMergeDiffEngine(["id"], change_chunk_size=10).diff_chunks(self.target, self.source, "t"))
+
+        self.assertTrue(all(chunk.get_row_count() <= 10 for chunk in chunks))
+        self.assertEqual(DiffEngine(["id"]).diff(self.target, self.source, "t").get_row_count(),
+                         sum(chunk.get_row_count() for chunk in chunks))
+
+    def test_unsorted(self):
+        self.source.table.reverse()
+
+        with self.assertRaises(DiffEngineException):
+            SortedMergeDiffEngine(["id"]).diff(self.target, self.source, "t")
+
+    def test_non_ascii_keys(self):
+        # ordered by code point (COLLATE "C"), 'ł' would sort before 'm' after normalization to 'l'
+        rows = [["k", 1], ["m", 2], ["ł", 3]]
+        target = DatabaseTable("t", ["name", "value"])
+        target.append_table([list(row) for row in rows])
+        source = DatabaseTable("t", ["name", "value"])
+        source.append_table([["k", 1], ["m", 2], ["ł", 4]])
+        engine = SortedMergeDiffEngine(["name"], normalize=StringNormalizer(unidecode))
+
+        self.assertTrue(engine.diff(target, target, "t").is_empty())
+        change_set = engine.diff(target, source, "t")
+        self.assertEqual([["ł", 4]], change_set.updates.get_table())
+        self.assertEqual(0, change_set.inserts.get_row_count() + change_set.deletes.get_row_count())
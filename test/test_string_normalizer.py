@@ -0,0 +1,67 @@
+from unittest import TestCase
+from data_sources.diff_engine import DiffEngine
+from data_sources.string_normalizer import StringNormalizer
+from data_types.database_table import DatabaseTable
+from unidecode import unidecode
+
+
+class TestStringNormalizer(TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def counting_normalize(self, value: str) -> str:
+        self.calls.append(value)
+        return unidecode(value)
+
+    def test_column_caches(self):
+        normalizer = StringNormalizer(self.counting_normalize)
+        first, second = normalizer.for_column(0), normalizer.for_column(1)
+
+        self.assertIs(first, normalizer.for_column(0))
+        self.assertEqual("Zurich", first("Zürich"))
+        self.assertEqual("Zurich", first("Zürich"))
+        self.assertEqual("Zurich", second("Zürich"))
+        self.assertEqual("Zurich", normalizer("Zürich"))
+
+        # every column keeps its own cache
+        self.assertEqual(["Zürich"] * 3, self.calls)
+        self.assertEqual({0: (1, 1), 1: (0, 1), -1: (0, 1)},
+                         {column: (info.hits, info.misses) for column, info in normalizer.get_cache_info().items()})
+
+        normalizer.clear()
+        self.assertEqual({}, normalizer.get_cache_info())
+
+    def test_cache_size(self):
+        normalizer = StringNormalizer(self.counting_normalize, cache_size=2)
+        normalize = normalizer.for_column(0)
+
+        for value in ["a", "b", "a", "c", "a", "b"]:
+            normalize(value)
+
+        # "b" is evicted by "c" as the least recently used value and normalized again
+        self.assertEqual(["a", "b", "c", "b"], self.calls)
+        info = normalizer.get_cache_info()[0]
+        self.assertEqual((2, 2), (info.maxsize, info.currsize))
+
+        unbounded = StringNormalizer(self.counting_normalize, cache_size=None).for_column(0)
+        for i in range(1000):
+            unbounded(str(i))
+        self.assertEqual(1000, unbounded.cache_info().currsize)
+
+    def test_diff_normalizes_distinct_values_once(self):
+        header = ["id", "city", "country"]
+        cities = ["Zürich", "Genève", "Besançon", "Kraków"]
+        target = DatabaseTable("t", header)
+        target.append_table([[i, cities[i % 4], "Österreich"] for i in range(1000)])
+        source = DatabaseTable("t", header)
+        source.append_table([[i, cities[(i + (i == 7)) % 4], "Österreich"] for i in range(1000)])
+
+        change_set = DiffEngine(["id"], self.counting_normalize).diff(target, source, "t")
+        self.assertEqual(1, change_set.updates.get_row_count())
+        self.assertEqual(4000, len(self.calls))
+
+        self.calls.clear()
+        change_set = DiffEngine(["id"], StringNormalizer(self.counting_normalize)).diff(target, source, "t")
+        self.assertEqual(1, change_set.updates.get_row_count())
+        # one call per distinct value and column instead of one per value
+        self.assertEqual(len(cities) + 1, len(self.calls))
@@ -0,0 +1,207 @@
+import threading
+import time
+from unittest import TestCase
+from data_sources.database_data_source import DatabaseDataSource
+from resilience.backoff import ExponentialBackoff
+from resilience.retry_policy import RetryException
+from schedulers.sync_job import SyncJob
+from schedulers.sync_scheduler import SyncScheduler, SyncSchedulerException
+from state_controllers.database_table_state_controller import DatabaseTableStateController
+
+
+class TestSyncScheduler(TestCase):
+    def setUp(self):
+        self.scheduler = SyncScheduler(max_workers=4)
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def wait_for(self, condition, timeout: float = 5) -> None:
+        deadline = time.time() + timeout
+        while not condition():
+            if time.time() > deadline:
+                self.fail("Timed out waiting for the scheduler")
+            time.sleep(0.005)
+
+    def get_stats(self, name: str):
+        return self.scheduler.get_stats()[name]
+
+    def test_interval(self):
+        self.scheduler.add_job(SyncJob("job", lambda: 5, interval=60))
+        first_due = self.get_stats("job").next_run
+        self.scheduler.start()
+
+        self.wait_for(lambda: self.get_stats("job").runs == 1)
+        stats = self.get_stats("job")
+        self.assertEqual(first_due + 60, stats.next_run)
+        self.assertEqual(5, stats.last_rows)
+        self.assertEqual(5, stats.total_rows)
+        self.assertFalse(stats.running)
+
+        with self.assertRaises(SyncSchedulerException):
+            self.scheduler.add_job(SyncJob("job", lambda: 0, interval=60))
+
+    def test_repeated_runs(self):
+        self.scheduler.add_job(SyncJob("job", lambda: 1, interval=0.01))
+        self.scheduler.start()
+
+        self.wait_for(lambda: self.get_stats("job").runs >= 3)
+        self.assertEqual(0, self.get_stats("job").failures)
+
+    def test_connector_limit(self):
+        connector = object()
+        release = threading.Event()
+        started = []
+
+        def blocking(name):
+            def sync():
+                started.append(name)
+                release.wait(5)
+                return 0
+            return sync
+
+        self.scheduler.set_connector_limit(connector, 1)
+        self.scheduler.add_job(SyncJob("first", blocking("first"), interval=60, connectors=[connector]))
+        self.scheduler.add_job(SyncJob("second", blocking("second"), interval=60, connectors=[connector]),
+                               start_delay=0.01)
+        self.scheduler.add_job(SyncJob("other", lambda: 0, interval=60))
+        self.scheduler.start()
+
+        self.wait_for(lambda: self.scheduler.get_backlog() == ["second"])
+        self.wait_for(lambda: self.get_stats("other").runs == 1)
+        self.assertEqual(["first"], started)
+        self.assertTrue(self.get_stats("first").running)
+
+        release.set()
+        self.wait_for(lambda: self.get_stats("second").runs == 1)
+        self.assertEqual(["first", "second"], started)
+        self.assertEqual([], self.scheduler.get_backlog())
+
+    def test_failures(self):
+        outcomes = [ValueError("first"), ValueError("second"), 3]
+
+        def sync():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        self.scheduler.add_job(SyncJob("job", sync, interval=0.01))
+        self.scheduler.start()
+
+        self.wait_for(lambda: self.get_stats("job").runs == 2)
+        stats = self.get_stats("job")
+        self.assertEqual(2, stats.failures)
+        self.assertEqual(2, stats.consecutive_failures)
+        self.assertEqual("second", str(stats.last_error))
+        self.assertIsNone(stats.last_rows)
+
+        self.wait_for(lambda: self.get_stats("job").runs == 3)
+        stats = self.get_stats("job")
+        self.assertEqual(2, stats.failures)
+        self.assertEqual(0, stats.consecutive_failures)
+        self.assertEqual(3, stats.total_rows)
+        self.scheduler.remove_job("job")
+
+    def test_remove_waiting_job(self):
+        connector = object()
+        release = threading.Event()
+        started = []
+
+        def blocking():
+            started.append("blocking")
+            release.wait(5)
+            return 0
+
+        def removed():
+            started.append("removed")
+            return 0
+
+        self.scheduler.set_connector_limit(connector, 1)
+        self.scheduler.add_job(SyncJob("blocking", blocking, interval=60, connectors=[connector]))
+        self.scheduler.add_job(SyncJob("removed", removed, interval=60, connectors=[connector]), start_delay=0.01)
+        self.scheduler.start()
+
+        self.wait_for(lambda: self.scheduler.get_backlog() == ["removed"])
+        self.scheduler.remove_job("removed")
+        self.assertEqual([], self.scheduler.get_backlog())
+
+        release.set()
+        self.wait_for(lambda: self.get_stats("blocking").runs == 1)
+        self.scheduler.stop()
+        self.assertEqual(["blocking"], started)
+
+    def test_remove_running_job(self):
+        running, release = threading.Event(), threading.Event()
+        calls = []
+
+        def sync():
+            calls.append("old")
+            running.set()
+            release.wait(5)
+            return 0
+
+        self.scheduler.add_job(SyncJob("job", sync, interval=0.01))
+        self.scheduler.start()
+        self.assertTrue(running.wait(5))
+
+        self.scheduler.remove_job("job")
+        self.assertNotIn("job", self.scheduler.get_stats())
+
+        # a job added under the same name is not affected by the run of the removed one
+        self.scheduler.add_job(SyncJob("job", lambda: 7, interval=60))
+        self.wait_for(lambda: self.get_stats("job").runs == 1)
+        next_run = self.get_stats("job").next_run
+
+        release.set()
+        time.sleep(0.05)
+        stats = self.get_stats("job")
+        self.assertEqual((1, 7, next_run, False), (stats.runs, stats.last_rows, stats.next_run, stats.running))
+        self.assertEqual(["old"], calls)
+        self.assertEqual([], self.scheduler.get_backlog())
+
+    def test_backoff(self):
+        def sync():
+            raise ValueError("unavailable")
+
+        backoff = ExponentialBackoff(initial_delay=30, max_delay=120, jitter=False)
+        self.scheduler.add_job(SyncJob("job", sync, interval=0.01, backoff=backoff))
+        self.scheduler.start()
+
+        self.wait_for(lambda: self.get_stats("job").runs == 1)
+        stats = self.get_stats("job")
+        self.assertGreaterEqual(stats.next_run, stats.last_started + 30)
+        self.assertLess(stats.next_run, stats.last_started + 31)
+
+    def test_retry_after(self):
+        def sync():
+            raise RetryException("circuit open", retry_after=30)
+
+        self.scheduler.add_job(SyncJob("job", sync, interval=0.01))
+        self.scheduler.start()
+
+        self.wait_for(lambda: self.get_stats("job").runs == 1)
+        stats = self.get_stats("job")
+        self.assertEqual(1, stats.consecutive_failures)
+        self.assertGreaterEqual(stats.next_run, stats.last_started + 30)
+
+    def test_retry_after_longer_than_backoff(self):
+        def sync():
+            raise RetryException("circuit open", retry_after=60)
+
+        backoff = ExponentialBackoff(initial_delay=10, max_delay=120, jitter=False)
+        self.scheduler.add_job(SyncJob("job", sync, interval=0.01, backoff=backoff))
+        self.scheduler.start()
+
+        self.wait_for(lambda: self.get_stats("job").runs == 1)
+        stats = self.get_stats("job")
+        self.assertGreaterEqual(stats.next_run, stats.last_started + 60)
+
+    def test_from_data_source(self):
+        source, target = object(), object()
+        data_source = DatabaseDataSource("t", DatabaseTableStateController(source, "t", "SELECT * FROM t"),
+                                         DatabaseTableStateController(target, "t", "SELECT * FROM t"))
+
+        job = SyncJob.from_data_source("t", data_source, target, interval=60)
+        self.assertEqual((target, source), job.connectors)
+        self.assertEqual((target,), SyncJob.from_data_source("t", data_source, target, 60, [target]).connectors)
@@ -122,3 +122,32 @@ class TestTabular(TestCase):
         self.assertEqual(["uno", "dos", "tres"], tabular[1])
         self.assertEqual(2, tabular[0, 1])
         self.assertEqual("dos", tabular[1, "hello"])
+
+    def test_discard_row(self):
+        tabular: Tabular = Tabular(2)
+        tabular.append_table([[i, i % 3] for i in range(10)])
+
+        self.assertEqual([0, 0], tabular.discard_top_row())
+        self.assertEqual([5, 2], tabular.discard_row(4))
+        self.assertEqual([9, 0], tabular.discard_row(-1))
+
+        self.assertEqual(7, tabular.row_count)
+        self.assertEqual([6, 0], tabular[4])
+        self.assertEqual([[1, 1], [2, 2], [3, 0], [4, 1], [6, 0], [7, 1], [8, 2]], tabular.table)
+
+    def test_find_rows(self):
+        tabular: Tabular = Tabular(2)
+        tabular.set_header_row(["id", "group"])
+        tabular.append_table([[i, i % 3] for i in range(10)])
+
+        unindexed = tabular.find_rows("group", 1)
+        tabular.create_index("group")
+        tabular.discard_row(1)
+        tabular.add_row([10, 1])
+
+        self.assertEqual([[1, 1], [4, 1], [7, 1]], unindexed)
+        self.assertEqual([[4, 1], [7, 1], [10, 1]], tabular.find_rows("group", 1))
+        self.assertEqual([[7, 1]], tabular.find_rows(["id", "group"], (7, 1)))
+
+        with self.assertRaises(TabularDataException):
+            tabular.create_index("missing")
@@ -0,0 +1,120 @@
+import os
+import tempfile
+from unittest import TestCase
+from connectors.sqlite_connector import SQLiteConnector
+from data_sources.database_data_source import DatabaseDataSource
+from data_sources.target_state_cache import TargetStateCache
+from data_types.change_set import ChangeSet
+from data_types.columnar_database_table import ColumnarDatabaseTable
+from data_types.database_table import DatabaseTable
+from state_controllers.database_table_state_controller import DatabaseTableStateController
+
+
+class CountingStateController(DatabaseTableStateController):
+    def __init__(self, db_connector, table_name: str, query: str):
+        super().__init__(db_connector, table_name, query)
+        self.calls = 0
+
+    def get_state(self, **kwargs) -> DatabaseTable:
+        self.calls += 1
+        return super().get_state(**kwargs)
+
+
+class TestTargetStateCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @staticmethod
+    def make_table(rows: list) -> DatabaseTable:
+        table = DatabaseTable("t", ["id", "name"])
+        table.append_table(rows)
+        return table
+
+    def test_apply(self):
+        cache = TargetStateCache()
+        cache.put({}, self.make_table([[1, "a"], [2, "b"], [3, "c"]]))
+
+        change_set = ChangeSet("t", ["id", "name"], ["id"])
+        change_set.deletes.append_table([[1, "a"]])
+        change_set.updates.append_table([[3, "x"]])
+        change_set.inserts.append_table([[4, "d"]])
+        cache.apply(change_set)
+        cache.apply(self.make_table([[2, "y"]]), ["id"])
+
+        self.assertEqual([[2, "y"], [3, "x"], [4, "d"]], sorted(cache.get({}).get_table()))
+
+    def test_apply_without_key(self):
+        cache = TargetStateCache()
+        cache.put({}, self.make_table([[1, "a"], [1, "a"], [2, None]]))
+
+        change_set = ChangeSet("t", ["id", "name"])
+        change_set.deletes.append_table([[1, "a"], [2, None]])
+        change_set.inserts.append_table([[3, "c"]])
+        cache.apply(change_set)
+
+        self.assertEqual([[1, "a"], [3, "c"]], sorted(cache.get({}).get_table()))
+
+    def test_apply_columnar(self):
+        filename = os.path.join(self.directory.name, "cache.pkl")
+        state = ColumnarDatabaseTable("t", ["id", "name"])
+        state.append_table([[i, str(i)] for i in range(5)])
+        cache = TargetStateCache(filename=filename)
+        cache.put({}, state)
+
+        change_set = ChangeSet("t", ["id", "name"], ["id"])
+        change_set.deletes.append_table([[0, "0"], [2, "2"]])
+        change_set.updates.append_table([[3, None]])
+        change_set.inserts.append_table([[5, "5"]])
+        cache.apply(change_set)
+
+        expected = [[1, "1"], [3, None], [4, "4"], [5, "5"]]
+        self.assertEqual(expected, sorted(cache.get({}).get_table()))
+        self.assertEqual(expected, sorted(TargetStateCache(filename=filename).get({}).get_table()))
+
+    def test_persistence(self):
+        filename = os.path.join(self.directory.name, "cache.pkl")
+        cache = TargetStateCache(filename=filename)
+        cache.put({"a": 1}, self.make_table([[i, str(i)] for i in range(10)]))
+        for i in range(5):
+            cache.apply(self.make_table([[i, "changed"]]), ["id"])
+        self.assertTrue(os.path.exists(filename + ".journal"))
+
+        restored = TargetStateCache(filename=filename)
+        self.assertEqual(cache.get_etag(), restored.get_etag())
+        self.assertEqual(sorted(cache.get({"a": 1}).get_table()), sorted(restored.get({"a": 1}).get_table()))
+
+        # the journal is folded into the file once it holds more rows than the state
+        for i in range(6):
+            restored.apply(self.make_table([[i, "changed again"]]), ["id"])
+        self.assertFalse(os.path.exists(filename + ".journal"))
+        self.assertEqual(sorted(restored.get({"a": 1}).get_table()),
+                         sorted(TargetStateCache(filename=filename).get({"a": 1}).get_table()))
+
+    def test_data_source(self):
+        source = SQLiteConnector(os.path.join(self.directory.name, "source.sqlite"))
+        target = SQLiteConnector(os.path.join(self.directory.name, "target.sqlite"))
+        for connector, rows in ((source, range(0, 50)), (target, range(10, 60))):
+            connector.execute_sql_statement("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+            connector.execute_sql_statement("INSERT INTO t VALUES " + ", ".join(f"({i}, 'row {i}')" for i in rows))
+
+        source_controller = CountingStateController(source, "t", "SELECT * FROM t")
+        target_controller = CountingStateController(target, "t", "SELECT * FROM t")
+        data_source = DatabaseDataSource("t", source_controller, target_controller, ["id"])
+        data_source.target_cache = TargetStateCache()
+
+        # get_change reuses the change set computed by has_change
+        self.assertTrue(data_source.has_change())
+        self.assertEqual(10, data_source.get_change().get_row_count())
+        self.assertEqual((1, 1), (source_controller.calls, target_controller.calls))
+
+        self.assertEqual(20, data_source.synchronize(target))
+        self.assertFalse(data_source.has_change())
+        self.assertEqual(1, target_controller.calls)
+        self.assertEqual(sorted(target.execute_sql_query("SELECT * FROM t", "t").get_table()),
+                         sorted(data_source.target_cache.get(target_controller.get_state_key()).get_table()))
+
+        source.disconnect()
+        target.disconnect()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+from unittest import TestCase
+from connectors.sqlite_connector import SQLiteConnector
+from data_sources.database_data_source import DatabaseDataSource
+from state_controllers.database_table_state_controller import DatabaseTableStateController
+from state_controllers.virtual_view_database_table_state_controller import VirtualViewDatabaseTableStateController, \
+    VIEW_MODE_INLINE, VIEW_MODE_TEMP_TABLE, VIEW_MODE_LOCAL
+
+
+class TestVirtualViewStateController(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connector = SQLiteConnector(os.path.join(self.directory.name, "test.sqlite"))
+        self.connector.execute_sql_statement("CREATE TABLE t (id INTEGER, name TEXT)")
+        self.connector.execute_sql_statement(
+            "INSERT INTO t VALUES " + ", ".join(f"({i}, 'row {i}')" for i in range(10)))
+
+    def tearDown(self):
+        self.connector.disconnect()
+        self.directory.cleanup()
+
+    def get_controller(self, view_mode: str) -> VirtualViewDatabaseTableStateController:
+        return VirtualViewDatabaseTableStateController(self.connector, "t", "SELECT * FROM v_view ORDER BY id",
+                                                       "SELECT id, name FROM t WHERE id % 2 = 0", view_mode)
+
+    def get_view_tables(self) -> list[str]:
+        return [row[0] for row in self.connector.execute_sql_query(
+            "SELECT name FROM sqlite_master WHERE name LIKE 'v_view_%'", "tables").get_table()]
+
+    def test_view_modes(self):
+        for use_pool in (False, True):
+            if use_pool:
+                self.connector.use_connection_pool(1, 2)
+            for view_mode in (VIEW_MODE_INLINE, VIEW_MODE_TEMP_TABLE, VIEW_MODE_LOCAL):
+                controller = self.get_controller(view_mode)
+
+                state = controller.get_state()
+                self.assertEqual([0, 2, 4, 6, 8], [row[0] for row in state.get_table()], view_mode)
+                self.assertEqual(5, sum(chunk.get_row_count() for chunk in controller.stream_state(2)))
+                controller.commit()
+
+    def test_materialized_once_per_cycle(self):
+        self.connector.use_connection_pool(1, 2)
+        controller = self.get_controller(VIEW_MODE_TEMP_TABLE)
+        other_controller = self.get_controller(VIEW_MODE_TEMP_TABLE)
+
+        controller.get_state()
+        self.connector.execute_sql_statement("INSERT INTO t VALUES (100, 'row 100')")
+        # the view stored at the start of the cycle is read again, other controllers use tables of their own
+        self.assertEqual(5, controller.get_state().get_row_count())
+        self.assertEqual(6, other_controller.get_state().get_row_count())
+        self.assertEqual(2, len(self.get_view_tables()))
+
+        controller.commit()
+        other_controller.commit()
+        self.assertEqual([], self.get_view_tables())
+        self.assertEqual(6, controller.get_state().get_row_count())
+
+    def test_local_cache(self):
+        controller = self.get_controller(VIEW_MODE_LOCAL)
+
+        controller.get_state()
+        self.connector.execute_sql_statement("INSERT INTO t VALUES (100, 'row 100')")
+        self.assertEqual(5, controller.get_state().get_row_count())
+
+        controller.commit()
+        self.assertEqual(6, controller.get_state().get_row_count())
+
+    def test_polls_without_change(self):
+        target = SQLiteConnector(os.path.join(self.directory.name, "target.sqlite"))
+        target.execute_sql_statement("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+        target.execute_sql_statement("INSERT INTO t VALUES " + ", ".join(f"({i}, 'row {i}')" for i in range(0, 10, 2)))
+        target_controller = DatabaseTableStateController(target, "t", "SELECT id, name FROM t ORDER BY id")
+
+        for new_id, view_mode in ((20, VIEW_MODE_TEMP_TABLE), (22, VIEW_MODE_LOCAL)):
+            data_source = DatabaseDataSource("t", self.get_controller(view_mode), target_controller, ["id"])
+            self.assertFalse(data_source.has_change(), view_mode)
+
+            # a poll which finds nothing to write ends the cycle as well, the next poll sees the new row
+            self.connector.execute_sql_statement(f"INSERT INTO t VALUES ({new_id}, 'row {new_id}')")
+            self.assertTrue(data_source.has_change(), view_mode)
+            self.assertEqual(1, data_source.synchronize(target))
+
+        self.assertEqual([], self.get_view_tables())
+        target.disconnect()